@@ -34,6 +34,44 @@ int WATER_WET_RAW = 100;    // 水に触れた時の生値（高い値）
 const int WATER_LOW_THRESHOLD = 30;     // これ以下→水不足（赤）
 const int WATER_OK_THRESHOLD  = 60;     // これ以上→十分な水（緑）
 
+// === 計測間隔（ホストから "INTERVAL <ミリ秒>" で変更）===
+const unsigned long SAMPLE_INTERVAL_MIN = 100;     // 10Hz
+const unsigned long SAMPLE_INTERVAL_MAX = 60000;   // 1分
+const unsigned long DISPLAY_REFRESH_MS = 250;      // 点滅のためのディスプレイ更新間隔
+unsigned long sampleIntervalMs = 1000;             // 起動時は1秒ごと
+unsigned long lastSampleAt = 0;
+unsigned long lastDisplayAt = 0;
+int lastWaterPct = 0;
+
+// === 変化時のみ送信（ホストから "REPORT <不感帯%> <ハートビートミリ秒>" で有効化、不感帯0で毎回送信）===
+const unsigned long HEARTBEAT_MIN = 1000;
+const unsigned long HEARTBEAT_MAX = 600000;
+bool reportOnChange = false;
+int reportDeadband = 0;
+unsigned long heartbeatMs = 30000;
+int lastSentPct = -1;                              // 最後に送った水分%
+unsigned long lastSentAt = 0;                      // 最後に何かを送った時刻
+
+// === 操作コマンド（"CMD <番号> BUZZ|WAVE|SHOW|PING ..."、"ACK <番号> OK" で応答）===
+// ブザー・サーボは millis() で進めるので、鳴らしている間も計測と送信は止まらない
+const unsigned long WAVE_STEP_MS = 150;            // サーボの1振りの時間
+const unsigned long BUZZ_MAX_MS = 3000;
+const unsigned long SHOW_MAX_MS = 10000;
+int buzzRemaining = 0;                             // 残りの鳴らす回数
+unsigned int buzzFreq = 1000;
+unsigned long buzzMs = 300;
+unsigned long buzzGapMs = 200;
+unsigned long buzzNextAt = 0;
+int waveSteps = 0;                                 // 残りのサーボの動き（最後は中立）
+unsigned long waveNextAt = 0;
+unsigned long displayOverrideUntil = 0;            // この時刻まではSHOWの数字を表示
+bool displayOverride = false;
+
+// ホストからのコマンド受信バッファ
+const int COMMAND_MAX = 32;
+char commandBuffer[COMMAND_MAX + 1];
+int commandLength = 0;
+
 // === 状態管理フラグ ===
 bool playedAria = false; // 一度だけ再生用フラグ
 int lastWaterStatus = -1; // 前回の水分状態（-1=初期状態）
@@ -80,6 +118,38 @@ void setup() {
 }
 
 void loop() {
+  // コマンドは計測の合間に随時受け付ける（delayで待たない）
+  readCommands();
+
+  unsigned long now = millis();
+  if (lastWaterStatus == -1 || now - lastSampleAt >= sampleIntervalMs) {
+    lastSampleAt = now;
+    sampleWater();
+  }
+
+  // 変化がなくても生きていることを知らせる
+  if (reportOnChange && now - lastSentAt >= heartbeatMs) {
+    Serial.println("HB");
+    lastSentAt = now;
+  }
+
+  updateActuators(now);
+
+  // SHOWコマンドの表示中は水分%を表示しない
+  if (displayOverride && (long)(now - displayOverrideUntil) >= 0) {
+    displayOverride = false;
+  }
+
+  // 水不足時の点滅のため、計測間隔が長くても表示は更新し続ける
+  if (!displayOverride && now - lastDisplayAt >= DISPLAY_REFRESH_MS) {
+    lastDisplayAt = now;
+    showStatusOnDisplay(lastWaterPct, lastWaterStatus); // ディスプレイ更新
+    showTrafficLight(lastWaterStatus); // LED更新
+  }
+}
+
+// 水分を計測して送信
+void sampleWater() {
   int rawWater = analogRead(PIN_WATER);
   int waterPct = analogToPercent(rawWater);
   
@@ -89,20 +159,155 @@ void loop() {
   // 状態が変わった時の処理
   handleStatusChange(currentStatus, waterPct);
   
-  showStatusOnDisplay(waterPct, currentStatus); // ディスプレイ更新
-  showTrafficLight(currentStatus); // LED更新
-  
-  Serial.print("Raw: ");
-  Serial.print(rawWater);
-  Serial.print(" -> ");
-  Serial.print(waterPct);
-  Serial.print("% | 状態: ");
-  Serial.println(getWaterStatus(waterPct));
+  // 変化時のみ送信する場合は、不感帯を超えたか状態が変わった時だけ送る
+  bool changed = currentStatus != lastWaterStatus || abs(waterPct - lastSentPct) >= reportDeadband;
+  if (!reportOnChange || changed) {
+    Serial.print("Raw: ");
+    Serial.print(rawWater);
+    Serial.print(" -> ");
+    Serial.print(waterPct);
+    Serial.print("% | 状態: ");
+    Serial.println(getWaterStatus(waterPct));
+    lastSentPct = waterPct;
+    lastSentAt = millis();
+  }
   
   // 前回の状態を更新
   lastWaterStatus = currentStatus;
-  
-  delay(1000);
+  lastWaterPct = waterPct;
+}
+
+// ブザー・サーボを時刻に合わせて進める
+void updateActuators(unsigned long now) {
+  if (buzzRemaining > 0 && (long)(now - buzzNextAt) >= 0) {
+    tone(PIN_BUZZER_SIG, buzzFreq, buzzMs); // 時間指定のtoneは待たずに戻る
+    buzzRemaining--;
+    buzzNextAt = now + buzzMs + buzzGapMs;
+  }
+  if (waveSteps > 0 && (long)(now - waveNextAt) >= 0) {
+    myServo.write(waveSteps == 1 ? 90 : (waveSteps % 2 == 1 ? 85 : 95));
+    waveSteps--;
+    waveNextAt = now + WAVE_STEP_MS;
+  }
+}
+
+// ブザーを count 回鳴らし始める
+void startBuzz(unsigned int freq, unsigned long ms, int count) {
+  buzzFreq = freq;
+  buzzMs = ms;
+  buzzRemaining = count;
+  buzzNextAt = millis();
+}
+
+// サーボを times 回振り始める（最後は中立に戻す）
+void startWave(int times) {
+  waveSteps = times * 2 + 1;
+  waveNextAt = millis();
+}
+
+// "CMD <番号> <名前> [引数1] [引数2]" を実行してすぐに応答（動作の完了は待たない）
+void handleControl(char* command) {
+  char* rest;
+  long seq = strtol(command + 4, &rest, 10);
+  while (*rest == ' ') {
+    rest++;
+  }
+  char* args = strchr(rest, ' ');
+  if (args != NULL) {
+    *args = '\0';
+    args++;
+  }
+  long first = args != NULL ? strtol(args, &args, 10) : 0;
+  long second = args != NULL ? strtol(args, NULL, 10) : 0;
+
+  const char* error = NULL;
+  if (strcmp(rest, "BUZZ") == 0) {
+    unsigned long ms = second > 0 ? second : 300;
+    if (first != 0 && (first < 100 || first > 5000)) {
+      error = "freq";
+    } else if (ms > BUZZ_MAX_MS) {
+      error = "ms";
+    } else {
+      startBuzz(first != 0 ? first : 1000, ms, 1);
+    }
+  } else if (strcmp(rest, "WAVE") == 0) {
+    startWave(constrain(first > 0 ? first : 1, 1, 5));
+  } else if (strcmp(rest, "SHOW") == 0) {
+    unsigned long ms = second > 0 ? second : 3000;
+    if (first < -999 || first > 9999 || ms > SHOW_MAX_MS) {
+      error = "range";
+    } else {
+      display.showNumberDec(first, false);
+      displayOverride = true;
+      displayOverrideUntil = millis() + ms;
+    }
+  } else if (strcmp(rest, "PING") != 0) {
+    error = "unknown";
+  }
+
+  Serial.print("ACK ");
+  Serial.print(seq);
+  if (error == NULL) {
+    Serial.println(" OK");
+  } else {
+    Serial.print(" ERR ");
+    Serial.println(error);
+  }
+}
+
+// ホストからのコマンドを1行ずつ読む
+void readCommands() {
+  while (Serial.available() > 0) {
+    char c = Serial.read();
+    if (c == '\r') {
+      continue;
+    }
+    if (c == '\n') {
+      commandBuffer[commandLength] = '\0';
+      if (commandLength > 0) {
+        handleCommand(commandBuffer);
+      }
+      commandLength = 0;
+    } else if (commandLength < COMMAND_MAX) {
+      commandBuffer[commandLength++] = c;
+    }
+  }
+}
+
+// コマンドを実行して "OK ..." / "ERR ..." で応答（INTERVAL: 計測間隔、REPORT: 変化時のみ送信）
+void handleCommand(char* command) {
+  if (strncmp(command, "CMD ", 4) == 0) {
+    handleControl(command);
+  } else if (strncmp(command, "INTERVAL ", 9) == 0) {
+    long interval = atol(command + 9);
+    if (interval < (long)SAMPLE_INTERVAL_MIN || interval > (long)SAMPLE_INTERVAL_MAX) {
+      Serial.print("ERR INTERVAL ");
+      Serial.println(interval);
+      return;
+    }
+    sampleIntervalMs = interval;
+    Serial.print("OK INTERVAL ");
+    Serial.println(sampleIntervalMs);
+  } else if (strncmp(command, "REPORT ", 7) == 0) {
+    char* rest;
+    long deadband = strtol(command + 7, &rest, 10);
+    long heartbeat = strtol(rest, NULL, 10);
+    if (deadband < 0 || deadband > 100 || heartbeat < (long)HEARTBEAT_MIN || heartbeat > (long)HEARTBEAT_MAX) {
+      Serial.print("ERR ");
+      Serial.println(command);
+      return;
+    }
+    reportOnChange = deadband > 0;
+    reportDeadband = deadband;
+    heartbeatMs = heartbeat;
+    Serial.print("OK REPORT ");
+    Serial.print(reportDeadband);
+    Serial.print(" ");
+    Serial.println(heartbeatMs);
+  } else {
+    Serial.print("ERR ");
+    Serial.println(command);
+  }
 }
 
 // アナログ値をパーセントに変換
@@ -235,46 +440,16 @@ void testAllSystems() {
   Serial.println("=== 全システムテスト完了 ===");
 }
 
-// 単発ビープ音（黄色状態用）
+// 単発ビープ音（黄色状態用、鳴らし始めてすぐ戻る）
 void playSimpleBeep() {
   Serial.println("🔔 単発音");
-  tone(PIN_BUZZER_SIG, 1000, 300); // 1000Hz、300ms
-  
-  // サーボを軽く動かす
-  myServo.write(85);
-  delay(150);
-  myServo.write(95);
-  delay(150);
-  myServo.write(90); // 中立に戻す
-  
-  delay(300);
-  noTone(PIN_BUZZER_SIG);
-  Serial.println("🔔 単発音終了");
+  startBuzz(1000, 300, 1); // 1000Hz、300ms
+  startWave(1);            // サーボを軽く動かす
 }
 
-// 2回ビープ音（緑状態用）
+// 2回ビープ音（緑状態用、鳴らし始めてすぐ戻る）
 void playDoubleBeep() {
   Serial.println("🔔 完了音（2回）");
-  
-  // 1回目のビープ
-  tone(PIN_BUZZER_SIG, 1200, 300); // 高い音、300ms
-  myServo.write(85);
-  delay(150);
-  myServo.write(95);
-  delay(150);
-  noTone(PIN_BUZZER_SIG);
-  
-  delay(200); // 間隔
-  
-  // 2回目のビープ
-  tone(PIN_BUZZER_SIG, 1200, 300); // 高い音、300ms
-  myServo.write(85);
-  delay(150);
-  myServo.write(95);
-  delay(150);
-  
-  myServo.write(90); // 中立に戻す
-  delay(300);
-  noTone(PIN_BUZZER_SIG);
-  Serial.println("🔔 完了音終了");
-}
\ No newline at end of file
+  startBuzz(1200, 300, 2); // 高い音、300ms
+  startWave(2);
+}
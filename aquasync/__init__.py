@@ -0,0 +1,7 @@
+"""AquaSync - 植物水分監視システム
+
+起動を速くするため、Flask・requests・google.generativeai などは
+実際に必要になった時点で読み込む。
+"""
+
+__version__ = '3.0.0'
@@ -0,0 +1,53 @@
+"""複数デバイスの状態変化をまとめて1通の通知にする
+
+最初の状態変化はすぐに通知し、そこからALERT_GROUP_WINDOW秒の間に届いた状態変化を集めて
+期間の終わりにまとめて通知する（まとめて送ったら次の期間も同じように集め、何も届かなかった
+期間の後は再びすぐに通知する）。1台だけの構成や単発の変化は待たされない。同じデバイスが
+期間内に何度変わっても最後の状態だけを送り、元の状態に戻った場合は送らない。通知の数は
+デバイス数によらず期間ごとに一定になる。
+"""
+
+import time
+import threading
+
+from .scheduler import scheduler
+
+_pending = {}  # device -> {'previous', 'status', 'percentage', 'raw_value', 'ts'}
+_lock = threading.Lock()
+
+
+def add_transition(device, raw_value, percentage, status, previous, window):
+    """状態変化を追加（期間外ならすぐに通知して期間を始め、期間中なら期間の終わりまで集める）"""
+    from .notify import send_status_summary
+
+    now = time.time()
+    entry = {'status': status, 'percentage': percentage, 'raw_value': raw_value, 'ts': now}
+    with _lock:
+        immediate = scheduler.due(('alert_group',)) is None
+        if immediate:
+            scheduler.schedule(('alert_group',), now + window, flush, window)
+        else:
+            _pending.setdefault(device, {'previous': previous}).update(entry)
+    if immediate and status != previous:
+        send_status_summary({device: dict(entry, previous=previous)})
+
+
+def flush(window=None):
+    """集めた状態変化をまとめて通知（送ったものがあれば次の期間を始める）"""
+    from .notify import send_status_summary
+
+    with _lock:
+        transitions = {device: entry for device, entry in _pending.items()
+                       if entry['status'] != entry['previous']}
+        _pending.clear()
+        if transitions and window:
+            scheduler.schedule(('alert_group',), time.time() + window, flush, window)
+    if transitions:
+        send_status_summary(transitions)
+    return len(transitions)
+
+
+def pending():
+    """まだ送っていない状態変化のデバイス一覧"""
+    with _lock:
+        return sorted(_pending)
@@ -0,0 +1,244 @@
+"""計測履歴の解析（乾燥ペース・次の水やり目安・水やり検出、NumPyでベクトル化）
+
+乾燥ペースは直近の水やり以降の値にTheil-Sen推定（全ペアの傾きの中央値）を当てはめて求める。
+外れ値や水やり直後の揺れに強く、最小二乗法のように1点のノイズで傾きが振れない。
+デバイスごとの値は固定長の配列に追記し、水やり検出は新しく届いた区間だけを走査する。
+"""
+
+import time
+import threading
+
+import numpy as np
+
+from .arduino import LOW_THRESHOLD
+
+WINDOW_SECONDS = 6 * 3600  # 乾燥ペースを求める直近の期間
+MIN_FIT_SECONDS = 600      # 推定に必要な最小の期間
+MAX_FIT_POINTS = 256       # Theil-Sen推定に使う最大点数（ペア数は約n²/2）
+WATERING_RISE = 15         # 水やりとみなす上昇幅（%）
+WATERING_SPAN = 300        # 上昇を見る時間幅（秒）
+WATERING_HOLD = 30         # 上昇がこの秒数続かなければ水やりとみなさない（スパイク除け）
+SETTLE_SECONDS = 600       # 水やり後、土に水がなじむまで推定から外す時間
+REFRESH_INTERVAL = 60      # 解析結果を再計算する間隔（秒）
+
+_trends = {}
+_trends_lock = threading.Lock()
+
+
+def theil_sen(ts, values, max_points=MAX_FIT_POINTS):
+    """Theil-Sen推定で (傾き/秒, 切片) を返す（点が足りなければNone）"""
+    if len(ts) > max_points:
+        index = np.linspace(0, len(ts) - 1, max_points).astype(np.intp)
+        ts, values = ts[index], values[index]
+    i, j = np.triu_indices(len(ts), 1)
+    dt = ts[j] - ts[i]
+    valid = dt > 0
+    if not valid.any():
+        return None
+    slope = float(np.median((values[j] - values[i])[valid] / dt[valid]))
+    intercept = float(np.median(values - slope * ts))
+    return slope, intercept
+
+
+def rise_runs(ts, values, rise=WATERING_RISE, span=WATERING_SPAN, start=0):
+    """span秒前よりrise%以上高い区間を (開始位置, 終了位置+1) の配列で返す（start以降のみ走査）"""
+    lag = np.searchsorted(ts, ts[start:] - span)
+    hit = (values[start:] - values[lag] >= rise).astype(np.int8)
+    edges = np.diff(hit, prepend=0, append=0)
+    return np.flatnonzero(edges == 1) + start, np.flatnonzero(edges == -1) + start
+
+
+def detect_waterings(ts, values, rise=WATERING_RISE, span=WATERING_SPAN, hold=WATERING_HOLD):
+    """水やり（hold秒以上続いた上昇）の開始位置を返す"""
+    begins, ends = rise_runs(ts, values, rise, span)
+    begins = begins[ts[ends - 1] - ts[begins] >= hold]
+    # スパイクで途切れた上昇はspan秒以内なら同じ水やりとしてまとめる
+    return begins[np.diff(ts[begins], prepend=-np.inf) > span]
+
+
+def drying_rate(ts, values, since=None):
+    """乾燥ペース（%/時間、乾いていくほど正）を推定（データ不足ならNone）"""
+    if since is not None:
+        start = np.searchsorted(ts, since)
+        ts, values = ts[start:], values[start:]
+    if len(ts) < 3 or ts[-1] - ts[0] < MIN_FIT_SECONDS:
+        return None
+    fit = theil_sen(ts - ts[0], values)
+    if fit is None:
+        return None
+    return -fit[0] * 3600
+
+
+def hours_until(level, rate, threshold=LOW_THRESHOLD):
+    """現在のレベルと乾燥ペースからしきい値に届くまでの時間（乾いていなければNone）"""
+    if level <= threshold:
+        return 0.0
+    if rate is None or rate <= 0:
+        return None
+    return (level - threshold) / rate
+
+
+def analyze(ts, values, now=None):
+    """時系列全体を解析（1年分の1Hzデータもまとめて処理できる）"""
+    ts = np.asarray(ts, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if not len(ts):
+        return summarize(None, None, 0, now)
+    waterings = detect_waterings(ts, values)
+    last_watered = float(ts[waterings[-1]]) if len(waterings) else None
+    since = ts[-1] - WINDOW_SECONDS
+    if last_watered is not None:
+        since = max(since, last_watered + SETTLE_SECONDS)
+    rate = drying_rate(ts, values, since)
+    return summarize(rate, float(values[-1]), len(waterings), now or float(ts[-1]), last_watered)
+
+
+def summarize(rate, level, waterings, now=None, last_watered=None):
+    """解析結果をAPI・通知用の辞書にまとめる"""
+    eta = hours_until(level, rate) if level is not None else None
+    now = float(now or time.time())
+    return {
+        'drying_rate': None if rate is None else round(rate, 2),
+        'hours_to_dry': None if eta is None else round(eta, 1),
+        'dry_at': None if eta is None else now + eta * 3600,
+        'last_watered': last_watered,
+        'waterings': waterings,
+    }
+
+
+class PlantTrend:
+    """1デバイス分の直近の計測値と解析結果（追記はO(1)、再計算は一定間隔）"""
+
+    def __init__(self, capacity=4096):
+        self.ts = np.empty(capacity)
+        self.values = np.empty(capacity)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.scanned = 0
+        self.open_run = None  # 走査の終端で続いている上昇 [開始時刻, 計上済みか]
+        self.waterings = 0
+        self.last_watered = None
+        self._summary = None
+        self._computed = 0.0
+
+    def extend(self, ts, values):
+        """まとめて追記（起動時の履歴読み込み用）"""
+        with self._lock:
+            n = len(ts)
+            if self.count + n > len(self.ts):
+                self._resize(max(len(self.ts) * 2, self.count + n), 0)
+            self.ts[self.count:self.count + n] = ts
+            self.values[self.count:self.count + n] = values
+            self.count += n
+
+    def append(self, ts, value):
+        with self._lock:
+            if self.count == len(self.ts):
+                self._compact(ts)
+            self.ts[self.count] = ts
+            self.values[self.count] = value
+            self.count += 1
+
+    def _resize(self, capacity, keep):
+        ts, values = np.empty(capacity), np.empty(capacity)
+        remaining = self.count - keep
+        ts[:remaining], values[:remaining] = self.ts[keep:self.count], self.values[keep:self.count]
+        self.ts, self.values = ts, values
+
+    def _compact(self, now):
+        """期間外の古い値を捨てる（それでも半分以上残るなら容量を倍にする）"""
+        # 捨てる前に未走査の区間で水やりを検出しておく
+        self._scan()
+        keep = int(np.searchsorted(self.ts[:self.count], now - WINDOW_SECONDS - WATERING_SPAN))
+        remaining = self.count - keep
+        if remaining >= len(self.ts) // 2:
+            self._resize(len(self.ts) * 2, keep)
+        else:
+            self.ts[:remaining] = self.ts[keep:self.count]
+            self.values[:remaining] = self.values[keep:self.count]
+        self.count = remaining
+        self.scanned -= keep
+
+    def _scan(self):
+        """前回以降に届いた区間だけで水やりを検出"""
+        if self.scanned >= self.count:
+            return
+        ts, values = self.ts[:self.count], self.values[:self.count]
+        begins, ends = rise_runs(ts, values, start=self.scanned)
+        open_run, self.open_run = self.open_run, None
+        for begin, end in zip(begins.tolist(), ends.tolist()):
+            run = [float(ts[begin]), False]
+            if open_run is not None and begin == self.scanned:
+                # 前回の走査から続いている上昇は同じ水やり
+                run = open_run
+            if not run[1] and ts[end - 1] - run[0] >= WATERING_HOLD:
+                run[1] = True
+                if self.last_watered is None or run[0] - self.last_watered > WATERING_SPAN:
+                    self.waterings += 1
+                    self.last_watered = run[0]
+                    self._summary = None
+            if end == self.count:
+                self.open_run = run
+        self.scanned = self.count
+
+    def summary(self, now=None):
+        """解析結果（REFRESH_INTERVAL以内なら前回の結果を返す）"""
+        now = now or time.time()
+        if self._summary is not None and now - self._computed < REFRESH_INTERVAL:
+            return self._summary
+        with self._lock:
+            return self._compute(now)
+
+    def _compute(self, now):
+        self._scan()
+        if not self.count:
+            return summarize(None, None, self.waterings, now, self.last_watered)
+        ts, values = self.ts[:self.count], self.values[:self.count]
+        since = now - WINDOW_SECONDS
+        if self.last_watered is not None:
+            since = max(since, self.last_watered + SETTLE_SECONDS)
+        rate = drying_rate(ts, values, since)
+        self._summary = summarize(rate, float(values[-1]), self.waterings, now, self.last_watered)
+        self._computed = now
+        return self._summary
+
+
+def _load_trend(device):
+    """直近の履歴からデバイスの解析状態を作る"""
+    from .history import get_history
+
+    trend = PlantTrend()
+    ts, values = get_history().columns(device, since=time.time() - WINDOW_SECONDS - WATERING_SPAN)
+    trend.extend(ts, values)
+    return trend
+
+
+def get_trend(device):
+    """デバイスの解析状態を取得（初回のみ履歴から読み込む）"""
+    trend = _trends.get(device)
+    if trend is None:
+        with _trends_lock:
+            trend = _trends.get(device)
+            if trend is None:
+                trend = _trends[device] = _load_trend(device)
+    return trend
+
+
+def reload_trend(device):
+    """履歴を読み込み直して解析状態を作り直す（較正変更後など）"""
+    with _trends_lock:
+        trend = _trends[device] = _load_trend(device)
+    return trend
+
+
+def summary(device):
+    """デバイスの乾燥ペース・水やり目安"""
+    return get_trend(device).summary()
+
+
+def replay(device, since=None, until=None):
+    """保存済みの履歴全体を一括で解析"""
+    from .history import get_history
+
+    ts, values = get_history().columns(device, since, until)
+    return analyze(ts, values)
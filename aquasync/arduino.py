@@ -0,0 +1,162 @@
+"""Arduino（AquaSync2.ino）とのシリアル通信とデータ解析"""
+
+import os
+import time
+import threading
+
+BAUD_RATE = 9600
+
+# 水分レベルのしきい値（%）
+LOW_THRESHOLD = 30  # これ以下→水不足（赤）
+OK_THRESHOLD = 60   # これより上→十分な水（緑）
+
+# 再接続のバックオフ設定（秒）
+RECONNECT_BASE_DELAY = 0.1
+RECONNECT_MAX_DELAY = 5.0
+# ポート列挙によるホットプラグ検出の間隔（秒）
+HOTPLUG_POLL_INTERVAL = 0.2
+
+
+def open_serial(port):
+    """シリアルポートを開く（pyserialは接続時に読み込む）"""
+    import serial
+    return serial.Serial(port, BAUD_RATE)
+
+
+def port_present(port):
+    """ポートが接続されているか（デバイスファイルまたはポート列挙で確認）"""
+    if not port:
+        return False
+    if os.path.exists(port):
+        return True
+    from serial.tools import list_ports
+    return any(info.device == port for info in list_ports.comports())
+
+
+class SerialLink:
+    """切断時に自動で再接続するシリアル接続"""
+
+    def __init__(self, port, device_id, history=None, on_connect=None):
+        self.port = port
+        self.device_id = device_id
+        self.history = history
+        self.on_connect = on_connect
+        self.connection = None
+        self.connected_at = None
+        self.reconnects = 0
+        self._attempt = 0
+        # 受信スレッドの設定コマンドとWebからの操作コマンドの書き込みが混ざらないようにする
+        self._write_lock = threading.Lock()
+
+    def _connect(self):
+        """ポートが現れるまで待って接続（失敗時は指数バックオフ）"""
+        waiting_reported = False
+        while self.connection is None:
+            if not port_present(self.port):
+                if not waiting_reported:
+                    print(f"🔌 Arduinoの接続を待機中: {self.port}")
+                    waiting_reported = True
+                time.sleep(HOTPLUG_POLL_INTERVAL)
+                continue
+            try:
+                self.connection = open_serial(self.port)
+            except Exception as e:
+                delay = min(RECONNECT_BASE_DELAY * (2 ** self._attempt), RECONNECT_MAX_DELAY)
+                if self._attempt == 0:
+                    print(f"Arduino接続エラー: {e}")
+                    print("ポート名やArduino IDEのシリアルモニタが開いていないか確認してください。")
+                self._attempt += 1
+                self._wait_for_retry(delay)
+                continue
+
+            now = time.time()
+            if self.connected_at is not None:
+                self.reconnects += 1
+                print(f"🔌 Arduino再接続成功: {self.port}（{self.reconnects}回目）")
+            self.connected_at = now
+            self._attempt = 0
+            if self.history is not None:
+                self.history.close_gap(self.device_id, now)
+            if self.on_connect is not None:
+                self.on_connect(self)
+
+    def _wait_for_retry(self, delay):
+        """バックオフ待機中でもポートの抜き差しを検出したら即座に再試行"""
+        was_present = port_present(self.port)
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline:
+            time.sleep(min(HOTPLUG_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            present = port_present(self.port)
+            if present and not was_present:
+                return
+            was_present = present
+
+    def disconnect(self, reason):
+        """接続を閉じて欠損区間を記録"""
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+        print(f"🔌 Arduino切断: {reason} - 再接続を待機します")
+        if self.history is not None:
+            self.history.open_gap(self.device_id, time.time(), reason)
+
+    def readlines(self):
+        """受信行（bytes）を返し続けるジェネレータ（切断時は再接続して継続）"""
+        while True:
+            if self.connection is None:
+                self._connect()
+            try:
+                raw_line = self.connection.readline()
+            except Exception as e:
+                self.disconnect(str(e))
+                continue
+            yield raw_line
+
+    def write(self, data):
+        """シリアルに書き込み（未接続時はFalse）"""
+        connection = self.connection
+        if connection is None:
+            return False
+        try:
+            with self._write_lock:
+                connection.write(data)
+            return True
+        except Exception as e:
+            self.disconnect(str(e))
+            return False
+
+
+def parse_arduino_data(line):
+    """Arduinoからのデータを解析（生値だけの行は (生値, None) を返す）"""
+    try:
+        if line.startswith("Raw:") and "->" not in line:
+            # 較正をホスト側で行う場合の "Raw: 512" 形式
+            return int(line[4:].strip()), None
+        if "Raw:" in line and "%" in line:
+            # "Raw: 32 -> 32% | 状態: 🟡 適度な水分 - OK" のような形式を解析
+            parts = line.split("->")
+            if len(parts) >= 2:
+                raw_part = parts[0].split("Raw:")[-1].strip()
+                percent_part = parts[1].split("%")[0].strip()
+
+                raw_value = int(raw_part)
+                percentage = int(percent_part)
+
+                return raw_value, percentage
+    except Exception as e:
+        print(f"データ解析エラー: {e}")
+
+    return None, None
+
+
+def classify_status(percentage):
+    """水分レベルから状態（red / yellow / green）を判定"""
+    if percentage <= LOW_THRESHOLD:
+        return "red"
+    elif percentage <= OK_THRESHOLD:
+        return "yellow"
+    else:
+        return "green"
@@ -0,0 +1,305 @@
+"""計測値の圧縮ブロック形式（列ごとの符号化、NumPyでまとめて符号化・復号）
+
+1ブロックは1デバイスの連続した計測値（最大BLOCK_SAMPLES件）で、一度書いたら変更しない。
+
+- ts:         TS_RESOLUTION秒単位の整数にして二階差分（delta-of-delta）
+- raw:        差分
+- percentage: rawとの差の差分（ボードと同じ変換なら常に0）
+- filtered:   0.1%単位の整数にしてpercentageとの差か差分の小さい方（ブロック内の公約数で割る）
+- status:     ランレングス（フィルタ値の有無も同じ）
+
+整数列はジグザグ変換して128件ごとのフレームに分け、フレームごとに選んだビット幅で
+詰める（値がすべて0のフレームは幅の1バイトだけ）。復号した列はNumPy配列で、期間の
+切り出しはコピーしないビューになる。
+"""
+
+import numpy as np
+
+FORMAT_VERSION = 1
+BLOCK_SAMPLES = 8192
+FRAME = 128
+EXCEPTION_BYTES = 3     # PFORの例外1件あたりの見積もり（位置2バイト + 上位ビット）
+TS_RESOLUTION = 0.01     # タイムスタンプの分解能（秒）
+FILTERED_SCALE = 10      # フィルタ後の値の分解能（0.1%）
+
+# フィルタ後の値の持ち方
+FILTERED_RESIDUAL = 0   # percentageとの差
+FILTERED_DELTA = 1      # 差分
+
+STATUS_CODES = ('red', 'yellow', 'green', 'unknown')
+_STATUS_INDEX = {status: code for code, status in enumerate(STATUS_CODES)}
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _zigzag(values):
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values):
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+def _bit_lengths(values):
+    """非負整数（uint64）それぞれの必要ビット数"""
+    lengths = np.zeros(values.shape, dtype=np.uint8)
+    remaining = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = remaining >= (np.uint64(1) << np.uint64(shift))
+        lengths[wide] += shift
+        remaining[wide] >>= np.uint64(shift)
+    lengths[remaining > 0] += 1
+    return lengths
+
+
+def _pack_frames(frames, widths):
+    """フレームごとに下位widthsビットを詰める（同じ幅のフレームをまとめて処理）"""
+    chunks = [b''] * len(frames)
+    for width in np.unique(widths).tolist():
+        if width == 0:
+            continue
+        selected = np.flatnonzero(widths == width)
+        bits = (frames[selected, :, None] >> np.arange(width, dtype=np.uint64)) & np.uint64(1)
+        packed = np.packbits(bits.astype(np.uint8).reshape(len(selected), -1), axis=1, bitorder='little')
+        for index, row in zip(selected.tolist(), packed):
+            chunks[index] = row.tobytes()
+    return b''.join(chunks)
+
+
+def _unpack_frames(payload, offset, widths):
+    frames = np.zeros((len(widths), FRAME), dtype=np.uint64)
+    sizes = widths.astype(np.int64) * (FRAME // 8)
+    starts = offset + np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    for width in np.unique(widths).tolist():
+        if width == 0:
+            continue
+        selected = np.flatnonzero(widths == width)
+        chunk = payload[starts[selected, None] + np.arange(width * (FRAME // 8))]
+        bits = np.unpackbits(chunk, axis=1, bitorder='little').reshape(len(selected), FRAME, width)
+        frames[selected] = (bits.astype(np.uint64) << np.arange(width, dtype=np.uint64)).sum(axis=2)
+    return frames, offset + int(sizes.sum())
+
+
+def pack_ints(values):
+    """int64の配列をフレームごとのビット幅で詰める
+
+    幅はフレームの大半が収まる幅にし、収まらない少数の値は上位ビットを例外として
+    （位置, 上位ビット）で別に持つ（PFOR）。単発の外れ値でフレーム全体の幅が広がらない。
+    """
+    n = len(values)
+    frame_count = -(-n // FRAME)
+    frames = np.zeros(frame_count * FRAME, dtype=np.uint64)
+    frames[:n] = _zigzag(values.astype(np.int64))
+    frames = frames.reshape(frame_count, FRAME)
+    lengths = _bit_lengths(frames)
+
+    # 幅ごとの大きさ（詰めたビット列 + 例外1件あたり約EXCEPTION_BYTESバイト）が最小の幅を選ぶ
+    candidates = np.arange(int(lengths.max()) + 1)
+    exceptions = (lengths[:, :, None] > candidates).sum(axis=1)
+    costs = candidates * (FRAME // 8) + exceptions * EXCEPTION_BYTES
+    widths = costs.argmin(axis=1).astype(np.uint8)
+
+    width_mask = (np.uint64(1) << widths.astype(np.uint64)) - np.uint64(1)
+    low = frames & width_mask[:, None]
+    patched = lengths > widths[:, None]
+    positions = np.flatnonzero(patched.reshape(-1)).astype(np.uint16)
+    high = (frames >> widths[:, None].astype(np.uint64))[patched]
+
+    out = bytearray(widths.tobytes())
+    out += _pack_frames(low, widths)
+    _write_varint(out, len(positions))
+    if len(positions):
+        out += positions.astype('<u2').tobytes()
+        out += pack_plain(high.astype(np.int64))
+    return bytes(out)
+
+
+def pack_plain(values):
+    """例外なしで詰める（例外の上位ビット用）"""
+    n = len(values)
+    frame_count = -(-n // FRAME)
+    frames = np.zeros(frame_count * FRAME, dtype=np.uint64)
+    frames[:n] = _zigzag(values)
+    frames = frames.reshape(frame_count, FRAME)
+    widths = _bit_lengths(frames.max(axis=1))
+    return widths.tobytes() + _pack_frames(frames, widths)
+
+
+def unpack_plain(payload, offset, n):
+    frame_count = -(-n // FRAME)
+    widths = payload[offset:offset + frame_count]
+    frames, _ = _unpack_frames(payload, offset + frame_count, widths)
+    return _unzigzag(frames.reshape(-1)[:n])
+
+
+def unpack_ints(data, n):
+    """pack_ints() で詰めた列をint64の配列に戻す"""
+    payload = np.frombuffer(data, dtype=np.uint8)
+    frame_count = -(-n // FRAME)
+    widths = payload[:frame_count]
+    frames, pos = _unpack_frames(payload, frame_count, widths)
+    count, pos = _read_varint(data, pos)
+    if count:
+        positions = np.frombuffer(data, dtype='<u2', count=count, offset=pos)
+        high = unpack_plain(payload, pos + 2 * count, count).astype(np.uint64)
+        flat = frames.reshape(-1)
+        flat[positions] |= high << np.repeat(widths, FRAME)[positions].astype(np.uint64)
+    return _unzigzag(frames.reshape(-1)[:n])
+
+
+def _encode_runs(codes):
+    """状態コードの列を (コード, 長さ) の並びにする"""
+    out = bytearray()
+    if not len(codes):
+        return bytes(out)
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    lengths = np.diff(np.concatenate((starts, [len(codes)])))
+    for code, length in zip(codes[starts].tolist(), lengths.tolist()):
+        out.append(code)
+        _write_varint(out, length)
+    return bytes(out)
+
+
+def _decode_runs(data, n):
+    codes, lengths = [], []
+    pos = 0
+    while pos < len(data):
+        codes.append(data[pos])
+        length, pos = _read_varint(data, pos + 1)
+        lengths.append(length)
+    return np.repeat(np.array(codes, dtype=np.uint8), lengths)[:n]
+
+
+def encode_block(ts, raw, percentage, status, filtered):
+    """計測値の列を1つのブロックに符号化（statusは状態名またはSTATUS_CODESの番号）"""
+    n = len(ts)
+    ticks = np.rint(np.asarray(ts, dtype=np.float64) / TS_RESOLUTION).astype(np.int64)
+    raw = np.asarray(raw, dtype=np.int64)
+    percentage = np.asarray(percentage, dtype=np.int64)
+    filtered = np.asarray(filtered, dtype=np.float64)
+    status = np.asarray(status)
+    if status.dtype.kind in 'UO':
+        status = encode_status(status)
+    status = status.astype(np.uint8)
+
+    deltas = np.diff(ticks, prepend=ticks[0])
+    offset = percentage - raw
+    missing = np.isnan(filtered)
+    # フィルタ値のない計測はpercentageで埋めて符号化し、復号時にNaNに戻す
+    scaled = np.where(missing, percentage * FILTERED_SCALE,
+                      np.rint(np.where(missing, 0, filtered) * FILTERED_SCALE)).astype(np.int64)
+    # 中央値フィルタなど整数しか出ないフィルタでは公約数（FILTERED_SCALE）で割って持つ
+    step = int(np.gcd.reduce(np.append(scaled, FILTERED_SCALE)))
+    # percentageとの差（Hampel・中央値フィルタ向け）と差分（EWMA向け）の小さい方で持つ
+    by_residual = pack_ints((scaled - percentage * FILTERED_SCALE) // step)
+    by_delta = pack_ints(np.diff(scaled, prepend=scaled[0]) // step)
+    filtered_mode = FILTERED_DELTA if len(by_delta) < len(by_residual) else FILTERED_RESIDUAL
+
+    columns = [
+        pack_ints(np.diff(deltas, prepend=0)),
+        pack_ints(np.diff(raw, prepend=raw[0])),
+        pack_ints(np.diff(offset, prepend=offset[0])),
+        by_delta if filtered_mode == FILTERED_DELTA else by_residual,
+        _encode_runs(status),
+        _encode_runs(missing.astype(np.uint8)),
+    ]
+    out = bytearray([FORMAT_VERSION, filtered_mode])
+    for value in (n, int(ticks[0]), int(raw[0]), int(offset[0]), int(scaled[0]), step):
+        _write_varint(out, (value << 1) ^ (value >> 63))
+    for column in columns:
+        _write_varint(out, len(column))
+        out += column
+    return bytes(out)
+
+
+class Block:
+    """復号済みのブロック（列はNumPy配列、期間の切り出しはコピーしないビュー）"""
+
+    __slots__ = ('ts', 'raw', 'percentage', 'status', 'filtered')
+
+    def __init__(self, ts, raw, percentage, status, filtered):
+        self.ts = ts
+        self.raw = raw
+        self.percentage = percentage
+        self.status = status
+        self.filtered = filtered
+
+    def __len__(self):
+        return len(self.ts)
+
+    def slice(self, since=None, until=None):
+        """期間内の部分をビューで返す"""
+        start = 0 if since is None else np.searchsorted(self.ts, since)
+        end = len(self.ts) if until is None else np.searchsorted(self.ts, until)
+        return Block(self.ts[start:end], self.raw[start:end], self.percentage[start:end],
+                     self.status[start:end], self.filtered[start:end])
+
+    def level(self):
+        """フィルタ後の値（なければpercentage）"""
+        return np.where(np.isnan(self.filtered), self.percentage, self.filtered)
+
+
+def decode_block(data):
+    """ブロックを復号"""
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"未対応のブロック形式: {data[0]}")
+    filtered_mode = data[1]
+    pos = 2
+    header = []
+    for _ in range(6):
+        value, pos = _read_varint(data, pos)
+        header.append((value >> 1) ^ -(value & 1))
+    n, tick0, raw0, offset0, scaled0, step = header
+    columns = []
+    for _ in range(6):
+        size, pos = _read_varint(data, pos)
+        columns.append(data[pos:pos + size])
+        pos += size
+
+    deltas = np.cumsum(unpack_ints(columns[0], n))
+    ts = (tick0 + np.cumsum(deltas)) * TS_RESOLUTION
+    raw = raw0 + np.cumsum(unpack_ints(columns[1], n))
+    percentage = raw + offset0 + np.cumsum(unpack_ints(columns[2], n))
+    if filtered_mode == FILTERED_DELTA:
+        scaled = scaled0 + np.cumsum(unpack_ints(columns[3], n)) * step
+    else:
+        scaled = percentage * FILTERED_SCALE + unpack_ints(columns[3], n) * step
+    filtered = scaled / FILTERED_SCALE
+    filtered[_decode_runs(columns[5], n).astype(bool)] = np.nan
+    status = _decode_runs(columns[4], n)
+    return Block(ts, raw, percentage, status, filtered)
+
+
+def status_code(name):
+    """状態名1つを状態コードに"""
+    return _STATUS_INDEX.get(name, _STATUS_INDEX['unknown'])
+
+
+def encode_status(names):
+    """状態名の配列を状態コードの配列に（未知の状態は'unknown'）"""
+    names = np.asarray(names)
+    codes = np.full(len(names), _STATUS_INDEX['unknown'], dtype=np.uint8)
+    for status, code in _STATUS_INDEX.items():
+        codes[names == status] = code
+    return codes
+
+
+def status_names(codes):
+    """状態コードの配列を状態名の配列に"""
+    return np.array(STATUS_CODES)[codes]
@@ -0,0 +1,111 @@
+"""センサーごとの較正プロファイル（生値→水分%の区分線形マッピング）
+
+プロファイルは (生値, %) の点列で、点の間は直線で補間し、両端より外は端の値に揃える
+（AquaSync2.ino の map() + constrain() と同じ）。ADCの範囲内の生値は起動時に作る
+ルックアップテーブルで1サンプルずつ変換し、履歴の再計算はNumPyでまとめて変換する。
+"""
+
+import json
+
+import numpy as np
+
+from .arduino import LOW_THRESHOLD, OK_THRESHOLD
+
+ADC_MAX = 1023
+
+# AquaSync2.ino の WATER_DRY_RAW / WATER_WET_RAW と同じ変換
+DEFAULT_POINTS = ((0, 0), (100, 100))
+
+
+class CalibrationProfile:
+    """生値→水分%の区分線形カーブ"""
+
+    def __init__(self, points=DEFAULT_POINTS):
+        points = sorted((float(raw), float(percent)) for raw, percent in points)
+        if len(points) < 2:
+            raise ValueError("較正点は2つ以上必要です")
+        self.raw = np.array([raw for raw, _ in points])
+        self.percent = np.array([percent for _, percent in points])
+        if (np.diff(self.raw) <= 0).any():
+            raise ValueError("較正点の生値が重複しています")
+        steps = np.diff(self.percent)
+        if not ((steps > 0).all() or (steps < 0).all()):
+            # 逆変換（履歴の再計算）のため単調なカーブに限る
+            raise ValueError("較正カーブは単調増加か単調減少にしてください")
+        if self.percent.min() < 0 or self.percent.max() > 100:
+            raise ValueError("水分%は0〜100で指定してください")
+        self._lut = self.apply(np.arange(ADC_MAX + 1)).tolist()
+
+    @property
+    def points(self):
+        return [(int(raw) if raw.is_integer() else raw, int(percent) if percent.is_integer() else percent)
+                for raw, percent in zip(self.raw.tolist(), self.percent.tolist())]
+
+    def __call__(self, raw):
+        """生値1件を水分%に変換"""
+        if 0 <= raw <= ADC_MAX and raw == int(raw):
+            return self._lut[int(raw)]
+        return float(np.interp(raw, self.raw, self.percent))
+
+    def apply(self, raws):
+        """生値の配列をまとめて水分%に変換"""
+        return np.interp(raws, self.raw, self.percent)
+
+    def invert(self, percentages):
+        """水分%の配列を生値に戻す（較正変更時にフィルタ後の値を移し替える）"""
+        if self.percent[0] < self.percent[-1]:
+            return np.interp(percentages, self.percent, self.raw)
+        return np.interp(percentages, self.percent[::-1], self.raw[::-1])
+
+    def to_json(self):
+        return json.dumps(self.points)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text))
+
+    def __repr__(self):
+        return ' '.join(f"{raw}:{percent}" for raw, percent in self.points)
+
+
+def parse_points(specs):
+    """["0:0", "512:40", "900:100"] のような指定を (生値, %) の点列に変換"""
+    points = []
+    for spec in specs:
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            raw, sep, percent = item.partition(':')
+            if not sep:
+                raise ValueError(f"較正点は 生値:% の形式で指定してください: {item}")
+            points.append((float(raw), float(percent)))
+    return points
+
+
+def classify_levels(levels):
+    """水分%の配列から状態の配列を作る（classify_statusのベクトル版）"""
+    return np.where(levels <= LOW_THRESHOLD, 'red', np.where(levels <= OK_THRESHOLD, 'yellow', 'green'))
+
+
+def get_profile(history, device):
+    """デバイスの較正プロファイル（未設定ならNone=ボードの値を使う）"""
+    stored = history.calibration(device)
+    return None if stored is None else CalibrationProfile.from_json(stored[1])
+
+
+def set_profile(history, device, profile):
+    """較正プロファイルを保存して、そのデバイスの履歴を新しいカーブで計算し直す"""
+    previous = get_profile(history, device) or CalibrationProfile()
+    history.save_calibration(device, profile.to_json())
+
+    def compute(raws, filtered):
+        levels = np.rint(profile.apply(raws))
+        # フィルタ後の値は旧カーブで生値に戻してから新カーブで変換する
+        known = ~np.isnan(filtered)
+        filtered[known] = profile.apply(previous.invert(filtered[known]))
+        # 状態は計測時と同じくフィルタ後の値（なければ変換後の値）で判定
+        statuses = classify_levels(np.where(known, np.rint(filtered), levels))
+        return levels, statuses, filtered
+
+    count = history.recompute_levels(device, compute)
+    if count:
+        history.rebuild_rollups(device)
+    return count
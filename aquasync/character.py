@@ -0,0 +1,234 @@
+"""植物キャラクターのセリフ生成（Gemini API）
+
+複数の植物の依頼はBATCH_WINDOWの間まとめて待ち、1回のリクエストでJSON配列として生成する。
+呼び出し側はCHARACTER_DEADLINEまでしか待たず、間に合わなければローカルのセリフを返す。
+遅れて届いた生成結果は次回の同じ植物・状態の依頼で使う。
+"""
+
+import json
+import time
+import random
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from .config import get_settings
+from .ratelimit import limiter, PRIORITY_CHARACTER
+
+GEMINI_MODEL = 'gemini-1.5-flash'
+
+BATCH_WINDOW = 0.05    # 同じ周期の他の植物の依頼を待つ時間（秒）
+BATCH_MAX_ITEMS = 50   # 1リクエストにまとめる最大件数
+CHARACTER_DEADLINE = 0.3  # セリフを待つ最大時間（秒）
+GEMINI_TIMEOUT = 10       # Gemini APIリクエスト自体のタイムアウト（秒）
+
+# ギャルっぽいセリフ用のプロンプト（植物ごとの入力をJSON配列で渡す）
+PROMPT_TEMPLATE = """
+あなたは明るくて元気なギャル系の植物キャラクターです。
+以下のJSON配列の植物それぞれについて、水分レベル（percentage）と状態（status）に合ったセリフを作ってください。
+
+{items}
+
+以下の条件でセリフを作ってください：
+- 15文字以内の短いセリフ
+- 明るくてギャルっぽい話し方
+- 「〜だよ！」「〜じゃん！」「〜って感じ♪」などの語尾
+- 絵文字は使わない
+- 水分状態に応じた気持ちを表現
+
+例：
+良好な時: 「めっちゃ元気だよ〜！」
+適度な時: 「まあまあって感じかな」
+不足な時: 「のど乾いちゃった〜」
+
+入力と同じidを使い、[{{"id": 0, "message": "セリフ"}}] の形式のJSON配列のみを返してください:
+"""
+
+DEFAULT_MESSAGES = {
+    'green': [
+        'めっちゃ元気だよ〜！',
+        '今日も調子いいじゃん♪',
+        'プリプリしてる〜！',
+        'ウォーター満タンって感じ！',
+        'キラキラしてるよ〜',
+        '最高の気分だよ！',
+        'ハッピーって感じ♪',
+        'ツヤツヤでしょ〜？'
+    ],
+    'yellow': [
+        'まあまあって感じかな',
+        'ぼちぼちだよ〜',
+        'そこそこって感じ！',
+        'まずまずかな〜？',
+        '普通って感じだよ',
+        'まあ悪くないじゃん',
+        'こんなもんかな〜',
+        'いい感じかも？'
+    ],
+    'red': [
+        'のど乾いちゃった〜',
+        'お水欲しいよ〜！',
+        'カラカラだよ〜',
+        'ちょっと疲れたかも',
+        'うるうるしたいな',
+        '水分補給したい！',
+        '乾燥しちゃう〜',
+        '潤いが欲しいよ〜'
+    ],
+    'unknown': [
+        'どうかな〜？',
+        'よくわからないや',
+        'どんな感じかな？',
+        'チェック中だよ〜'
+    ]
+}
+
+_model = None
+
+_pending = []  # (plant, percentage, status, future)
+_pending_cond = threading.Condition()
+_worker = None
+_inflight_since = None  # 実行中のAPI呼び出しの開始時刻
+_late = {}              # (plant, status) -> 期限後に届いたセリフ
+
+
+def _get_model():
+    """Geminiモデルを取得（SDKは初回呼び出し時に読み込む）"""
+    global _model
+    if _model is None:
+        import google.generativeai as genai
+        genai.configure(api_key=get_settings().gemini_api_key)
+        _model = genai.GenerativeModel(GEMINI_MODEL)
+    return _model
+
+
+def truncate_message(message):
+    """長すぎる場合は切り詰め"""
+    if len(message) > 20:
+        message = message[:17] + "..."
+    return message
+
+
+def build_prompt(items):
+    """(plant, percentage, status) のリストからプロンプトを作成"""
+    inputs = [{'id': index, 'plant': plant, 'percentage': percentage, 'status': status}
+              for index, (plant, percentage, status) in enumerate(items)]
+    return PROMPT_TEMPLATE.format(items=json.dumps(inputs, ensure_ascii=False))
+
+
+def parse_messages(text, count):
+    """JSON配列の応答をcount件のセリフに振り分け（読めなかった要素はNone）"""
+    results = [None] * count
+    start, end = text.find('['), text.rfind(']')
+    try:
+        items = json.loads(text[start:end + 1]) if 0 <= start < end else []
+    except ValueError:
+        items = []
+    if not isinstance(items, list):
+        return results
+    for index, item in enumerate(items):
+        if isinstance(item, dict):
+            index, message = item.get('id', index), item.get('message')
+        else:
+            message = item
+        if isinstance(index, int) and 0 <= index < count and isinstance(message, str) and message.strip():
+            results[index] = truncate_message(message.strip())
+    return results
+
+
+def generate_character_messages(items):
+    """複数の (plant, percentage, status) のセリフを1回のAPI呼び出しで生成"""
+    results = [None] * len(items)
+    if items and get_settings().gemini_api_key:
+        # レート制限中はAPIを呼ばずにデフォルトのセリフを使う
+        if limiter.try_acquire('gemini', PRIORITY_CHARACTER):
+            try:
+                response = _get_model().generate_content(
+                    build_prompt(items), generation_config={'response_mime_type': 'application/json'},
+                    request_options={'timeout': GEMINI_TIMEOUT})
+                results = parse_messages(response.text, len(items))
+                failed = results.count(None)
+                if failed:
+                    print(f"Gemini API 応答の解析失敗: {failed}/{len(items)}件はデフォルトのセリフを使用")
+            except Exception as e:
+                print(f"Gemini API エラー: {e}")
+    return [message or get_default_message(status)
+            for message, (_, _, status) in zip(results, items)]
+
+
+def _batch_worker():
+    """溜まった依頼をまとめて生成し、それぞれの依頼元に結果を渡す"""
+    global _inflight_since
+    while True:
+        with _pending_cond:
+            while not _pending:
+                _pending_cond.wait()
+        time.sleep(BATCH_WINDOW)
+        with _pending_cond:
+            batch = _pending[:BATCH_MAX_ITEMS]
+            del _pending[:BATCH_MAX_ITEMS]
+        _inflight_since = time.monotonic()
+        try:
+            messages = generate_character_messages([item[:3] for item in batch])
+        except Exception as e:
+            print(f"セリフ生成エラー: {e}")
+            messages = [get_default_message(status) for _, _, status, _ in batch]
+        finally:
+            _inflight_since = None
+        for (_, _, _, future), message in zip(batch, messages):
+            future.set_result(message)
+
+
+def request_character_message(percentage, status, plant=None):
+    """セリフ生成を依頼してFutureを返す（同時期の依頼は1回のAPI呼び出しにまとめる）"""
+    global _worker
+    future = Future()
+    if not get_settings().gemini_api_key:
+        future.set_result(get_default_message(status))
+        return future
+    with _pending_cond:
+        _pending.append((plant or get_settings().device_id, percentage, status, future))
+        if _worker is None:
+            _worker = threading.Thread(target=_batch_worker, name='character')
+            _worker.daemon = True
+            _worker.start()
+        _pending_cond.notify()
+    return future
+
+
+def _keep_late_message(key, future):
+    """期限後に届いたセリフを次回用に保存"""
+    if future.exception() is None:
+        _late[key] = future.result()
+
+
+def generate_character_message(percentage, status, plant=None, deadline=CHARACTER_DEADLINE):
+    """Gemini APIを使って植物キャラクターのセリフを生成（deadline秒を過ぎたらローカルのセリフ）"""
+    key = (plant or get_settings().device_id, status)
+    late = _late.pop(key, None)
+    if late is not None:
+        # 前回間に合わなかったセリフを使う（APIは呼ばない）
+        return late
+
+    future = request_character_message(percentage, status, plant)
+    started = _inflight_since
+    if started is not None and time.monotonic() - started >= deadline:
+        # 前の呼び出しが既に期限を過ぎている（Geminiが遅い・止まっている）ので待たない
+        wait = 0
+    else:
+        wait = deadline
+    try:
+        return future.result(wait)
+    except TimeoutError:
+        future.add_done_callback(lambda done: _keep_late_message(key, done))
+        return get_default_message(status)
+
+
+_last_default = {}  # status -> 前回返したデフォルトのセリフ
+
+
+def get_default_message(status):
+    """デフォルトメッセージ（API失敗時用、同じ状態で続けて同じセリフにはしない）"""
+    status_messages = DEFAULT_MESSAGES.get(status, ['よろしく〜♪'])
+    choices = [m for m in status_messages if m != _last_default.get(status)] or status_messages
+    message = _last_default[status] = random.choice(choices)
+    return message
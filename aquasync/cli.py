@@ -0,0 +1,309 @@
+"""コマンドラインエントリポイント"""
+
+import time
+
+_START = time.perf_counter()
+
+import sys
+import argparse
+
+from . import profiling
+
+# 起動時に読み込まれていないことを確認する重い依存ライブラリ
+HEAVY_MODULES = ('flask', 'requests', 'google.generativeai', 'serial', 'numpy')
+
+
+def parse_args(argv=None):
+    """コマンドライン引数を解析"""
+    from .modes import MODES
+
+    parser = argparse.ArgumentParser(prog='aquasync', description="AquaSync 水分レベル監視システム")
+    parser.add_argument('--mode', choices=MODES, default='dashboard',
+                        help="alert: 状態変化通知（旧main.py） / level: 水分レベル通知（旧main2.py） / "
+                             "dashboard: ダッシュボード+キャラクター（旧main4.py）")
+    parser.add_argument('--no-character', action='store_true',
+                        help="キャラクターのセリフを生成しない（旧main3.py）")
+    parser.add_argument('--check', action='store_true',
+                        help="設定を読み込んで起動時間を表示し、監視を開始せずに終了")
+    parser.add_argument('--subscribe', nargs='+', metavar=('USER_ID', 'DEVICE'),
+                        help="ユーザーの通知購読を追加（DEVICE省略時は全デバイス）")
+    parser.add_argument('--unsubscribe', nargs='+', metavar=('USER_ID', 'DEVICE'),
+                        help="ユーザーの通知購読を解除（DEVICE省略時は全デバイス）")
+    parser.add_argument('--subscriptions', action='store_true',
+                        help="通知購読の一覧を表示")
+    parser.add_argument('--schedule', nargs='+', metavar=('RECIPIENT', 'CRON'),
+                        help="宛先の定期レポートを設定（例: --schedule Uxxxx \"0 8 * * *\" digest、"
+                             "RECIPIENT=* で購読ユーザー全員、形式は digest / report）")
+    parser.add_argument('--unschedule', metavar='RECIPIENT',
+                        help="宛先の定期レポートを削除")
+    parser.add_argument('--schedules', action='store_true',
+                        help="定期レポートのスケジュール一覧を表示")
+    parser.add_argument('--add-rule', nargs='+', metavar=('DEVICE', 'RULE'),
+                        help="アラートルールを追加（例: --add-rule plant1 \"below 25%% for 10m\" 乾燥注意、DEVICE=* で全デバイス）")
+    parser.add_argument('--remove-rule', nargs=2, metavar=('DEVICE', 'RULE'),
+                        help="アラートルールを削除")
+    parser.add_argument('--rules', action='store_true',
+                        help="アラートルールの一覧を表示")
+    parser.add_argument('--calibrate', nargs='+', metavar=('DEVICE', 'RAW:PERCENT'),
+                        help="デバイスの較正カーブを設定して履歴を再計算（例: --calibrate plant1 0:0 300:50 620:100）")
+    parser.add_argument('--calibration', nargs='?', const='', metavar='DEVICE',
+                        help="デバイスの較正プロファイルを表示")
+    parser.add_argument('--analyze', nargs='?', const='', metavar='DEVICE',
+                        help="保存済みの履歴全体から乾燥ペース・水やり目安を計算して表示")
+    parser.add_argument('--backup', nargs='?', const='', metavar='PATH',
+                        help="履歴データベースを監視を止めずにバックアップ（PATH省略時は data/backups/ に日時付きで保存）")
+    parser.add_argument('--simulate', nargs='+', type=float, metavar=('DAYS', 'RETENTION_DAYS'),
+                        help="模擬データで DAYS 日分の保存・集計・保守を時刻を進めて実行"
+                             "（RETENTION_DAYS 既定は DAYS の半分、3つ目の値で台数）")
+    parser.add_argument('--keep', action='store_true',
+                        help="--simulate の作業ディレクトリ（データベース）を削除せずに残す")
+    parser.add_argument('--profile', action='store_true',
+                        help="ステージ別の処理時間を計測（AQUASYNC_PROFILE=1 と同じ）")
+    parser.add_argument('--profile-sample', type=float, metavar='SECONDS',
+                        help="指定秒数だけサンプリングプロファイラを実行")
+    parser.add_argument('--profile-output', default='profile.folded',
+                        help="サンプリング結果の出力先（collapsed形式）")
+    return parser.parse_args(argv)
+
+
+def startup_elapsed_ms():
+    """CLI読み込みからの経過時間（ミリ秒）"""
+    return (time.perf_counter() - _START) * 1000
+
+
+def check_startup():
+    """コールドスタート時間と遅延読み込みの状態を表示"""
+    from .config import get_settings
+
+    get_settings()
+    print(f"🚀 起動時間: {startup_elapsed_ms():.1f}ms")
+    for name in HEAVY_MODULES:
+        print(f"  {name:<22} {'読み込み済み' if name in sys.modules else '未読み込み'}")
+
+
+def manage_subscriptions(args):
+    """通知購読の追加・解除・一覧表示"""
+    from .config import get_settings
+    from .subscriptions import get_registry, ALL_DEVICES
+
+    registry = get_registry()
+    if args.subscribe:
+        user_id, device = args.subscribe[0], (args.subscribe[1:] or [ALL_DEVICES])[0]
+        registry.subscribe(user_id, device)
+        print(f"✅ 購読追加: {user_id} → {device}")
+    if args.unsubscribe:
+        user_id, device = args.unsubscribe[0], (args.unsubscribe[1:] or [None])[0]
+        if registry.unsubscribe(user_id, device):
+            print(f"✅ 購読解除: {user_id} → {device or '全デバイス'}")
+        else:
+            print(f"⚠️ 購読が見つかりません: {user_id}")
+    subscriptions = registry.to_dict()
+    if get_settings().notify_mode == 'broadcast':
+        print("NOTIFY_MODE=broadcast: 通知は友だち全員に送られます（購読登録は subscribers で使われます）")
+    elif not subscriptions:
+        print("購読登録なし（NOTIFY_MODE=subscribers のため通知は送られません）")
+    for user_id, devices in subscriptions.items():
+        print(f"  {user_id}: {', '.join(devices)}")
+
+
+def manage_schedules(args):
+    """定期レポートのスケジュールの設定・削除・一覧表示"""
+    from .reports import get_schedules, next_run
+
+    schedules = get_schedules()
+    if args.schedule:
+        if len(args.schedule) not in (2, 3):
+            raise SystemExit("--schedule RECIPIENT CRON [MODE] の形式で指定してください")
+        recipient, cron, mode = (args.schedule + ['digest'])[:3]
+        try:
+            schedules.set(recipient, cron, mode)
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        print(f"✅ スケジュール設定: {recipient} ← {cron} ({mode})")
+    if args.unschedule:
+        if schedules.remove(args.unschedule):
+            print(f"✅ スケジュール削除: {args.unschedule}")
+        else:
+            print(f"⚠️ スケジュールが見つかりません: {args.unschedule}")
+    entries = schedules.to_dict()
+    if not entries:
+        print("定期レポートなし")
+    for recipient, entry in entries.items():
+        when = next_run(entry, time.time())
+        upcoming = time.strftime('%m/%d %H:%M', time.localtime(when)) if when else '--'
+        print(f"  {recipient}: {entry['cron']} ({entry['mode']}) 次回 {upcoming}")
+
+
+def manage_rules(args):
+    """アラートルールの追加・削除・一覧表示"""
+    from .rules import get_engine
+
+    engine = get_engine()
+    if args.add_rule:
+        if len(args.add_rule) not in (2, 3):
+            raise SystemExit("--add-rule DEVICE RULE [NAME] の形式で指定してください")
+        try:
+            rule = engine.add(*args.add_rule)
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        print(f"✅ ルール追加: {args.add_rule[0]} ← {rule.spec}")
+    if args.remove_rule:
+        if engine.remove(*args.remove_rule):
+            print(f"✅ ルール削除: {args.remove_rule[0]} ← {args.remove_rule[1]}")
+        else:
+            print(f"⚠️ ルールが見つかりません: {args.remove_rule[1]}")
+    rules = engine.to_dict()
+    if not rules:
+        print("アラートルールなし")
+    for device, entries in rules.items():
+        for spec, name in entries:
+            print(f"  {device}: {spec}" + (f"（{name}）" if name != spec else ""))
+
+
+def manage_calibration(args):
+    """較正プロファイルの設定・表示"""
+    from .calibration import CalibrationProfile, get_profile, parse_points, set_profile
+    from .config import get_settings
+    from .history import get_history
+
+    history = get_history()
+    if args.calibrate:
+        if len(args.calibrate) < 3:
+            raise SystemExit("--calibrate DEVICE RAW:PERCENT RAW:PERCENT ... の形式で指定してください")
+        device = args.calibrate[0]
+        try:
+            profile = CalibrationProfile(parse_points(args.calibrate[1:]))
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        started = time.perf_counter()
+        count = set_profile(history, device, profile)
+        print(f"✅ 較正プロファイル設定: {device} ← {profile}")
+        print(f"  履歴 {count}件を再計算 ({time.perf_counter() - started:.2f}秒)")
+    else:
+        device = args.calibration or get_settings().device_id
+        profile = get_profile(history, device)
+        print(f"📐 {device}: {profile or f'未設定（ボードの値を使用、既定 {CalibrationProfile()}）'}")
+
+
+def print_analysis(device):
+    """履歴全体を解析して結果を表示"""
+    from .analytics import replay
+    from .config import get_settings
+    from .messages import format_eta
+
+    device = device or get_settings().device_id
+    started = time.perf_counter()
+    result = replay(device)
+    elapsed = time.perf_counter() - started
+    print(f"📈 {device} の履歴解析 ({elapsed:.2f}秒)")
+    print(f"  水やり検出: {result['waterings']}回")
+    if result['last_watered'] is not None:
+        print(f"  最後の水やり: {time.strftime('%Y-%m-%d %H:%M', time.localtime(result['last_watered']))}")
+    if result['drying_rate'] is None:
+        print("  乾燥ペース: データ不足")
+    else:
+        print(f"  乾燥ペース: {result['drying_rate']}%/時間")
+    if result['hours_to_dry'] is not None:
+        print(f"  水やり目安: {format_eta(result['hours_to_dry'])}")
+
+
+def backup_history(path):
+    """履歴データベースのオンラインバックアップ"""
+    import os
+    from .config import get_settings
+    from .history import backup_database
+
+    data_dir = get_settings().data_dir
+    source = os.path.join(data_dir, 'history.db')
+    if not os.path.exists(source):
+        raise SystemExit(f"❌ 履歴データベースがありません: {source}")
+    name = time.strftime('history-%Y%m%d-%H%M%S.db')
+    if not path:
+        os.makedirs(os.path.join(data_dir, 'backups'), exist_ok=True)
+        path = os.path.join(data_dir, 'backups', name)
+    elif os.path.isdir(path):
+        path = os.path.join(path, name)
+    started = time.perf_counter()
+    pages = backup_database(source, path)
+    print(f"💾 バックアップ完了: {path}")
+    print(f"  {pages}ページ / {os.path.getsize(path) / 1e6:.1f}MB ({time.perf_counter() - started:.2f}秒)")
+
+
+def run_simulation(values, keep=False):
+    """模擬データで保存・集計・保守を動かして結果を表示"""
+    from .simulator import simulate
+
+    if len(values) > 3:
+        raise SystemExit("--simulate DAYS [RETENTION_DAYS [DEVICES]] の形式で指定してください")
+    days = values[0]
+    retention_days = values[1] if len(values) > 1 else days / 2
+    devices = int(values[2]) if len(values) > 2 else 3
+    print(f"🧪 シミュレーション: {devices}台 × {days:g}日（計測値の保持 {retention_days:g}日）")
+    result = simulate(days, retention_days, devices, keep=keep)
+    print(f"  {result['samples']}件を{result['elapsed']:.1f}秒で処理（実時間の{result['speedup']:.0f}倍）")
+    print(f"  書き込みは {result['ingest_path']} で直接行います（サービスのホット層は通りません）")
+    for label, key in (('書き込み', 'ingest'), ('読み出し', 'query')):
+        waits = result[key]
+        print(f"  {label}の待ち: p50 {waits['p50']:.1f}ms / p99 {waits['p99']:.1f}ms / 最大 {waits['max']:.1f}ms")
+    work = result['maintenance']
+    print(f"  保守: 圧縮 {work.get('sealed', 0)}ブロック / 削除 {work.get('pruned', 0)}件"
+          f" / 解放 {work.get('freed_pages', 0)}ページ")
+    backup = result['backup']
+    if backup:
+        print(f"  バックアップ（実行中に取得）: {backup['seconds']:.2f}秒 / {backup['bytes'] / 1e6:.1f}MB")
+    storage = result['storage']
+    if storage['sealed']:
+        print(f"  圧縮ブロック: {storage['block_bytes'] / 1e6:.2f}MB"
+              f"（{storage['block_bytes'] / storage['sealed']:.2f}バイト/件）、未圧縮 {storage['rows']}件")
+    decode = result['decode']
+    if decode:
+        print(f"  ブロックの復号: {decode['ms_per_block']:.2f}ms/ブロック"
+              f"（{decode['samples_per_second'] / 1e6:.1f}M件/秒、{decode['blocks']}ブロック）")
+    location = result['workdir'] if result['kept'] else '終了時に削除、--keep で残す'
+    print(f"  データベース: {result['db_bytes'] / 1e6:.1f}MB（{location}）")
+    labels = {'retention': '保持期間', 'hour_rollups': '1時間集計', 'day_rollups': '1日集計'}
+    for device, checks in result['checks'].items():
+        print(f"  {'✅' if all(checks.values()) else '❌'} {device}: " +
+              ' / '.join(f"{labels[name]} {'OK' if ok else 'NG'}" for name, ok in checks.items()))
+    if not result['ok']:
+        raise SystemExit(1)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.subscribe or args.unsubscribe or args.subscriptions:
+        manage_subscriptions(args)
+        return
+    if args.schedule or args.unschedule or args.schedules:
+        manage_schedules(args)
+        return
+    if args.add_rule or args.remove_rule or args.rules:
+        manage_rules(args)
+        return
+    if args.calibrate or args.calibration is not None:
+        manage_calibration(args)
+        return
+    if args.analyze is not None:
+        print_analysis(args.analyze)
+        return
+    if args.backup is not None:
+        backup_history(args.backup)
+        return
+    if args.simulate:
+        run_simulation(args.simulate, args.keep)
+        return
+    if args.profile or args.profile_sample:
+        profiling.enable()
+    if args.profile_sample:
+        profiling.SamplingProfiler(args.profile_sample, args.profile_output).start()
+
+    if args.check:
+        check_startup()
+        return
+
+    from . import modes
+    if args.no_character:
+        from . import dashboard
+        dashboard.character_enabled = False
+
+    modes.run(args.mode)
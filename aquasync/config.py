@@ -0,0 +1,110 @@
+"""環境変数（.env）からの設定読み込み"""
+
+import os
+
+_settings = None
+
+NOTIFY_MODES = ('broadcast', 'subscribers')
+
+
+class Settings:
+    """AquaSyncの実行設定"""
+
+    def __init__(self):
+        # LINE Messaging API設定
+        self.channel_access_token = os.getenv('CHANNEL_ACCESS_TOKEN')
+        self.channel_secret = os.getenv('CHANNEL_SECRET')  # Webhookの署名検証用
+        self.arduino_port = os.getenv('ARDUINO_PORT')
+        self.server_url = os.getenv('SERVER_URL', 'http://localhost:5000')  # ngrok URL用
+        self.gemini_api_key = os.getenv('GEMINI_API_KEY')
+
+        # デバイス・履歴設定
+        self.device_id = os.getenv('DEVICE_ID') or 'plant1'
+        self.data_dir = os.getenv('AQUASYNC_DATA_DIR') or 'data'
+
+        # 計測値に通すフィルタ（例: "hampel:7,median:5,ewma:0.3"、"none"なら無加工）
+        ingest_filters = os.getenv('INGEST_FILTERS') or 'hampel:7'
+        self.ingest_filters = '' if ingest_filters == 'none' else ingest_filters
+
+        # 水分不足になる何時間前に事前通知するか（0なら通知しない）
+        self.water_soon_lead = float(os.getenv('WATER_SOON_LEAD') or 3)
+
+        # 通知の宛先（broadcast: 友だち全員、subscribers: 購読登録したユーザーだけ）
+        self.notify_mode = os.getenv('NOTIFY_MODE') or 'broadcast'
+        if self.notify_mode not in NOTIFY_MODES:
+            print(f"⚠️ NOTIFY_MODE={self.notify_mode} は {' / '.join(NOTIFY_MODES)} で指定してください。broadcast を使います")
+            self.notify_mode = 'broadcast'
+
+        # 状態変化の通知をまとめる期間（秒、0ならデバイスごとにすぐ送る）
+        self.alert_group_window = float(os.getenv('ALERT_GROUP_WINDOW') or 60)
+
+        # 定期レポートの既定スケジュール（cron形式、"off"なら送らない）と形式（digest / report）
+        report_schedule = os.getenv('REPORT_SCHEDULE') or '0 21 * * *'
+        self.report_schedule = '' if report_schedule == 'off' else report_schedule
+        self.report_mode = os.getenv('REPORT_MODE') or 'digest'
+        # 定期レポートを送らない時間帯（例: "22-7"）
+        self.quiet_hours = os.getenv('QUIET_HOURS', '')
+
+        # 計測値を残す日数（集計はずっと残す、0なら削除しない）
+        self.raw_retention_days = float(os.getenv('RAW_RETENTION_DAYS') or 30)
+
+        # メモリ（ホット層）に保持する直近の時間数（0ならホット層を使わずに毎回ディスクへ書く）
+        self.hot_window_hours = float(os.getenv('HOT_WINDOW_HOURS') or 6)
+
+        # 計測間隔の自動調整（"変化中の秒数,安定時の秒数"、"off"ならボードの既定の1秒ごと）
+        self.sampling_intervals = _parse_pair('SAMPLING_INTERVALS', '0.1,10')
+
+        # ボードが変化した時だけ送る方式（"不感帯%,ハートビート秒数"、"off"なら毎回送る）
+        # （ボードは整数%で比べるので、不感帯の小数は切り上げて送る）
+        self.report_on_change = _parse_pair('REPORT_ON_CHANGE', '1,30')
+
+        # ダッシュボード更新の不感帯（前回表示から何%以内の変化を無視するか）
+        self.dashboard_deadband = float(os.getenv('DASHBOARD_DEADBAND') or 1)
+
+        # ボードの操作コマンド（/api/commands・/ws/control）のトークン（未設定なら操作は無効）
+        self.control_token = os.getenv('CONTROL_TOKEN', '')
+
+        # Webサーバー設定
+        self.web_host = '0.0.0.0'
+        self.web_port = 5000
+        self.image_name = 'ohana.png'
+
+    @property
+    def image_path(self):
+        """通知用画像のローカルパス"""
+        return os.path.join(os.getcwd(), self.image_name)
+
+    @property
+    def image_url(self):
+        """通知用画像の公開URL"""
+        return f"{self.server_url}/image/{self.image_name}"
+
+    @property
+    def https_enabled(self):
+        """LINEの画像送信にはHTTPS URLが必要"""
+        return self.server_url.startswith('https://')
+
+
+def _parse_pair(name, default):
+    """"数値,数値" 形式の設定を2つの正の数のタプルにする（"off"ならNone、不正なら警告して既定値）"""
+    value = os.getenv(name) or default
+    if value == 'off':
+        return None
+    try:
+        pair = tuple(float(part) for part in value.split(','))
+        if len(pair) != 2 or min(pair) <= 0:
+            raise ValueError
+    except ValueError:
+        print(f"⚠️ {name}={value} は \"数値,数値\"（正の数）の形式で指定してください。既定値 {default} を使います")
+        pair = tuple(float(part) for part in default.split(','))
+    return pair
+
+
+def get_settings():
+    """設定を取得（初回のみ.envを読み込む）"""
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _settings = Settings()
+    return _settings
@@ -0,0 +1,172 @@
+"""ダッシュボードからボードへの操作コマンド（ブザー・サーボ・表示）
+
+コマンドはデバイスごとのキューに積み、専用スレッドが1つずつ "CMD <番号> <名前> [引数]" を
+シリアルに書いてボードの応答（"ACK <番号> OK" / "ACK <番号> ERR <理由>"）を待つ。応答は
+計測値と同じ受信スレッドに届くので振り分けるだけにし、計測値の処理は止めない。ボードは
+動作を始めた時点で応答するため、往復はシリアルの転送時間（9600bpsで数十ms）で済む。
+"""
+
+import time
+import queue
+import itertools
+import threading
+
+# API上の名前 -> (ボードのコマンド名, 引数の数の上限)
+COMMANDS = {
+    'buzz': ('BUZZ', 2),   # [周波数Hz] [ミリ秒]
+    'wave': ('WAVE', 1),   # [回数]
+    'show': ('SHOW', 2),   # 数字 [ミリ秒]
+    'ping': ('PING', 0),
+}
+ACK_PREFIX = "ACK "
+ACK_TIMEOUT = 1.0    # ボードの応答を待つ秒数
+QUEUE_LIMIT = 16     # デバイスごとの待ち行列の上限（超えたら受け付けない）
+
+_channels = {}
+_channels_lock = threading.Lock()
+_finish_lock = threading.Lock()   # 応答とタイムアウトが同時に結果を確定しないようにする
+
+
+class CommandError(Exception):
+    """コマンドを受け付けられない（不明なデバイス・コマンド、待ち行列が満杯）"""
+
+
+class Command:
+    """送信待ち・応答待ちのコマンド1つ"""
+
+    def __init__(self, seq, name, args):
+        self.seq = seq
+        self.name = name
+        self.args = args
+        self.queued_at = time.perf_counter()
+        self.sent_at = None
+        self.result = None
+        self.done = threading.Event()
+
+    def line(self):
+        board_name = COMMANDS[self.name][0]
+        return ' '.join(['CMD', str(self.seq), board_name, *map(str, self.args)]) + '\n'
+
+    def finish(self, ok, error=None):
+        """結果を確定（2回目以降は無視）"""
+        with _finish_lock:
+            if self.done.is_set():
+                return
+            now = time.perf_counter()
+            self.result = {
+                'seq': self.seq,
+                'command': self.name,
+                'ok': ok,
+                'error': error,
+                'queued_ms': round(((self.sent_at or now) - self.queued_at) * 1000, 1),
+                'latency_ms': None if self.sent_at is None else round((now - self.sent_at) * 1000, 1),
+            }
+            self.done.set()
+
+
+class CommandChannel:
+    """1デバイスのコマンドの待ち行列（1つずつ送って応答を待つ）"""
+
+    def __init__(self, device):
+        self.device = device
+        self.link = None
+        self.queue = queue.Queue(QUEUE_LIMIT)
+        self._seq = itertools.count(1)
+        self._inflight = None
+        self._thread = None
+        self.sent = 0
+        self.failed = 0
+
+    def attach(self, link):
+        """接続（再接続）時に呼ぶ（応答待ちのコマンドはボードのリセットで失われている）"""
+        self.link = link
+        inflight = self._inflight
+        if inflight is not None:
+            inflight.finish(False, 'ボードが再接続されました')
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'control-{self.device}', daemon=True)
+            self._thread.start()
+
+    def submit(self, name, args=()):
+        """コマンドを待ち行列に積んで Command を返す（結果は command.done を待って command.result）"""
+        spec = COMMANDS.get(name)
+        if spec is None:
+            raise CommandError(f"不明なコマンド: {name}（{', '.join(COMMANDS)}）")
+        try:
+            args = [int(value) for value in args]
+        except (TypeError, ValueError):
+            raise CommandError(f"引数は整数で指定してください: {args}")
+        if len(args) > spec[1]:
+            raise CommandError(f"{name} の引数は{spec[1]}個までです")
+        if self._thread is None:
+            raise CommandError(f"ボードが未接続です: {self.device}")
+        command = Command(next(self._seq), name, args)
+        try:
+            self.queue.put_nowait(command)
+        except queue.Full:
+            raise CommandError(f"コマンドが混み合っています: {self.device}")
+        return command
+
+    def handle_line(self, line):
+        """ボードの応答を処理（応答の行ならTrue）"""
+        if not line.startswith(ACK_PREFIX):
+            return False
+        seq, _, outcome = line[len(ACK_PREFIX):].partition(' ')
+        inflight = self._inflight
+        if inflight is not None and seq == str(inflight.seq):
+            ok = outcome == 'OK'
+            inflight.finish(ok, None if ok else outcome[4:] if outcome.startswith('ERR ') else outcome)
+        return True
+
+    def _run(self):
+        while True:
+            command = self.queue.get()
+            if command.done.is_set():
+                # 待っている間に呼び出し側がタイムアウトした
+                continue
+            link = self.link
+            if link is None:
+                command.finish(False, 'ボードが未接続です')
+                continue
+            self._inflight = command
+            command.sent_at = time.perf_counter()
+            if not link.write(command.line().encode()):
+                command.finish(False, 'シリアルへの書き込みに失敗しました')
+            elif not command.done.wait(ACK_TIMEOUT):
+                command.finish(False, 'ボードが応答しません')
+            self._inflight = None
+            self.sent += 1
+            if not command.result['ok']:
+                self.failed += 1
+
+    def stats(self):
+        return {'queued': self.queue.qsize(), 'sent': self.sent, 'failed': self.failed,
+                'connected': self.link is not None and self.link.connection is not None}
+
+
+def get_channel(device):
+    """デバイスのコマンドの待ち行列を取得（初回のみ作成）"""
+    channel = _channels.get(device)
+    if channel is None:
+        with _channels_lock:
+            channel = _channels.setdefault(device, CommandChannel(device))
+    return channel
+
+
+def send(device, name, args=(), timeout=None):
+    """コマンドを送って応答を待ち、結果の辞書を返す（受け付けられなければ CommandError）"""
+    channel = _channels.get(device)
+    if channel is None:
+        raise CommandError(f"不明なデバイス: {device}")
+    command = channel.submit(name, args)
+    # 前に並んでいるコマンドの分も待つ
+    if timeout is None:
+        timeout = ACK_TIMEOUT * (channel.queue.qsize() + 2)
+    if not command.done.wait(timeout):
+        command.finish(False, 'タイムアウトしました')
+    return dict(command.result, device=device)
+
+
+def stats():
+    """デバイスごとのコマンドの送信状況"""
+    return {device: channel.stats() for device, channel in list(_channels.items())}
@@ -0,0 +1,86 @@
+"""Webダッシュボードに表示する現在データ"""
+
+import time
+from datetime import datetime
+
+from . import profiling
+from .arduino import classify_status
+from .character import generate_character_message
+from .config import get_settings
+from .messages import render_status_message
+
+STATUS_FACES = {
+    'red': 'sad',
+    'yellow': 'normal',
+    'green': 'happy',
+}
+
+# グローバル変数でデータを保存
+current_data = {
+    'raw_value': 0,
+    'percentage': 0,
+    'status': 'unknown',
+    'last_update': None,
+    'last_seen': None,
+    'message': '起動中...',
+    'character_message': 'システム起動中だよ〜！',
+    'character_face': 'normal'
+}
+
+# Falseの場合はキャラクターのセリフを生成しない（main3.py相当）
+character_enabled = True
+
+
+def update_current_data(raw_value, percentage, deadband=None):
+    """現在のデータを更新（変化が不感帯以内ならlast_seenだけ更新してFalseを返す）"""
+    now = time.time()
+    status = classify_status(percentage)
+    if deadband is None:
+        deadband = get_settings().dashboard_deadband
+
+    if (current_data['last_update'] is not None
+            and status == current_data['status']
+            and abs(percentage - current_data['percentage']) <= deadband):
+        current_data['last_seen'] = now
+        return False
+
+    face = STATUS_FACES[status]
+    update = {
+        'raw_value': raw_value,
+        'percentage': percentage,
+        'status': status,
+        'last_update': datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+        'last_seen': now,
+        'character_face': face
+    }
+
+    if character_enabled:
+        # Gemini APIでキャラクターメッセージを生成
+        with profiling.stage('generate_character_message'):
+            update['character_message'] = generate_character_message(percentage, status)
+        print(f"📊 データ更新: {percentage}% ({status}) | キャラクター: {update['character_message']}")
+    else:
+        print(f"📊 データ更新: {percentage}% ({status})")
+
+    current_data.update(update)
+    return True
+
+
+def snapshot():
+    """表示用の現在データ（メッセージは最後の計測値の時刻で描画し、LINE通知と同じものを共有）"""
+    from . import analytics
+
+    data = dict(current_data)
+    if data['status'] in ('red', 'yellow', 'green'):
+        data['message'] = render_status_message(data['percentage'], data['status'], data['last_seen'])
+    data['analytics'] = analytics.summary(get_settings().device_id)
+    return data
+
+
+def init_character_message():
+    """初期キャラクターメッセージ設定（計測値が届いていれば上書きしない）"""
+    initial_message = generate_character_message(0, 'unknown')
+    if current_data['last_update'] is None:
+        current_data['character_message'] = initial_message
+    print(f"🎭 キャラクター初期化: {initial_message}")
+    return True
@@ -0,0 +1,152 @@
+"""計測値の平滑化・外れ値除去フィルタ（1サンプルあたり定数コスト）
+
+フィルタはデバイスごとに生成し、parse_arduino_data() の後、状態判定の前に通す。
+窓はすべて固定長のarrayで保持し、サンプルごとのリスト生成やコピーはしない。
+"""
+
+from array import array
+from bisect import bisect_left, insort
+
+# MADを標準偏差相当に換算する係数（正規分布）
+MAD_SCALE = 1.4826
+
+
+class RingBuffer:
+    """固定長のリングバッファ（append・最古値の取得がO(1)）"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = array('d', bytes(8 * size))
+        self.index = 0
+        self.count = 0
+
+    def append(self, value):
+        """値を追加し、押し出された値を返す（満杯でなければNone）"""
+        evicted = self.values[self.index] if self.count == self.size else None
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        return evicted
+
+
+class SortedWindow:
+    """直近size件を昇順に保持する窓（中央値の取得がO(1)）"""
+
+    def __init__(self, size):
+        self.ring = RingBuffer(size)
+        self.sorted = array('d')
+
+    def append(self, value):
+        evicted = self.ring.append(value)
+        if evicted is not None:
+            del self.sorted[bisect_left(self.sorted, evicted)]
+        insort(self.sorted, value)
+
+    def median(self):
+        values = self.sorted
+        n = len(values)
+        mid = n // 2
+        if n % 2:
+            return values[mid]
+        return (values[mid - 1] + values[mid]) / 2
+
+    def mad(self, median):
+        """中央絶対偏差（昇順の窓から偏差の中央値を並べ替えなしで求める）"""
+        values = self.sorted
+        n = len(values)
+        # 中央値の左側の偏差は右へ行くほど小さく、右側の偏差は大きくなる
+        left = bisect_left(values, median) - 1
+        right = left + 1
+        k_low = (n - 1) // 2
+        k_high = n // 2
+        low = high = 0.0
+        for k in range(k_high + 1):
+            if right >= n or (left >= 0 and median - values[left] <= values[right] - median):
+                deviation = median - values[left]
+                left -= 1
+            else:
+                deviation = values[right] - median
+                right += 1
+            if k == k_low:
+                low = deviation
+            if k == k_high:
+                high = deviation
+        return (low + high) / 2
+
+
+class MovingMedian:
+    """移動中央値フィルタ"""
+
+    def __init__(self, window=5):
+        self.window = SortedWindow(int(window))
+
+    def __call__(self, value):
+        self.window.append(value)
+        return self.window.median()
+
+
+class EWMA:
+    """指数加重移動平均フィルタ"""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = float(alpha)
+        self.value = None
+
+    def __call__(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class Hampel:
+    """Hampelフィルタ（中央値からn_sigmas×MADを超える値を中央値で置き換える）"""
+
+    def __init__(self, window=7, n_sigmas=3.0):
+        self.window = SortedWindow(int(window))
+        self.n_sigmas = float(n_sigmas)
+        self.rejected = 0
+
+    def __call__(self, value):
+        self.window.append(value)
+        if self.window.ring.count < 3:
+            return value
+        median = self.window.median()
+        threshold = self.n_sigmas * MAD_SCALE * self.window.mad(median)
+        if abs(value - median) > threshold and threshold > 0:
+            self.rejected += 1
+            return median
+        return value
+
+
+FILTER_TYPES = {
+    'median': MovingMedian,
+    'ewma': EWMA,
+    'hampel': Hampel,
+}
+
+
+class FilterChain:
+    """複数のフィルタを順に適用"""
+
+    def __init__(self, filters):
+        self.filters = filters
+
+    def __call__(self, value):
+        for apply in self.filters:
+            value = apply(value)
+        return value
+
+
+def build_filter_chain(spec):
+    """"hampel:7,median:5,ewma:0.3" のような指定からフィルタを生成"""
+    filters = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, args = item.partition(':')
+        if name not in FILTER_TYPES:
+            raise ValueError(f"不明なフィルタ: {name}（{', '.join(FILTER_TYPES)} のいずれか）")
+        params = [float(arg) for arg in args.split(':') if arg]
+        filters.append(FILTER_TYPES[name](*params))
+    return FilterChain(filters)
@@ -0,0 +1,56 @@
+"""乾燥予測にもとづく「もうすぐ水やり」の事前通知
+
+analyticsの推定が更新されるたびに、水分不足になる時刻からリードタイムを引いた時刻へ
+通知ジョブを登録し直す。通知は1回の乾燥（水やりから次の水やりまで）につき1回だけ送る。
+"""
+
+from . import state
+from .config import get_settings
+from .messages import get_water_soon_message
+from .scheduler import scheduler
+
+# 予測がこの時間（時）以上ずれていたら送らずに次の推定を待つ
+LEAD_SLACK_HOURS = 0.5
+
+_UNSET = object()
+_watched = {}   # device -> 最後に予定を立てた解析結果
+_notified = {}  # device -> 通知済みの乾燥サイクル（その直前の水やり時刻）
+
+
+def _job_key(device):
+    return ('water_soon', device)
+
+
+def watch(device, summary):
+    """解析結果が更新されていれば事前通知の予定を立て直す"""
+    if _watched.get(device) is summary:
+        return
+    _watched[device] = summary
+
+    lead = get_settings().water_soon_lead
+    hours = summary['hours_to_dry']
+    if not lead or hours is None or hours <= 0:
+        # 乾きが止まった・既に水分不足（状態変化の通知に任せる）
+        scheduler.cancel(_job_key(device))
+        return
+    if _notified.get(device, _UNSET) == summary['last_watered']:
+        return
+    scheduler.schedule(_job_key(device), summary['dry_at'] - lead * 3600, notify_water_soon, device)
+
+
+def notify_water_soon(device):
+    """事前通知を送信（実行時点の推定で改めて確認する）"""
+    from . import analytics
+    from .notify import queue_notification
+
+    summary = analytics.summary(device)
+    hours = summary['hours_to_dry']
+    if hours is None or hours <= 0 or hours > get_settings().water_soon_lead + LEAD_SLACK_HOURS:
+        # 推定が変わった場合は次の更新で予定し直される
+        return False
+    _notified[device] = summary['last_watered']
+    latest = state.get(device)
+    percentage = latest['percentage'] if latest else None
+    print(f"⏳ 水やり事前通知: {device} あと{hours:.1f}時間")
+    return queue_notification(f'water_soon:{device}', get_water_soon_message(device, percentage, summary),
+                              device=device)
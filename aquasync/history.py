@@ -0,0 +1,645 @@
+"""計測履歴の保存（SQLite）"""
+
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    device TEXT NOT NULL,
+    ts REAL NOT NULL,
+    raw INTEGER NOT NULL,
+    percentage INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    filtered REAL
+);
+CREATE INDEX IF NOT EXISTS readings_device_ts ON readings (device, ts);
+
+-- 古い計測値を圧縮したブロック（blocks.py の形式、一度書いたら追記しない）
+CREATE TABLE IF NOT EXISTS blocks (
+    device TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    count INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (device, start_ts)
+);
+
+-- シリアル切断などで計測が途切れた区間
+CREATE TABLE IF NOT EXISTS gaps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL,
+    reason TEXT
+);
+
+-- 1時間・1日ごとの集計（レベルはフィルタ後、なければボードの値）
+CREATE TABLE IF NOT EXISTS rollups (
+    device TEXT NOT NULL,
+    period TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    mean REAL,
+    last REAL,
+    red_samples INTEGER NOT NULL,
+    PRIMARY KEY (device, period, start_ts)
+);
+
+-- デバイスごとの較正プロファイル（最新のものが有効）
+CREATE TABLE IF NOT EXISTS calibrations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device TEXT NOT NULL,
+    created_ts REAL NOT NULL,
+    points TEXT NOT NULL
+);
+"""
+
+HOUR = 3600
+SEAL_AGE = HOUR       # これより古い計測値をブロックに圧縮する（秒）
+BLOCK_CACHE_SIZE = 64  # 復号済みブロックを保持する数
+WAL_SIZE_LIMIT = 4 * 1024 * 1024
+HOT_WINDOW = 6 * HOUR   # ホット層に保持する件数の既定値（1Hzで6時間）
+HOT_SPILL_SECONDS = 30  # ホット層の計測値をディスクに書き出す間隔（秒）
+
+ROLLUP_INSERT = """
+INSERT OR REPLACE INTO rollups (device, period, start_ts, samples, min, max, mean, last, red_samples)
+VALUES (?, 'hour', ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# 1日ごとの集計（その日の1時間ごとの集計から求める）
+ROLLUP_DAY_QUERY = """
+INSERT OR REPLACE INTO rollups (device, period, start_ts, samples, min, max, mean, last, red_samples)
+SELECT device, 'day', ?, SUM(samples), MIN(min), MAX(max), SUM(mean * samples) / SUM(samples),
+       (SELECT last FROM rollups WHERE device = ? AND period = 'hour' AND start_ts >= ? AND start_ts < ?
+        ORDER BY start_ts DESC LIMIT 1),
+       SUM(red_samples)
+FROM rollups WHERE device = ? AND period = 'hour' AND start_ts >= ? AND start_ts < ?
+GROUP BY device
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class HistoryStore:
+    """デバイスごとの計測値と欠損区間を保存
+
+    append_reading() の計測値はまずホット層（hot.HotWindow）に入り、HOT_SPILL_SECONDS ごとに
+    まとめてディスクに書き出す。ホット層に収まる期間の読み出しはディスクを読まない。
+    """
+
+    def __init__(self, path, hot_window=HOT_WINDOW):
+        self.path = path
+        self.hot_window = hot_window
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # 削除で空いたページを少しずつ返せるようにする（新規作成時のみ有効）
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # チェックポイント後にWALファイルを切り詰める大きさ
+        self._conn.execute(f"PRAGMA journal_size_limit={WAL_SIZE_LIMIT}")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._open_gaps = {}
+        self._local = threading.local()
+        self._block_cache = OrderedDict()  # (device, start_ts) -> 復号済みのBlock
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0  # ブロックを置き換え・削除するたびに増やす
+        self._hot = {}  # device -> HotWindow
+        self._spill_lock = threading.Lock()
+        self._closed = False
+
+    def _migrate(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(readings)")}
+        if 'filtered' not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE readings ADD COLUMN filtered REAL")
+
+    def append_reading(self, device, ts, raw, percentage, status, filtered=None):
+        """計測値を1件追加（percentageは較正後の値、filteredはフィルタ後の値）
+
+        ホット層に追加するだけで、ディスクへはHOT_SPILL_SECONDSごとにまとめて書き出す。
+        """
+        if self.hot_window <= 0:
+            self.append_readings(device, [(ts, raw, percentage, status, filtered)])
+            return
+        hot = self._hot.get(device)
+        if hot is None:
+            from .hot import HotWindow
+            hot = self._hot[device] = HotWindow(self.hot_window)
+        if hot.unspilled() >= hot.capacity // 2:
+            # 書き出し待ちの計測値はリングで上書きしない
+            self.spill(device)
+        hot.append(ts, raw, percentage, status, filtered)
+        if ts - hot.spilled_at >= HOT_SPILL_SECONDS:
+            self.spill(device)
+
+    def spill(self, device):
+        """ホット層の書き出し待ちの計測値をディスクに書き出す（書き出した件数を返す）"""
+        hot = self._hot.get(device)
+        if hot is None:
+            return 0
+        with self._spill_lock:
+            block, end = hot.pending()
+            if len(block):
+                self.append_readings(device, hot.rows(block))
+            hot.spilled = end
+            hot.spilled_at = float(block.ts[-1]) if len(block) else hot.spilled_at
+        return len(block)
+
+    def flush(self):
+        """全デバイスのホット層を書き出す（保守の前・終了時）"""
+        return sum(self.spill(device) for device in list(self._hot))
+
+    def drop_hot(self, device):
+        """デバイスのホット層を書き出して捨てる（較正の変更でディスクの値が計算し直された時）"""
+        self.spill(device)
+        self._hot.pop(device, None)
+
+    def hot_stats(self):
+        """ホット層の {device: {'samples', 'unspilled', 'bytes'}}"""
+        return {device: {'samples': min(hot.count, hot.capacity), 'unspilled': hot.unspilled(),
+                         'bytes': hot.nbytes()}
+                for device, hot in list(self._hot.items())}
+
+    def append_readings(self, device, rows):
+        """計測値をまとめてディスクに追加（rowsは (ts, raw, percentage, status, filtered) の並び、ホット層は通さない）"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO readings (device, ts, raw, percentage, status, filtered) VALUES (?, ?, ?, ?, ?, ?)",
+                ((device, *row) for row in rows))
+
+    def devices(self):
+        """履歴のあるデバイスの一覧"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT device FROM readings GROUP BY device UNION SELECT device FROM blocks")]
+
+    def open_gap(self, device, ts, reason):
+        """欠損区間の開始を記録（既に開いている場合は何もしない）"""
+        if device in self._open_gaps:
+            return
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO gaps (device, start_ts, reason) VALUES (?, ?, ?)", (device, ts, reason))
+        self._open_gaps[device] = cursor.lastrowid
+
+    def close_gap(self, device, ts):
+        """欠損区間の終了を記録"""
+        gap_id = self._open_gaps.pop(device, None)
+        if gap_id is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE gaps SET end_ts = ? WHERE id = ?", (ts, gap_id))
+
+    def _reader(self):
+        """読み出し用のスレッドごとの接続（WALなので書き込み中も待たずに読める）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, isolation_level=None)
+        return conn
+
+    def _decoded(self, conn, device, start_ts):
+        """ブロックを復号（ブロックは変更しないので復号結果をキャッシュする）"""
+        from .blocks import decode_block
+
+        key = (device, start_ts)
+        with self._cache_lock:
+            block = self._block_cache.get(key)
+            if block is not None:
+                self._block_cache.move_to_end(key)
+                return block
+            generation = self._cache_generation
+        data = conn.execute("SELECT data FROM blocks WHERE device = ? AND start_ts = ?", key).fetchone()[0]
+        block = decode_block(data)
+        with self._cache_lock:
+            # 読んでいる間に置き換えられたブロックはキャッシュしない
+            if generation == self._cache_generation:
+                self._block_cache[key] = block
+                if len(self._block_cache) > BLOCK_CACHE_SIZE:
+                    self._block_cache.popitem(last=False)
+        return block
+
+    def _forget(self, device, start_ts):
+        with self._cache_lock:
+            self._block_cache.pop((device, start_ts), None)
+            self._cache_generation += 1
+
+    def load(self, device, since=None, until=None):
+        """期間内の計測値を列ごとのNumPy配列（blocks.Block）で返す
+
+        ホット層に収まる期間はディスクを読まずにホット層だけで答え、それより前の部分だけ
+        ディスク（圧縮済みのブロックと未圧縮の行）から読んでつなげる。
+        """
+        import numpy as np
+        from .blocks import Block
+
+        hot = self._hot.get(device)
+        if hot is None:
+            return self._load_disk(device, since, until)
+        recent, covered_from = hot.snapshot(since, until)
+        if since is not None and covered_from <= since:
+            return recent
+        if until is not None:
+            covered_from = min(covered_from, until)
+        elif covered_from == float('inf'):
+            covered_from = None
+        older = self._load_disk(device, since, covered_from)
+        if not len(older):
+            return recent
+        if not len(recent):
+            return older
+        return Block(*(np.concatenate((getattr(older, name), getattr(recent, name))) for name in Block.__slots__))
+
+    def _load_disk(self, device, since=None, until=None):
+        """ディスクの計測値を読む（1つのブロックに収まる期間なら復号済みの配列のビュー）"""
+        import numpy as np
+        from .blocks import Block, encode_status
+
+        low = -1e300 if since is None else since
+        high = 1e300 if until is None else until
+        conn = self._reader()
+        # ブロックと行を同じ時点の内容で読む（圧縮で行がブロックに移っても重複・欠落しない）
+        conn.execute("BEGIN")
+        try:
+            starts = [row[0] for row in conn.execute(
+                "SELECT start_ts FROM blocks WHERE device = ? AND end_ts >= ? AND start_ts < ? ORDER BY start_ts",
+                (device, low, high))]
+            parts = [self._decoded(conn, device, start_ts).slice(since, until) for start_ts in starts]
+            rows = np.fromiter(conn.execute(
+                "SELECT ts, raw, percentage, status, IFNULL(filtered, 'nan') FROM readings "
+                "WHERE device = ? AND ts >= ? AND ts < ? ORDER BY ts", (device, low, high)),
+                dtype=[('ts', 'f8'), ('raw', 'i8'), ('percentage', 'i8'), ('status', 'U7'), ('filtered', 'f8')])
+        finally:
+            conn.execute("COMMIT")
+        if len(rows) or not parts:
+            parts.append(Block(rows['ts'], rows['raw'], rows['percentage'],
+                               encode_status(rows['status']), rows['filtered']))
+        if len(parts) == 1:
+            return parts[0]
+        merged = Block(*(np.concatenate([getattr(part, name) for part in parts]) for name in Block.__slots__))
+        if (np.diff(merged.ts) < 0).any():
+            # 圧縮後に古い時刻の計測値が届いた場合
+            order = np.argsort(merged.ts, kind='stable')
+            merged = Block(*(getattr(merged, name)[order] for name in Block.__slots__))
+        return merged
+
+    def readings(self, device, since=None, until=None):
+        """期間内の計測値を (ts, raw, percentage, status, filtered) のリストで返す"""
+        from .blocks import status_names
+
+        block = self.load(device, since, until)
+        filtered = [None if value != value else value for value in block.filtered.tolist()]
+        return list(zip(block.ts.tolist(), block.raw.tolist(), block.percentage.tolist(),
+                        status_names(block.status).tolist(), filtered))
+
+    def columns(self, device, since=None, until=None):
+        """期間内の (ts, レベル) をNumPy配列で返す（レベルはフィルタ後、なければボードの値）"""
+        block = self.load(device, since, until)
+        return block.ts, block.level()
+
+    def rollup_hours(self, device, since, until):
+        """期間内の1時間ごとの集計を作り直す（since・untilは時間の区切りに丸める）"""
+        import numpy as np
+        from .blocks import STATUS_CODES
+
+        since = since // HOUR * HOUR
+        until = -(-until // HOUR) * HOUR
+        block = self.load(device, since, until)
+        if not len(block):
+            return 0
+        level = block.level()
+        buckets = block.ts // HOUR * HOUR
+        starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+        ends = np.append(starts[1:], len(level))
+        rows = zip(buckets[starts].tolist(),
+                   (ends - starts).tolist(),
+                   np.minimum.reduceat(level, starts).tolist(),
+                   np.maximum.reduceat(level, starts).tolist(),
+                   (np.add.reduceat(level, starts) / (ends - starts)).tolist(),
+                   level[ends - 1].tolist(),
+                   np.add.reduceat(block.status == STATUS_CODES.index('red'), starts).tolist())
+        with self._lock, self._conn:
+            self._conn.executemany(ROLLUP_INSERT, ((device, *row) for row in rows))
+        return len(starts)
+
+    def rollup_day(self, device, day_start, day_end, refresh_hours=True):
+        """1日分の集計を1時間ごとの集計から作る（refresh_hours=Falseなら既存の1時間ごとの集計をそのまま使う）"""
+        if refresh_hours:
+            self.rollup_hours(device, day_start, day_end)
+        with self._lock, self._conn:
+            self._conn.execute(ROLLUP_DAY_QUERY, (day_start, device, day_start, day_end,
+                                                  device, day_start, day_end))
+
+    def rollups(self, device, period, since=None, until=None):
+        """集計を (start_ts, samples, min, max, mean, last, red_samples) のリストで返す"""
+        query = ("SELECT start_ts, samples, min, max, mean, last, red_samples FROM rollups "
+                 "WHERE device = ? AND period = ?")
+        params = [device, period]
+        if since is not None:
+            query += " AND start_ts >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND start_ts < ?"
+            params.append(until)
+        return self._reader().execute(query + " ORDER BY start_ts", params).fetchall()
+
+    def span(self, device):
+        """デバイスの計測値の最初と最後の時刻（なければ (None, None)）"""
+        self.spill(device)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MIN(low), MAX(high) FROM (SELECT MIN(ts) AS low, MAX(ts) AS high FROM readings "
+                "WHERE device = ? UNION ALL SELECT MIN(start_ts), MAX(end_ts) FROM blocks WHERE device = ?)",
+                (device, device)).fetchone()
+
+    def oldest_block(self, device):
+        """デバイスの最も古い圧縮ブロックの (start_ts, end_ts)（なければ None）"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT start_ts, end_ts FROM blocks WHERE device = ? ORDER BY start_ts LIMIT 1",
+                (device,)).fetchone()
+
+    def rebuild_rollups(self, device):
+        """デバイスの集計を作り直す（較正変更後など）
+
+        保持期間を過ぎて計測値を削除した時間の集計は残す（計測値のある最初の完全な1時間から作り直す）。
+        """
+        first, last = self.span(device)
+        if first is None:
+            return
+        first = -(-first // HOUR) * HOUR
+        with self._lock:
+            days = [row[0] for row in self._conn.execute(
+                "SELECT start_ts FROM rollups WHERE device = ? AND period = 'day' AND start_ts > ?",
+                (device, first - 24 * HOUR))]
+            with self._conn:
+                self._conn.execute("DELETE FROM rollups WHERE device = ? AND period = 'hour' AND start_ts >= ?",
+                                   (device, first))
+        self.rollup_hours(device, first, last + 1)
+        for day_start in days:
+            self.rollup_day(device, day_start, day_start + 24 * HOUR, refresh_hours=False)
+
+    def calibration(self, device):
+        """デバイスの最新の較正プロファイルを (id, 点列のJSON, 保存時刻) で返す（未設定ならNone）"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, points, created_ts FROM calibrations WHERE device = ? ORDER BY id DESC LIMIT 1",
+                (device,)).fetchone()
+
+    def save_calibration(self, device, points):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO calibrations (device, created_ts, points) VALUES (?, ?, ?)",
+                               (device, time.time(), points))
+
+    def seal_block(self, device, before):
+        """before より前の計測値からBLOCK_SAMPLES件をブロックに圧縮して行を削除（作ったらTrue）
+
+        ブロックにするのは件数がそろった時だけで、残りは次回に回す。
+        """
+        import numpy as np
+        from .blocks import BLOCK_SAMPLES, encode_block, encode_status
+
+        with self._lock:
+            rows = np.fromiter(self._conn.execute(
+                "SELECT rowid, ts, raw, percentage, status, IFNULL(filtered, 'nan') FROM readings "
+                "WHERE device = ? AND ts < ? ORDER BY ts LIMIT ?", (device, before, BLOCK_SAMPLES)),
+                dtype=[('rowid', 'i8'), ('ts', 'f8'), ('raw', 'i8'), ('percentage', 'i8'),
+                       ('status', 'U7'), ('filtered', 'f8')])
+        if len(rows) < BLOCK_SAMPLES:
+            return False
+        # 符号化はロックの外で行い、書き込みは1トランザクションで行う
+        data = encode_block(rows['ts'], rows['raw'], rows['percentage'],
+                            encode_status(rows['status']), rows['filtered'])
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blocks (device, start_ts, end_ts, count, data) VALUES (?, ?, ?, ?, ?)",
+                (device, float(rows['ts'][0]), float(rows['ts'][-1]), len(rows), data))
+            self._conn.executemany("DELETE FROM readings WHERE rowid = ?",
+                                   ((rowid,) for rowid in rows['rowid'].tolist()))
+        return True
+
+    def _keep_rollups(self, device, start, end):
+        """削除する区間 [start, end] の集計を先に作っておく（集計は計測値を削除しても残す）"""
+        hour = start // HOUR * HOUR
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT 1 FROM rollups WHERE device = ? AND period = 'hour' AND start_ts = ?",
+                (device, hour)).fetchone()
+        if done:
+            # 最初の1時間は前回の削除時に（その時点で揃っていた計測値で）集計済み
+            hour += HOUR
+        if hour <= end:
+            self.rollup_hours(device, hour, end)
+        day = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0, microsecond=0)
+        while True:
+            day_end = day + timedelta(days=1)
+            if day_end.timestamp() > end:
+                break
+            self.rollup_day(device, day.timestamp(), day_end.timestamp(), refresh_hours=False)
+            day = day_end
+
+    def prune_step(self, device, before):
+        """before より前の計測値を1ブロック分（ブロックがなければBLOCK_SAMPLES行まで）削除し、削除した件数を返す
+
+        集計は削除前に作っておき、ずっと残す。1回の削除は短いトランザクションで終わる。
+        """
+        from .blocks import BLOCK_SAMPLES
+
+        with self._lock:
+            block = self._conn.execute(
+                "SELECT start_ts, end_ts, count FROM blocks WHERE device = ? AND end_ts < ? "
+                "ORDER BY start_ts LIMIT 1", (device, before)).fetchone()
+            if block is None:
+                rows = self._conn.execute(
+                    "SELECT rowid, ts FROM readings WHERE device = ? AND ts < ? ORDER BY ts LIMIT ?",
+                    (device, before, BLOCK_SAMPLES)).fetchall()
+                if not rows:
+                    return 0
+        if block is not None:
+            start_ts, end_ts, count = block
+            self._keep_rollups(device, start_ts, end_ts)
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM blocks WHERE device = ? AND start_ts = ?", (device, start_ts))
+            self._forget(device, start_ts)
+            return count
+        self._keep_rollups(device, rows[0][1], rows[-1][1])
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM readings WHERE rowid = ?", ((row[0],) for row in rows))
+        return len(rows)
+
+    def vacuum_step(self, pages):
+        """空きページを最大pages件ファイルから返す（返したページ数、auto_vacuumが無効なDBでは0）"""
+        with self._lock:
+            if self._conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return 0
+            free = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                return 0
+            # execute() では1ページずつしか進まないので、executescript() で最後まで実行する
+            self._conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+            return free - self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def backup(self, dest):
+        """一時点の内容をdestに複製（計測値の書き込み・読み出しを止めない）"""
+        return backup_database(self.path, dest)
+
+    def recompute_levels(self, device, compute):
+        """デバイスの全計測値の percentage・status・filtered を計算し直す（較正変更時）
+
+        compute(生値, フィルタ後の値) は (percentage, status, filtered) の配列を返す
+        （フィルタ値なしはNaN）。ブロックは作り直して置き換える。
+        """
+        import numpy as np
+        from .blocks import encode_block, encode_status
+
+        # 同じプロセスのホット層の値は古い較正のままなので、書き出してから計算し直す
+        # （監視中のサービスのホット層は別プロセスなので、サービス側で recompute_since を行う）
+        self.drop_hot(device)
+        with self._lock:
+            starts = [row[0] for row in self._conn.execute(
+                "SELECT start_ts FROM blocks WHERE device = ? ORDER BY start_ts", (device,))]
+        count = 0
+        for start_ts in starts:
+            with self._lock:
+                block = self._decoded(self._conn, device, start_ts)
+            levels, statuses, filtered = compute(block.raw.astype(float), block.filtered.copy())
+            data = encode_block(block.ts, block.raw, levels, encode_status(statuses), filtered)
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE blocks SET data = ? WHERE device = ? AND start_ts = ?",
+                                   (data, device, start_ts))
+            self._forget(device, start_ts)
+            count += len(block)
+
+        with self._lock:
+            rows = np.fromiter(
+                self._conn.execute("SELECT rowid, raw, IFNULL(filtered, 'nan') FROM readings WHERE device = ?",
+                                   (device,)),
+                dtype=[('rowid', 'i8'), ('raw', 'f8'), ('filtered', 'f8')])
+        if len(rows):
+            levels, statuses, filtered = compute(rows['raw'], rows['filtered'].copy())
+            filtered = [None if value != value else value for value in filtered.tolist()]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "UPDATE readings SET percentage = ?, status = ?, filtered = ? WHERE rowid = ?",
+                    zip(levels.astype(int).tolist(), statuses.tolist(), filtered, rows['rowid'].tolist()))
+        return count + len(rows)
+
+    def recompute_since(self, device, since, compute):
+        """since 以降の未圧縮の行を生値から計算し直す（較正変更をサービスが検出した時）
+
+        compute(生値の配列) は時刻順の (percentage, status, filtered) の配列を返す。生値だけから
+        計算するので、既に新しい較正で計算し直された行が含まれていても結果は変わらない。
+        """
+        import numpy as np
+
+        self.spill(device)
+        with self._lock:
+            rows = np.fromiter(
+                self._conn.execute("SELECT rowid, raw FROM readings WHERE device = ? AND ts >= ? ORDER BY ts",
+                                   (device, since)),
+                dtype=[('rowid', 'i8'), ('raw', 'f8')])
+        if not len(rows):
+            return 0
+        levels, statuses, filtered = compute(rows['raw'])
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE readings SET percentage = ?, status = ?, filtered = ? WHERE rowid = ?",
+                zip(np.rint(levels).astype(int).tolist(), list(statuses), np.asarray(filtered).tolist(),
+                    rows['rowid'].tolist()))
+        # ホット層の古い値は捨てる（書き出し済みなので失われない）
+        self.drop_hot(device)
+        return len(rows)
+
+    def storage(self, device=None):
+        """保存量を {'blocks', 'sealed', 'block_bytes', 'rows'} で返す"""
+        where, params = ("WHERE device = ?", (device,)) if device is not None else ("", ())
+        with self._lock:
+            blocks, sealed, size = self._conn.execute(
+                f"SELECT COUNT(*), IFNULL(SUM(count), 0), IFNULL(SUM(LENGTH(data)), 0) FROM blocks {where}",
+                params).fetchone()
+            rows = self._conn.execute(f"SELECT COUNT(*) FROM readings {where}", params).fetchone()[0]
+        return {'blocks': blocks, 'sealed': sealed, 'block_bytes': size, 'rows': rows}
+
+    def gaps(self, device, since=None):
+        """欠損区間を (start_ts, end_ts, reason) のリストで返す"""
+        query = "SELECT start_ts, end_ts, reason FROM gaps WHERE device = ?"
+        params = [device]
+        if since is not None:
+            query += " AND (end_ts IS NULL OR end_ts >= ?)"
+            params.append(since)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY start_ts", params).fetchall()
+
+    def close(self):
+        """ホット層を書き出して閉じる（2回目以降は何もしない）"""
+        if self._closed:
+            return
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+
+def backup_database(path, dest):
+    """SQLiteのバックアップAPIでデータベースを複製し、複製のページ数を返す
+
+    別の接続から1ステップで複製するため、WALモードでは読み出しトランザクション1つ分の
+    一時点の内容になり、その間も他の接続の書き込みは止まらない（途中で書き込まれても
+    複製がやり直しにならない）。複製は一時ファイルに作ってから置き換える。
+    """
+    tmp_path = dest + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    source = sqlite3.connect(path)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target)
+        pages = target.execute("PRAGMA page_count").fetchone()[0]
+        if target.execute("PRAGMA quick_check").fetchone()[0] != 'ok':
+            raise sqlite3.DatabaseError(f"バックアップの検証に失敗しました: {dest}")
+        # 複製はWALを使わない単一ファイルにする
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+    os.replace(tmp_path, dest)
+    return pages
+
+
+def hot_window_samples():
+    """HOT_WINDOW_HOURS 時間分のホット層の件数（最も速い計測間隔で埋まっても時間分を保持する）"""
+    from .config import get_settings
+
+    settings = get_settings()
+    # ボードの既定は1秒ごと、計測間隔の自動調整では変化中の間隔まで速くなる
+    fastest = min(settings.sampling_intervals[0], 1.0) if settings.sampling_intervals else 1.0
+    return int(settings.hot_window_hours * HOUR / fastest)
+
+
+def get_history():
+    """履歴ストアを取得（初回のみデータベースを開く）"""
+    global _store
+    if _store is None:
+        from .config import get_settings
+        with _store_lock:
+            if _store is None:
+                data_dir = get_settings().data_dir
+                os.makedirs(data_dir, exist_ok=True)
+                _store = HistoryStore(os.path.join(data_dir, 'history.db'), hot_window=hot_window_samples())
+                # 終了時にホット層の未書き出し分を失わない（Ctrl+C・SIGTERMは monitor_serial でも閉じる）
+                atexit.register(close_history)
+    return _store
+
+
+def close_history():
+    """開いている履歴ストアのホット層を書き出して閉じる"""
+    if _store is not None:
+        _store.close()
@@ -0,0 +1,111 @@
+"""直近の計測値をメモリに保持するホット層（デバイスごとの固定長リングバッファ）
+
+1件あたりのメモリは一定（時刻8バイト + 生値・水分%・フィルタ後の値 各2バイト + 状態1バイト）で、
+追加はO(1)。書き込むのは計測スレッド1つだけで、読み出しはロックを取らない:
+書き込み件数(count)を読んでからコピーし、コピー後にもう一度countを読んで、その間に
+上書きされた可能性のある古い側を捨てる。ディスクへの書き出し(spill)がまだの計測値は
+上書きしないので、リングから外れた計測値は必ずディスクにある。
+"""
+
+import numpy as np
+
+from .blocks import Block, STATUS_CODES, status_code
+
+LEVEL_SCALE = 100   # 水分%の分解能（1/100 %、uint16に収める）
+MISSING = 0xFFFF    # フィルタ値なし
+LEVEL_MAX = (MISSING - 1) / LEVEL_SCALE
+
+
+class HotWindow:
+    """1デバイスの直近capacity件"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.raw = np.zeros(capacity, dtype=np.uint16)
+        self.percentage = np.zeros(capacity, dtype=np.uint16)
+        self.filtered = np.full(capacity, MISSING, dtype=np.uint16)
+        self.status = np.zeros(capacity, dtype=np.uint8)
+        self.count = 0     # 追加した件数（読み出しはこの値までを見る）
+        self.spilled = 0   # ディスクに書き出した件数
+        self.spilled_at = None
+
+    def append(self, ts, raw, percentage, status, filtered=None):
+        """計測値を1件追加（リングが書き出し待ちで埋まっている場合は呼び出し側で先に書き出す）"""
+        index = self.count % self.capacity
+        self.ts[index] = ts
+        self.raw[index] = min(max(int(raw), 0), MISSING)
+        self.percentage[index] = min(max(int(percentage), 0), MISSING)
+        self.status[index] = status_code(status)
+        self.filtered[index] = (MISSING if filtered is None
+                                else round(min(max(filtered, 0.0), LEVEL_MAX) * LEVEL_SCALE))
+        # 値を書いてから公開する
+        self.count += 1
+        if self.spilled_at is None:
+            self.spilled_at = ts
+
+    def unspilled(self):
+        """ディスクへの書き出しが済んでいない件数"""
+        return self.count - self.spilled
+
+    def _ts_at(self, index):
+        return self.ts[index % self.capacity]
+
+    def _search(self, value, low, high):
+        """論理位置 [low, high) で ts >= value となる最初の位置（二分探索）"""
+        while low < high:
+            middle = (low + high) // 2
+            if self._ts_at(middle) < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _copy(self, start, end):
+        positions = np.arange(start, end) % self.capacity
+        filtered = self.filtered[positions]
+        return Block(self.ts[positions], self.raw[positions].astype(np.int64),
+                     self.percentage[positions].astype(np.int64), self.status[positions],
+                     np.where(filtered == MISSING, np.nan, filtered / LEVEL_SCALE))
+
+    def snapshot(self, since=None, until=None):
+        """期間内の計測値を (Block, covered_from) で返す（ロックなし）
+
+        covered_from 以降の期間はこの結果だけで揃っている（それより前はディスクを読む、
+        期間内に1件もなければ無限大）。
+        """
+        count = self.count
+        # 書き込み中の1件が上書きするスロットも除く
+        oldest = max(0, count - self.capacity + 1)
+        start = oldest if since is None else self._search(since, oldest, count)
+        end = count if until is None else self._search(until, start, count)
+        block = self._copy(start, end)
+
+        # コピー中に上書きされたかもしれない古い側を捨てる
+        valid = max(0, self.count - self.capacity + 1)
+        if valid > start:
+            trimmed = min(valid, end) - start
+            block = Block(*(getattr(block, name)[trimmed:] for name in Block.__slots__))
+            start += trimmed
+        if start > valid:
+            # since より前の計測値もリングに残っているので、since 以降はすべてここにある
+            covered_from = since
+        elif len(block):
+            covered_from = float(block.ts[0])
+        else:
+            covered_from = float('inf')
+        return block, covered_from
+
+    def pending(self):
+        """書き出し待ちの計測値を (Block, 書き出し後のspilled) で返す"""
+        end = self.count
+        return self._copy(self.spilled, end), end
+
+    def rows(self, block):
+        """Blockを履歴の行 (ts, raw, percentage, status, filtered) の並びにする"""
+        statuses = np.array(STATUS_CODES)[block.status].tolist()
+        filtered = [None if value != value else value for value in block.filtered.tolist()]
+        return zip(block.ts.tolist(), block.raw.tolist(), block.percentage.tolist(), statuses, filtered)
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ('ts', 'raw', 'percentage', 'filtered', 'status'))
@@ -0,0 +1,157 @@
+"""LINE Messaging API送信"""
+
+from .config import get_settings
+from .ratelimit import limiter, PRIORITY_ALERT, PRIORITY_REPORT
+
+BROADCAST_URL = "https://api.line.me/v2/bot/message/broadcast"
+PUSH_URL = "https://api.line.me/v2/bot/message/push"
+MULTICAST_URL = "https://api.line.me/v2/bot/message/multicast"
+REPLY_URL = "https://api.line.me/v2/bot/message/reply"
+BOT_INFO_URL = "https://api.line.me/v2/bot/info"
+# マルチキャスト1回あたりの最大宛先数
+MULTICAST_MAX_RECIPIENTS = 500
+REQUEST_TIMEOUT = 10  # 秒
+
+# URLごとのレート制限エンドポイント名
+RATE_LIMIT_ENDPOINTS = {
+    BROADCAST_URL: 'line.broadcast',
+    PUSH_URL: 'line.push',
+    MULTICAST_URL: 'line.multicast',
+    REPLY_URL: 'line.reply',
+    BOT_INFO_URL: 'line.info',
+}
+
+
+def _headers(retry_key=None):
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {get_settings().channel_access_token}"
+    }
+    if retry_key:
+        # 同じキーでの再送はLINE側で重複排除される（409が返る）
+        headers["X-Line-Retry-Key"] = retry_key
+    return headers
+
+
+def _post(url, data, retry_key=None, priority=PRIORITY_REPORT, block=True):
+    """LINE APIにPOST（レート制限を通す。requestsは初回送信時に読み込む）
+
+    block=Falseの場合、トークン不足ならRateLimitedを送出する。
+    """
+    limiter.acquire(RATE_LIMIT_ENDPOINTS[url], priority, block)
+    import requests
+    return requests.post(url, headers=_headers(retry_key), json=data, timeout=REQUEST_TIMEOUT)
+
+
+def broadcast(messages, retry_key=None, priority=PRIORITY_REPORT, block=True):
+    """メッセージオブジェクトのリストをブロードキャストし、レスポンスを返す"""
+    return _post(BROADCAST_URL, {"messages": messages}, retry_key, priority, block)
+
+
+def multicast(user_ids, messages, retry_key=None, priority=PRIORITY_REPORT, block=True):
+    """最大500人のユーザーにメッセージを送信し、レスポンスを返す"""
+    return _post(MULTICAST_URL, {"to": list(user_ids), "messages": messages}, retry_key, priority, block)
+
+
+def reply(reply_token, messages):
+    """Webhookイベントに応答メッセージを送信し、レスポンスを返す"""
+    return _post(REPLY_URL, {"replyToken": reply_token, "messages": messages}, priority=PRIORITY_ALERT)
+
+
+def bot_info():
+    """ボットの情報を取得し、レスポンスを返す（メッセージを送らずにトークンを確認できる）"""
+    limiter.acquire(RATE_LIMIT_ENDPOINTS[BOT_INFO_URL], PRIORITY_ALERT)
+    import requests
+    return requests.get(BOT_INFO_URL, headers=_headers(), timeout=REQUEST_TIMEOUT)
+
+
+def text_message(text):
+    """テキストメッセージオブジェクト"""
+    return {"type": "text", "text": text}
+
+
+def image_message(image_url, preview_url=None):
+    """画像メッセージオブジェクト（プレビュー未指定時は元画像を使用）"""
+    return {
+        "type": "image",
+        "originalContentUrl": image_url,
+        "previewImageUrl": preview_url or image_url
+    }
+
+
+def send_line_message(message):
+    """LINE Messaging API経由でブロードキャストメッセージ送信"""
+    try:
+        response = _post(BROADCAST_URL, {"messages": [text_message(message)]})
+        if response.status_code == 200:
+            print(f"LINE送信成功: {message}")
+            return True
+        else:
+            print(f"LINE送信失敗: {response.status_code} - {response.text}")
+            return False
+    except Exception as e:
+        print(f"LINE送信エラー: {e}")
+        return False
+
+
+def send_line_image(image_url, preview_url=None):
+    """LINE Messaging API経由で画像送信"""
+    try:
+        response = _post(BROADCAST_URL, {"messages": [image_message(image_url, preview_url)]})
+        if response.status_code == 200:
+            print(f"LINE画像送信成功: {image_url}")
+            return True
+        else:
+            print(f"LINE画像送信失敗: {response.status_code} - {response.text}")
+            return False
+    except Exception as e:
+        print(f"LINE画像送信エラー: {e}")
+        return False
+
+
+def send_line_message_with_image(text, image_url=None):
+    """テキストと画像を同時送信"""
+    messages = [text_message(text)]
+    # 画像URLが指定されている場合は画像メッセージも追加
+    if image_url:
+        messages.append(image_message(image_url))
+
+    try:
+        response = _post(BROADCAST_URL, {"messages": messages})
+        if response.status_code == 200:
+            print(f"LINE送信成功: {text}" + (f" + 画像: {image_url}" if image_url else ""))
+            return True
+        else:
+            print(f"LINE送信失敗: {response.status_code} - {response.text}")
+            return False
+    except Exception as e:
+        print(f"LINE送信エラー: {e}")
+        return False
+
+
+def send_line_push_message(user_id, message):
+    """特定ユーザーにプッシュメッセージ送信"""
+    try:
+        response = _post(PUSH_URL, {"to": user_id, "messages": [text_message(message)]})
+        return response.status_code == 200
+    except Exception as e:
+        print(f"プッシュメッセージエラー: {e}")
+        return False
+
+
+def test_line_connection():
+    """LINE Messaging API接続テスト（ボット情報の取得で確認し、メッセージは送らない）"""
+    print("LINE Messaging API接続テスト中...")
+    try:
+        response = bot_info()
+        success = response.status_code == 200
+        if not success:
+            print(f"LINE接続テスト失敗: {response.status_code} - {response.text}")
+    except Exception as e:
+        print(f"LINE接続テストエラー: {e}")
+        success = False
+    if success:
+        print("✅ LINE接続成功")
+    else:
+        print("❌ LINE接続失敗 - トークンとボット設定を確認してください")
+    return success
@@ -0,0 +1,82 @@
+"""履歴の保守（圧縮・保持期間を過ぎた計測値の削除・空き領域の解放）
+
+1時間ごとに専用スレッドで実行する。作業は1ブロックずつの短いトランザクションに分け、
+ステップの間でSTEP_PAUSE秒休むので、計測値の書き込みやダッシュボードの読み出しを
+長く待たせない。集計（rollups）は削除せずずっと残す。
+"""
+
+import time
+import threading
+
+from .config import get_settings
+from .scheduler import scheduler
+
+DAY = 24 * 3600
+MAINTENANCE_DELAY = 60   # 時間の区切りから保守までの待ち（秒、集計のあとに行う）
+STEP_PAUSE = 0.05        # ステップの間に書き込みへ譲る時間（秒）
+VACUUM_PAGES = 256       # 1ステップで解放する空きページ数
+
+_running = threading.Lock()
+last_result = {}
+
+
+def compact(history, now, retention_days, pause=STEP_PAUSE):
+    """古い計測値の圧縮・保持期間を過ぎた計測値の削除・空き領域の解放を1ステップずつ行う"""
+    from .history import SEAL_AGE
+
+    result = {'sealed': 0, 'pruned': 0, 'freed_pages': 0}
+    history.flush()
+    cutoff = now - retention_days * DAY if retention_days else None
+    for device in history.devices():
+        while history.seal_block(device, now - SEAL_AGE):
+            result['sealed'] += 1
+            time.sleep(pause)
+        while cutoff is not None:
+            count = history.prune_step(device, cutoff)
+            if not count:
+                break
+            result['pruned'] += count
+            time.sleep(pause)
+    while True:
+        pages = history.vacuum_step(VACUUM_PAGES)
+        if not pages:
+            break
+        result['freed_pages'] += pages
+        time.sleep(pause)
+    return result
+
+
+def _run_in_background(now):
+    from .history import get_history
+
+    try:
+        started = time.perf_counter()
+        result = compact(get_history(), now, get_settings().raw_retention_days)
+        result['elapsed'] = round(time.perf_counter() - started, 2)
+        last_result.clear()
+        last_result.update(result, finished=time.time())
+        if result['sealed'] or result['pruned']:
+            print(f"🗜️ 履歴の保守: 圧縮 {result['sealed']}ブロック / 削除 {result['pruned']}件"
+                  f" / 解放 {result['freed_pages']}ページ ({result['elapsed']}秒)")
+    except Exception as e:
+        print(f"❌ 履歴の保守に失敗しました: {e}")
+    finally:
+        _running.release()
+
+
+def run_maintenance(hour_start):
+    """保守を専用スレッドで開始して次回を予約（前回がまだ動いていれば今回は飛ばす）"""
+    try:
+        if _running.acquire(blocking=False):
+            threading.Thread(target=_run_in_background, args=(time.time(),),
+                             name='maintenance', daemon=True).start()
+    finally:
+        next_hour = hour_start + 3600
+        scheduler.schedule(('maintenance',), next_hour + MAINTENANCE_DELAY, run_maintenance, next_hour)
+
+
+def start():
+    """1時間ごとの保守を予約（起動直後にも1回行う）"""
+    hour_start = time.time() // 3600 * 3600
+    scheduler.schedule(('maintenance',), time.time() + MAINTENANCE_DELAY, run_maintenance, hour_start)
+    return get_settings().raw_retention_days
@@ -0,0 +1,142 @@
+"""LINE通知メッセージの生成（状態ごとのテンプレートとキャッシュ）"""
+
+import time
+
+from .arduino import classify_status
+
+# 状態ごとのメッセージテンプレート
+STATUS_TEMPLATES = {
+    'red': "🔴 植物の水分不足 ({clock})\n💧 水分レベル: {percentage}%\n⚠️ 水やりが必要です！",
+    'yellow': "🟡 植物の水分は適度 ({clock})\n💧 水分レベル: {percentage}%\n✅ 良好な状態です",
+    'green': "🟢 植物の水分は十分 ({clock})\n💧 水分レベル: {percentage}%\n🎉 完璧な状態です！",
+}
+PERIODIC_TEMPLATE = "📊 定期レポート\n{status_message}{forecast}\n\n最終受信: {last_seen}"
+DIGEST_TEMPLATE = ("📅 日次ダイジェスト ({device})\n"
+                   "💧 現在: {last}%（平均 {mean}% / 最低 {min}% / 最高 {max}%）\n"
+                   "🔴 水分不足: {red}\n"
+                   "🚿 水やり: {waterings}回{forecast}")
+FORECAST_TEMPLATE = "\n📉 乾燥ペース: {drying_rate}%/時間\n⏰ 水やり目安: {eta}"
+# 複数デバイスの状態変化をまとめた通知（状態ごとの見出し）
+GROUP_HEADINGS = {
+    'red': "🔴 {count}鉢の植物が水分不足 ({clock})",
+    'yellow': "🟡 {count}鉢の植物の水分が適度になりました ({clock})",
+    'green': "🟢 {count}鉢の植物の水分が十分になりました ({clock})",
+}
+GROUP_FOOTERS = {
+    'red': "⚠️ 水やりが必要です！",
+    'yellow': "✅ 良好な状態です",
+    'green': "🎉 完璧な状態です！",
+}
+GROUP_MAX_LISTED = 10  # 1つの状態で名前を並べる最大数
+RULE_TEMPLATE = "📏 {name} ({clock})\n🌱 {device}\n💧 水分レベル: {percentage}%"
+WATER_SOON_TEMPLATE = "⏳ {device} は{eta}に水分不足になりそう\n💧 水分レベル: {percentage}%\n📉 乾燥ペース: {drying_rate}%/時間\n🚿 早めの水やりがおすすめです"
+
+# テンプレートは起動時に一度だけ束縛しておく
+_renderers = {status: template.format for status, template in STATUS_TEMPLATES.items()}
+_render_periodic = PERIODIC_TEMPLATE.format
+
+_clock = (None, '')  # (エポックからの分, "HH:MM")
+_cache = {}          # status -> (percentage, 分, 描画済みテキスト)
+
+
+def _current_clock():
+    """現在時刻の "HH:MM"（strftimeは分が変わった時だけ呼ぶ）"""
+    global _clock
+    minute = int(time.time() // 60)
+    if _clock[0] != minute:
+        _clock = (minute, time.strftime("%H:%M"))
+    return _clock
+
+
+def render_status_message(percentage, status=None, ts=None):
+    """水分レベルのメッセージを描画（tsは表示する時刻、省略時は現在時刻。同じ状態・値・分なら描画済みのものを返す）"""
+    status = status or classify_status(percentage)
+    if ts is None:
+        minute, clock = _current_clock()
+    else:
+        minute, clock = int(ts // 60), None
+    cached = _cache.get(status)
+    if cached is not None and cached[0] == percentage and cached[1] == minute:
+        return cached[2]
+    if clock is None:
+        clock = time.strftime("%H:%M", time.localtime(ts))
+    text = _renderers[status](clock=clock, percentage=percentage)
+    _cache[status] = (percentage, minute, text)
+    return text
+
+
+def get_water_status_message(raw_value, percentage):
+    """水分レベルに応じたLINEメッセージを生成"""
+    return render_status_message(percentage)
+
+
+def format_eta(hours):
+    """水やりまでの時間を表示用の文字列に"""
+    if hours <= 0:
+        return "今すぐ"
+    if hours < 1:
+        return f"約{max(1, round(hours * 60))}分後"
+    if hours < 48:
+        return f"約{round(hours)}時間後"
+    return f"約{round(hours / 24)}日後"
+
+
+def format_forecast(analytics):
+    """乾燥ペースと水やり目安の行（推定できていなければ空文字）"""
+    if not analytics or analytics.get('hours_to_dry') is None:
+        return ''
+    return FORECAST_TEMPLATE.format(drying_rate=analytics['drying_rate'],
+                                    eta=format_eta(analytics['hours_to_dry']))
+
+
+def get_periodic_report_message(raw_value, percentage, analytics=None, last_seen=None):
+    """定期レポートのメッセージを生成"""
+    status_message = render_status_message(percentage, ts=last_seen)
+    last_seen = time.strftime("%m/%d %H:%M", time.localtime(last_seen)) if last_seen else "--"
+    return _render_periodic(status_message=status_message,
+                            forecast=format_forecast(analytics),
+                            last_seen=last_seen)
+
+
+def get_digest_message(device, digest, analytics=None):
+    """日次ダイジェストのメッセージを生成"""
+    red_hours = digest['red_hours']
+    return DIGEST_TEMPLATE.format(
+        device=device, last=round(digest['last']), mean=round(digest['mean']),
+        min=round(digest['min']), max=round(digest['max']),
+        red="なし" if red_hours < 0.05 else f"約{red_hours:.1f}時間",
+        waterings=digest['waterings'], forecast=format_forecast(analytics))
+
+
+def get_status_summary_message(transitions):
+    """複数デバイスの状態変化を1通にまとめたメッセージを生成（device -> {'status', 'percentage'}）"""
+    if len(transitions) == 1:
+        (entry,) = transitions.values()
+        return render_status_message(entry['percentage'], entry['status'], entry.get('ts'))
+
+    _, clock = _current_clock()
+    sections = []
+    for status in ('red', 'yellow', 'green'):
+        devices = sorted(d for d, entry in transitions.items() if entry['status'] == status)
+        if not devices:
+            continue
+        lines = [GROUP_HEADINGS[status].format(count=len(devices), clock=clock)]
+        lines += [f"・{device} {transitions[device]['percentage']}%" for device in devices[:GROUP_MAX_LISTED]]
+        if len(devices) > GROUP_MAX_LISTED:
+            lines.append(f"…ほか{len(devices) - GROUP_MAX_LISTED}件")
+        lines.append(GROUP_FOOTERS[status])
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+def get_rule_alert_message(device, name, percentage):
+    """ユーザー定義ルールの発火を知らせるメッセージを生成"""
+    _, clock = _current_clock()
+    return RULE_TEMPLATE.format(name=name, clock=clock, device=device, percentage=percentage)
+
+
+def get_water_soon_message(device, percentage, analytics):
+    """水分不足が近いことを知らせる事前通知のメッセージを生成"""
+    return WATER_SOON_TEMPLATE.format(device=device, eta=format_eta(analytics['hours_to_dry']),
+                                      percentage='--' if percentage is None else percentage,
+                                      drying_rate=analytics['drying_rate'])
@@ -0,0 +1,371 @@
+"""監視モード（旧 main.py / main2.py / main4.py の動作）"""
+
+import time
+import signal
+import threading
+
+from . import control, forecast, maintenance, outbox, profiling, readiness, reports, state
+from .arduino import SerialLink, parse_arduino_data, classify_status
+from .config import get_settings
+from .filters import build_filter_chain
+from .line import test_line_connection
+from .notify import queue_notification, send_status_report, send_rule_alert
+from .sampling import HEARTBEAT_LINE, LIVENESS_FACTOR, AdaptiveSampler, ChangeReporting, Liveness
+from .scheduler import scheduler
+
+MODES = ('alert', 'level', 'dashboard')
+
+CALIBRATION_CHECK_INTERVAL = 60  # 較正プロファイルの変更を確認する間隔（秒）
+# 較正の変更を検出した時に計算し直す範囲（保存時刻のこの秒数前から、ホット層から遅れて書き出された分を含める）
+CALIBRATION_RECOMPUTE_MARGIN = 300
+
+
+def start_web_server(dashboard=False):
+    """Webサーバーをデーモンスレッドで起動（ソケットのバインド完了で準備完了）"""
+    from .web import make_web_server
+
+    settings = get_settings()
+    try:
+        server = make_web_server(dashboard)
+    except OSError as e:
+        print(f"❌ Webサーバー起動失敗: {e}")
+        readiness.mark('web', False, str(e))
+        return None
+    readiness.mark_once('web', f"{settings.web_host}:{settings.web_port}")
+
+    flask_thread = threading.Thread(target=server.serve_forever, name='web')
+    flask_thread.daemon = True
+    flask_thread.start()
+    return server
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def monitor_serial(handle_line, ready_message, connected=None):
+    """Arduinoからの受信行を1行ずつ処理（切断時は自動で再接続、connected(link)は接続ごとに呼ぶ）"""
+    from .history import get_history, close_history
+
+    settings = get_settings()
+    # supervisor などからの停止（SIGTERM）も Ctrl+C と同じように終了処理をする
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    def on_connect(link):
+        readiness.mark_once('serial_open', link.port)
+        print(ready_message)
+        if connected is not None:
+            connected(link)
+
+    link = SerialLink(settings.arduino_port, settings.device_id, get_history(), on_connect)
+    lines = link.readlines()
+
+    while True:
+        try:
+            with profiling.stage('read'):
+                raw_line = next(lines)
+            with profiling.stage('decode'):
+                line = raw_line.decode().strip()
+            if line:
+                print(f"受信: {line}")
+                # DTRリセット完了（バナー受信）または計測値の受信で準備完了（リセット中の途切れた行は数えない）
+                if not readiness.is_marked('serial_ready') and (
+                        line.startswith(readiness.SERIAL_BANNER) or parse_arduino_data(line)[0] is not None):
+                    readiness.mark_once('serial_ready', line)
+                handle_line(line)
+
+        except KeyboardInterrupt:
+            print("\n監視を終了します")
+            if profiling.PROFILE_ENABLED:
+                profiling.print_summary()
+            # ホット層の未書き出し分をディスクへ
+            close_history()
+            break
+        except UnicodeDecodeError as e:
+            print(f"文字エンコードエラー: {e}")
+        except Exception as e:
+            print(f"読み取りエラー: {e}")
+
+
+def check_line_in_background(message):
+    """LINE接続テストをバックグラウンドで実行し、起動の通知を宛先（NOTIFY_MODE）に従ってアウトボックスへ追加"""
+    def check():
+        queue_notification('startup', message)
+        success = test_line_connection()
+        if not success:
+            print("LINE接続に問題があります。続行します（通知はアウトボックスから再送を試みます）。")
+        return success
+
+    return readiness.run_in_background('line', check)
+
+
+def handle_alert_line(line):
+    """ファームウェアの状態変化メッセージを検出して通知（旧 main.py）"""
+    settings = get_settings()
+
+    # 緑状態の検出
+    if "🟢 適度な水分状態になりました" in line:
+        print("🔔 緑状態検出！LINE通知を送信中...")
+        message = "🟢 植物の水分が適度になりました！\n水やりのタイミングです。"
+        # 画像付きメッセージを送信
+        queue_notification('alert', message, settings.image_url if settings.https_enabled else None)
+
+    # 青状態の検出
+    elif "🔵 十分な水量になりました" in line:
+        print("🔔 青状態検出！完了通知を送信中...")
+        queue_notification('alert', "🔵 水やり完了！\n十分な水量になりました。🎵")
+
+
+class LevelMonitor:
+    """水分レベルの状態変化と定期レポートを通知（旧 main2.py / main4.py）"""
+
+    def __init__(self, dashboard=False):
+        from .analytics import get_trend
+        from .calibration import CalibrationProfile
+        from .history import get_history
+        from .rules import get_engine
+
+        settings = get_settings()
+        self.dashboard = dashboard
+        self.device_id = settings.device_id
+        self.history = get_history()
+        # 解析と状態判定の間に通すフィルタ（デバイスごとに状態を持つ）
+        self.filter = build_filter_chain(settings.ingest_filters)
+        # 乾燥ペース・水やり目安の解析（直近の履歴を読み込んでから追記していく）
+        self.trend = get_trend(self.device_id)
+        # ユーザー定義のアラートルール（デバイスごとに索引済み）
+        self.rules = get_engine()
+        # 較正プロファイル（未設定ならボードが変換した値を使い、生値だけの行は既定のカーブで変換）
+        self.default_calibration = CalibrationProfile()
+        self.calibration = None
+        self.calibration_id = None
+        self.calibration_loaded = False  # 起動後に一度読み込んだか（以降の変更は履歴も計算し直す）
+        self.calibration_checked = 0.0
+        self.last_status = None
+        self.last_reading = None  # 最後に受信した (生値, レベル, フィルタ後の値)
+        # ボードの設定（接続時に attach される）: 水分の変化に合わせた計測間隔と、変化時のみの送信
+        self.board_settings = []
+        if settings.sampling_intervals:
+            self.board_settings.append(AdaptiveSampler(*settings.sampling_intervals))
+        heartbeat = 1.0
+        if settings.report_on_change:
+            deadband, heartbeat = settings.report_on_change
+            self.board_settings.append(ChangeReporting(deadband, heartbeat))
+        # ハートビート（または計測値）が途絶えたら欠損区間として記録
+        slowest = max(heartbeat, settings.sampling_intervals[1] if settings.sampling_intervals else 1.0)
+        self.liveness = Liveness(self.device_id, LIVENESS_FACTOR * slowest, self.history, scheduler)
+        # ダッシュボードからの操作コマンド（ブザー・サーボ・表示）
+        self.control = control.get_channel(self.device_id)
+
+    def attach(self, link):
+        """シリアル接続（再接続）時の処理"""
+        for part in self.board_settings:
+            part.attach(link)
+        self.control.attach(link)
+
+    def _reload_calibration(self):
+        """較正プロファイルが変更されていれば読み込み直す（CLIなど別プロセスからの変更に追従）"""
+        from .analytics import reload_trend
+        from .calibration import CalibrationProfile
+
+        stored = self.history.calibration(self.device_id)
+        stored_id = stored[0] if stored else None
+        if self.calibration_loaded and stored_id == self.calibration_id:
+            return
+        changed = self.calibration_loaded
+        self.calibration_loaded = True
+        self.calibration_id = stored_id
+        self.calibration = CalibrationProfile.from_json(stored[1]) if stored else None
+        print(f"📐 較正プロファイル: {self.calibration or 'ボードの値を使用'}")
+        if changed:
+            # 履歴は別プロセス（--calibrate）で計算し直されているが、その後にこのプロセスが古いカーブで
+            # 書いた行（ホット層を含む）が残るので、保存時刻より少し前から生値で計算し直す
+            if stored is not None:
+                since = stored[2] - CALIBRATION_RECOMPUTE_MARGIN
+                count = self.history.recompute_since(self.device_id, since, self._recompute)
+                if count:
+                    self.history.rollup_hours(self.device_id, since, time.time())
+            # フィルタと解析も作り直す
+            self.filter = build_filter_chain(get_settings().ingest_filters)
+            self.trend = reload_trend(self.device_id)
+
+    def _recompute(self, raws):
+        """生値の配列を現在の較正・新しいフィルタで (percentage, status, filtered) にする"""
+        chain = build_filter_chain(get_settings().ingest_filters)
+        levels = [self.calibration(raw) for raw in raws.tolist()]
+        filtered = [chain(level) for level in levels]
+        return levels, [classify_status(round(value)) for value in filtered], filtered
+
+    def record(self, current_time, raw_value, level, filtered):
+        """計測値1件を履歴・解析・ルール・通知に反映"""
+        for part in self.board_settings:
+            part.observe(current_time, level)
+        percentage = round(filtered)
+
+        # 状態変化の検出
+        current_status = classify_status(percentage)
+        self.history.append_reading(self.device_id, current_time, raw_value, round(level), current_status, filtered)
+        state.record(self.device_id, raw_value, percentage, current_status, current_time)
+        self.trend.append(current_time, filtered)
+        with profiling.stage('rules'):
+            fired = self.rules.evaluate(self.device_id, current_time, filtered)
+        for rule in fired:
+            send_rule_alert(self.device_id, rule, percentage)
+        # 乾燥ペースの推定が更新されたら事前通知の予定を立て直す
+        forecast.watch(self.device_id, self.trend.summary(current_time))
+
+        if self.dashboard:
+            from .dashboard import update_current_data
+            # Webダッシュボードのデータを常時更新
+            with profiling.stage('update_current_data'):
+                update_current_data(raw_value, percentage)
+
+        # 状態が変わった場合に通知
+        if current_status != self.last_status and self.last_status is not None:
+            print(f"🔔 状態変化検出: {self.last_status} → {current_status}")
+            with profiling.stage('send_status_report'):
+                send_status_report(raw_value, percentage, current_status, self.device_id, self.last_status)
+
+        self.last_status = current_status
+
+    def calibrate(self, raw_value, reported, now):
+        """生値を水分%に変換"""
+        if now - self.calibration_checked >= CALIBRATION_CHECK_INTERVAL:
+            self.calibration_checked = now
+            self._reload_calibration()
+        if self.calibration is not None:
+            return self.calibration(raw_value)
+        if reported is not None:
+            return reported
+        return self.default_calibration(raw_value)
+
+    def handle_line(self, line):
+        current_time = time.time()
+        if self.liveness is not None:
+            self.liveness.seen(current_time)
+
+        # ボードからのコマンド応答（起動メッセージは全ての設定に伝える）
+        if self.control.handle_line(line):
+            return
+        if any([part.handle_line(line) for part in self.board_settings]):
+            return
+        if line == HEARTBEAT_LINE:
+            # 変化がない間は最後の計測値が続いているとみなして記録する
+            if self.last_reading is not None:
+                self.record(current_time, *self.last_reading)
+            return
+
+        # 水分データの解析
+        with profiling.stage('parse_arduino_data'):
+            raw_value, reported = parse_arduino_data(line)
+        if raw_value is not None:
+            level = self.calibrate(raw_value, reported, current_time)
+            readiness.mark_once('first_reading', f"{level:g}%")
+
+            # 平滑化・外れ値除去したレベルで状態を判定
+            with profiling.stage('filter'):
+                filtered = self.filter(level)
+            self.last_reading = (raw_value, level, filtered)
+            self.record(current_time, raw_value, level, filtered)
+
+        # 特定状態メッセージの検出（バックアップ）
+        if "🟡 適度な水分状態になりました" in line:
+            print("🔔 黄色状態検出！")
+
+        elif "🟢 十分な水量になりました" in line:
+            print("🔔 緑状態検出！")
+
+
+def run_alert():
+    """状態変化メッセージ検出モード（旧 main.py）"""
+    settings = get_settings()
+    print(f"Arduino監視開始: {settings.arduino_port}")
+    print(f"Channel Access Token設定: {'OK' if settings.channel_access_token else 'NG'}")
+    print(f"画像サーバーURL: {settings.server_url}")
+
+    if not settings.channel_access_token:
+        print("❌ CHANNEL_ACCESS_TOKENが設定されていません")
+        print(".envファイルにCHANNEL_ACCESS_TOKEN=your_token_hereを追加してください")
+        return
+
+    readiness.start()
+    outbox.get_outbox().start()
+
+    # Flaskサーバーをバックグラウンドで起動
+    print("🌐 画像配信サーバーを起動中...")
+    start_web_server()
+
+    # LINE接続テスト（計測値の処理を待たせないようバックグラウンドで実行）
+    check_line_in_background("🧪 Arduino水分センサーシステムが開始されました")
+
+    # 画像送信準備完了メッセージ
+    if settings.https_enabled:
+        print("✅ 画像送信機能: 有効（緑状態検出時にohana.pngを送信）")
+    else:
+        print("⚠️ 画像送信機能: 無効（HTTPS URLが必要）")
+
+    monitor_serial(handle_alert_line, "Arduino接続成功！緑/青状態になるとLINE通知します。")
+
+
+def run_level(dashboard=False):
+    """水分レベル監視モード（旧 main2.py、dashboard=Trueで旧 main4.py）"""
+    settings = get_settings()
+    print(f"🌱 AquaSync 水分レベル監視システム 🌱")
+    print(f"Arduino監視開始: {settings.arduino_port}")
+    print(f"Channel Access Token設定: {'OK' if settings.channel_access_token else 'NG'}")
+    if dashboard:
+        print(f"Gemini API Key設定: {'OK' if settings.gemini_api_key else 'NG'}")
+    print(f"画像サーバーURL: {settings.server_url}")
+    if profiling.PROFILE_ENABLED:
+        print("⏱️ プロファイリング: 有効（/api/profile で確認できます）")
+
+    if not settings.channel_access_token:
+        print("❌ CHANNEL_ACCESS_TOKENが設定されていません")
+        return
+
+    readiness.start()
+    outbox.get_outbox().start()
+    scheduler.start()
+
+    if dashboard:
+        from . import dashboard as dashboard_state
+
+        if dashboard_state.character_enabled:
+            # 初期キャラクターメッセージはバックグラウンドで生成
+            readiness.run_in_background('gemini', dashboard_state.init_character_message)
+
+        print("🌐 Webダッシュボードサーバーを起動中...")
+        start_web_server(dashboard=True)
+        print(f"🌐 Webダッシュボード: http://localhost:{settings.web_port}")
+    else:
+        print("🌐 画像配信サーバーを起動中...")
+        start_web_server()
+
+    # LINE接続テスト（計測値の処理を待たせないようバックグラウンドで実行）
+    check_line_in_background("🌱 AquaSync水分監視システムが開始されました\n定期的に植物の状態をお知らせします")
+
+    print("✅ システム準備完了")
+    if settings.water_soon_lead:
+        print(f"⏳ 水分不足の{settings.water_soon_lead:g}時間前に事前通知します")
+    # 定期レポートは計測値の受信とは独立にスケジューラから配信
+    for recipient, entry in reports.start().items():
+        print(f"📊 定期レポート: {recipient} ← {entry['cron']} ({entry['mode']})")
+    if settings.quiet_hours:
+        print(f"🌙 静音時間: {settings.quiet_hours}時（定期レポートは終了後に配信）")
+    # 古い計測値の圧縮・削除は専用スレッドで少しずつ行う
+    retention_days = maintenance.start()
+    if retention_days:
+        print(f"🗜️ 計測値の保持期間: {retention_days:g}日（集計は削除しません）")
+
+    monitor = LevelMonitor(dashboard)
+    monitor_serial(monitor.handle_line, "Arduino接続成功！水分監視を開始します。", monitor.attach)
+
+
+def run(mode):
+    """指定モードで監視を開始"""
+    if mode == 'alert':
+        run_alert()
+    elif mode == 'level':
+        run_level()
+    else:
+        run_level(dashboard=True)
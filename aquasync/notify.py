@@ -0,0 +1,130 @@
+"""水分状態に応じたLINE通知"""
+
+import os
+
+from . import outbox
+from .config import get_settings
+from .line import text_message, image_message
+from .messages import (render_status_message, get_periodic_report_message, get_digest_message,
+                       get_status_summary_message, get_rule_alert_message)
+from .subscriptions import get_registry
+
+
+def notification_recipients(device):
+    """デバイスの通知の宛先（NOTIFY_MODE=broadcastならNone=全員、subscribersなら購読ユーザーのリスト）"""
+    if get_settings().notify_mode == 'broadcast':
+        return None
+    return get_registry().recipients(device)
+
+
+def queue_notification(kind, text, image_url=None, device=None):
+    """テキスト（と画像）の通知を宛先（NOTIFY_MODE）に従ってアウトボックスへ追加"""
+    device = device or get_settings().device_id
+    recipients = notification_recipients(device)
+    if recipients == []:
+        print(f"📭 {device} の購読ユーザーがいないため通知をスキップ ({kind})")
+        return False
+
+    messages = [text_message(text)]
+    if image_url:
+        messages.append(image_message(image_url))
+    outbox.enqueue(kind, messages, recipients=recipients)
+    target = "全員" if recipients is None else f"{len(recipients)}人"
+    print(f"📮 通知をキューに追加 ({kind} → {target})")
+    return True
+
+
+def status_image_url(status_type):
+    """状態通知に添付する画像のURL（十分な水分状態の時だけ、送れなければNone）"""
+    if status_type != "green":  # 十分な水分状態（60%以上）
+        return None
+    settings = get_settings()
+    # ohana.pngファイルの存在確認
+    image_path = settings.image_path
+    if os.path.exists(image_path) and settings.https_enabled:
+        print(f"画像送信準備: {image_path} -> {settings.image_url}")
+        return settings.image_url
+    if not os.path.exists(image_path):
+        print(f"⚠️ 画像ファイルが見つかりません: {image_path}")
+    if not settings.https_enabled:
+        print("⚠️ HTTPS URLが必要です")
+    return None
+
+
+def send_status_report(raw_value, percentage, status_type, device=None, previous=None):
+    """状態に応じたLINE通知を送信（ALERT_GROUP_WINDOWの間は他のデバイスとまとめる）"""
+    settings = get_settings()
+    device = device or settings.device_id
+    if settings.alert_group_window > 0:
+        from .alerts import add_transition
+        add_transition(device, raw_value, percentage, status_type, previous, settings.alert_group_window)
+        return True
+
+    # ダッシュボードと同じ描画済みメッセージを使う
+    message = render_status_message(percentage, status_type)
+    return queue_notification('status', message, status_image_url(status_type), device=device)
+
+
+def send_status_summary(transitions):
+    """まとめた状態変化を通知（同じデバイスの組み合わせを購読するユーザーごとに1通）"""
+    # 添付する画像は1枚だけ
+    image_url = status_image_url('green') if any(
+        entry['status'] == 'green' for entry in transitions.values()) else None
+
+    # 購読デバイスの組み合わせ -> ユーザーID（NOTIFY_MODE=broadcastなら全デバイスを1通でブロードキャスト）
+    if get_settings().notify_mode == 'broadcast':
+        groups = {tuple(transitions): None}
+    else:
+        devices_by_user = {}
+        for device in transitions:
+            for user_id in notification_recipients(device):
+                devices_by_user.setdefault(user_id, []).append(device)
+        groups = {}
+        for user_id, devices in devices_by_user.items():
+            groups.setdefault(tuple(devices), []).append(user_id)
+
+    if not groups:
+        print(f"📭 購読ユーザーがいないため状態変化の通知をスキップ ({len(transitions)}台)")
+        return False
+    for devices, recipients in groups.items():
+        summary = {device: transitions[device] for device in devices}
+        messages = [text_message(get_status_summary_message(summary))]
+        if image_url and any(entry['status'] == 'green' for entry in summary.values()):
+            messages.append(image_message(image_url))
+        outbox.enqueue('status', messages, recipients=recipients)
+    print(f"📮 状態変化 {len(transitions)}台分を{len(groups)}通にまとめてキューに追加")
+    return True
+
+
+def send_rule_alert(device, rule, percentage):
+    """ユーザー定義ルールの発火を通知"""
+    print(f"📏 ルール発火: {device} {rule.spec}")
+    return queue_notification(f'rule:{device}', get_rule_alert_message(device, rule.name, percentage),
+                              device=device)
+
+
+def send_scheduled_report(device, mode, recipient=None):
+    """スケジュールされた定期レポート・日次ダイジェストを送信（recipient未指定時は購読ユーザー全員）"""
+    from . import analytics, state
+    from .reports import digest_summary
+
+    forecast = analytics.summary(device)
+    if mode == 'digest':
+        digest = digest_summary(device)
+        if digest is None:
+            print(f"📭 {device} の計測値がないためダイジェストをスキップ")
+            return False
+        message = get_digest_message(device, digest, forecast)
+    else:
+        latest = state.get(device)
+        if latest is None:
+            print(f"📭 {device} の計測値がないため定期レポートをスキップ")
+            return False
+        message = get_periodic_report_message(latest['raw_value'], latest['percentage'], forecast, latest['ts'])
+
+    # 未送信の古いレポートは最新のものに置き換わる（宛先ごと）
+    if recipient is None:
+        return queue_notification(f'{mode}:{device}', message, device=device)
+    outbox.enqueue(f'{mode}:{device}:{recipient}', [text_message(message)], recipients=[recipient])
+    print(f"📮 通知をキューに追加 ({mode}:{device} → {recipient})")
+    return True
@@ -0,0 +1,250 @@
+"""LINE通知の永続アウトボックス（再起動・通信障害時も通知を失わない）"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from .ratelimit import RateLimited, PRIORITY_ALERT, PRIORITY_REPORT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    messages TEXT NOT NULL,
+    recipients TEXT,
+    created_ts REAL NOT NULL,
+    next_attempt_ts REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    done_ts REAL,
+    last_error TEXT,
+    batch TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (state, next_attempt_ts);
+"""
+
+# 古い未送信分を送らず最新の1件だけ残す通知種別（"periodic:plant1" のようにデバイスごと）
+COMPACTED_KINDS = ('periodic', 'report', 'digest', 'water_soon', 'startup')
+
+# 通知種別ごとのレート制限の優先度
+KIND_PRIORITIES = {
+    'status': PRIORITY_ALERT,
+    'alert': PRIORITY_ALERT,
+    'periodic': PRIORITY_REPORT,
+    'report': PRIORITY_REPORT,
+    'digest': PRIORITY_REPORT,
+    'water_soon': PRIORITY_ALERT,
+    'rule': PRIORITY_ALERT,
+}
+
+RETRY_BASE_DELAY = 5.0
+RETRY_MAX_DELAY = 600.0
+# 4xxエラー（429以外）はこの回数で送信を諦める
+MAX_CLIENT_ERROR_ATTEMPTS = 3
+# 送信済みレコードの保持期間（秒）
+DONE_RETENTION = 7 * 24 * 3600
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def is_compacted(kind):
+    """最新の1件だけ送ればよい通知種別か"""
+    return kind.split(':', 1)[0] in COMPACTED_KINDS
+
+
+class Outbox:
+    """SQLiteに保存する送信待ち通知キュー"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _migrate(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if 'recipients' not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE outbox ADD COLUMN recipients TEXT")
+        if 'batch' not in columns:
+            # 1回の登録（500人ずつに分割した全チャンク）をまとめるキー（古いレコードはNULL＝key単位）
+            with self._conn:
+                self._conn.execute("ALTER TABLE outbox ADD COLUMN batch TEXT")
+
+    def enqueue(self, kind, messages, key=None, recipients=None):
+        """通知をキューに追加（同じキーは1回だけ登録される）
+
+        recipientsがNoneの場合はブロードキャスト、ユーザーIDのリストの場合は
+        500人ずつのマルチキャストに分割して登録する。
+        """
+        from .line import MULTICAST_MAX_RECIPIENTS
+
+        key = key or str(uuid.uuid4())
+        if recipients is None:
+            rows = [(key, None)]
+        else:
+            chunks = [recipients[i:i + MULTICAST_MAX_RECIPIENTS]
+                      for i in range(0, len(recipients), MULTICAST_MAX_RECIPIENTS)]
+            # チャンクごとに再送キーを分ける（LINEのリトライキーはUUID形式が必要）
+            rows = [(key if i == 0 else str(uuid.uuid5(uuid.UUID(key), str(i))), json.dumps(chunk))
+                    for i, chunk in enumerate(chunks)]
+
+        now = time.time()
+        payload = json.dumps(messages, ensure_ascii=False)
+        with self._lock, self._conn:
+            if is_compacted(kind):
+                # 未送信の古い定期レポートは最新のものに置き換える（同じ登録の再実行は残す）
+                self._conn.execute(
+                    "UPDATE outbox SET state = 'superseded', done_ts = ? "
+                    "WHERE kind = ? AND state = 'pending' AND COALESCE(batch, key) != ?", (now, kind, key))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO outbox (key, kind, messages, recipients, created_ts, next_attempt_ts, batch) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(row_key, kind, payload, chunk, now, now, key) for row_key, chunk in rows])
+        self._wakeup.set()
+        return key
+
+    def compact(self):
+        """古い定期レポートと保持期間を過ぎた送信済みレコードを整理"""
+        now = time.time()
+        with self._lock, self._conn:
+            kinds = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT kind FROM outbox WHERE state = 'pending'")]
+            for kind in filter(is_compacted, kinds):
+                # 最新の登録のチャンクはすべて残し、それより古い登録を丸ごと置き換える
+                self._conn.execute(
+                    "UPDATE outbox SET state = 'superseded', done_ts = ? "
+                    "WHERE kind = ? AND state = 'pending' AND COALESCE(batch, key) != "
+                    "(SELECT COALESCE(batch, key) FROM outbox WHERE kind = ? AND state = 'pending' "
+                    "ORDER BY id DESC LIMIT 1)",
+                    (now, kind, kind))
+            self._conn.execute(
+                "DELETE FROM outbox WHERE state != 'pending' AND done_ts < ?", (now - DONE_RETENTION,))
+
+    def _next_due(self, now):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, key, kind, messages, recipients, attempts FROM outbox "
+                "WHERE state = 'pending' AND next_attempt_ts <= ? ORDER BY id LIMIT 1", (now,)).fetchone()
+
+    def _next_attempt_ts(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_ts) FROM outbox WHERE state = 'pending'").fetchone()
+        return row[0]
+
+    def _finish(self, row_id, state, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET state = ?, done_ts = ?, last_error = ? WHERE id = ?",
+                (state, time.time(), error, row_id))
+
+    def _defer(self, row_id, until):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE outbox SET next_attempt_ts = ? WHERE id = ?", (until, row_id))
+
+    def _retry_later(self, row_id, attempts, error, delay=None):
+        if delay is None:
+            delay = min(RETRY_BASE_DELAY * (2 ** attempts), RETRY_MAX_DELAY)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_ts = ?, last_error = ? WHERE id = ?",
+                (attempts + 1, time.time() + delay, error, row_id))
+
+    def drain_once(self):
+        """送信期限が来た通知を1件送信（送信したらTrue）"""
+        from .line import broadcast, multicast
+
+        now = time.time()
+        row = self._next_due(now)
+        if row is None:
+            return False
+        row_id, key, kind, messages, recipients, attempts = row
+        priority = KIND_PRIORITIES.get(kind.split(':', 1)[0], PRIORITY_REPORT)
+
+        try:
+            if recipients is None:
+                response = broadcast(json.loads(messages), key, priority, block=False)
+            else:
+                response = multicast(json.loads(recipients), json.loads(messages), key, priority, block=False)
+        except RateLimited as e:
+            # レート制限中は後回しにして、送れる通知を先に送る
+            self._defer(row_id, now + e.wait)
+            return False
+        except Exception as e:
+            print(f"LINE送信エラー: {e}")
+            self._retry_later(row_id, attempts, str(e))
+            return False
+
+        if response.status_code == 200 or response.status_code == 409:
+            # 409: 同じリトライキーで送信済み（クラッシュ前に届いていた）
+            self._finish(row_id, 'sent')
+            print(f"✅ LINE送信成功 ({kind})")
+            return True
+
+        error = f"{response.status_code} - {response.text}"
+        print(f"❌ LINE送信失敗 ({kind}): {error}")
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            self._retry_later(row_id, attempts, error, float(retry_after) if retry_after else None)
+        elif 400 <= response.status_code < 500 and attempts + 1 >= MAX_CLIENT_ERROR_ATTEMPTS:
+            self._finish(row_id, 'failed', error)
+        else:
+            self._retry_later(row_id, attempts, error)
+        return False
+
+    def _run(self):
+        while True:
+            try:
+                if self.drain_once():
+                    continue
+            except Exception as e:
+                print(f"アウトボックス送信エラー: {e}")
+            next_ts = self._next_attempt_ts()
+            timeout = None if next_ts is None else max(next_ts - time.time(), 0.05)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def start(self):
+        """バックグラウンドの送信スレッドを開始"""
+        if self._thread is None:
+            self.compact()
+            self._thread = threading.Thread(target=self._run, name='outbox')
+            self._thread.daemon = True
+            self._thread.start()
+            pending = self.stats().get('pending', 0)
+            if pending:
+                print(f"📮 未送信の通知 {pending}件を送信します")
+        return self
+
+    def stats(self):
+        """状態ごとの件数"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+
+
+def get_outbox():
+    """アウトボックスを取得（初回のみデータベースを開く）"""
+    global _outbox
+    if _outbox is None:
+        from .config import get_settings
+        with _outbox_lock:
+            if _outbox is None:
+                data_dir = get_settings().data_dir
+                os.makedirs(data_dir, exist_ok=True)
+                _outbox = Outbox(os.path.join(data_dir, 'outbox.db'))
+    return _outbox
+
+
+def enqueue(kind, messages, key=None, recipients=None):
+    """通知をアウトボックスに追加"""
+    return get_outbox().enqueue(kind, messages, key, recipients)
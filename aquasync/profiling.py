@@ -0,0 +1,172 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# プロファイリング設定（AQUASYNC_PROFILE=1 または --profile で有効化）
+PROFILE_ENABLED = os.getenv('AQUASYNC_PROFILE', '').lower() in ('1', 'true', 'yes', 'on')
+
+# ヒストグラムのバケット数（2^0 〜 2^31 マイクロ秒）
+BUCKET_COUNT = 32
+
+_NULL_STAGE = nullcontext()
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+class StageHistogram:
+    """ステージごとの処理時間ヒストグラム（対数バケット）"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * BUCKET_COUNT
+
+    def record(self, elapsed_ns):
+        """計測値を1件追加"""
+        micros = elapsed_ns // 1000
+        index = min(micros.bit_length(), BUCKET_COUNT - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if self.min_ns is None or elapsed_ns < self.min_ns:
+            self.min_ns = elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def percentile(self, ratio):
+        """バケット上限からパーセンタイル値（ミリ秒）を概算"""
+        if not self.count:
+            return 0.0
+        target = self.count * ratio
+        seen = 0
+        for index, hits in enumerate(self.buckets):
+            seen += hits
+            if seen >= target:
+                upper_micros = 1 << index
+                return min(upper_micros / 1000, self.max_ns / 1e6)
+        return self.max_ns / 1e6
+
+    def to_dict(self):
+        """JSON出力用の辞書に変換"""
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ns / 1e6, 3),
+            'mean_ms': round(self.total_ns / self.count / 1e6, 3) if self.count else 0.0,
+            'min_ms': round((self.min_ns or 0) / 1e6, 3),
+            'max_ms': round(self.max_ns / 1e6, 3),
+            'p50_ms': round(self.percentile(0.50), 3),
+            'p90_ms': round(self.percentile(0.90), 3),
+            'p99_ms': round(self.percentile(0.99), 3),
+            # キー: バケット上限（マイクロ秒）
+            'histogram_us': {str(1 << i): hits for i, hits in enumerate(self.buckets) if hits},
+        }
+
+
+def enable():
+    """プロファイリングを有効化"""
+    global PROFILE_ENABLED
+    PROFILE_ENABLED = True
+
+
+def record(name, elapsed_ns):
+    """ステージの計測値を記録"""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(name, StageHistogram(name))
+    histogram.record(elapsed_ns)
+
+
+@contextmanager
+def _timed_stage(name):
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter_ns() - start)
+
+
+def stage(name):
+    """処理ステージを計測するコンテキストマネージャ（無効時は何もしない）"""
+    if not PROFILE_ENABLED:
+        return _NULL_STAGE
+    return _timed_stage(name)
+
+
+def get_stats():
+    """全ステージの統計を返す"""
+    with _histograms_lock:
+        histograms = list(_histograms.values())
+    return {
+        'enabled': PROFILE_ENABLED,
+        'stages': {h.name: h.to_dict() for h in histograms},
+    }
+
+
+def reset():
+    """計測値をクリア"""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def print_summary():
+    """ステージごとの統計をコンソールに表示"""
+    stats = get_stats()['stages']
+    if not stats:
+        return
+    print("⏱️ ステージ別処理時間")
+    for name, s in stats.items():
+        print(f"  {name:<28} n={s['count']:<6} mean={s['mean_ms']:.3f}ms "
+              f"p50={s['p50_ms']:.3f}ms p99={s['p99_ms']:.3f}ms max={s['max_ms']:.3f}ms")
+
+
+class SamplingProfiler:
+    """スタックを定期サンプリングしてflamegraph用（collapsed形式）に出力"""
+
+    def __init__(self, duration, output_path='profile.folded', interval=0.005):
+        self.duration = duration
+        self.output_path = output_path
+        self.interval = interval
+        self.samples = Counter()
+        self._thread = None
+
+    def start(self):
+        """バックグラウンドでサンプリング開始"""
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler')
+        self._thread.daemon = True
+        self._thread.start()
+        print(f"🔬 サンプリングプロファイラ開始: {self.duration}秒 -> {self.output_path}")
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        thread_names = {}
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in thread_names:
+                    thread_names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+        self.write()
+
+    def write(self):
+        """collapsed形式（flamegraph.pl / speedscope 対応）で書き出し"""
+        with open(self.output_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"🔬 サンプリング完了: {sum(self.samples.values())}サンプル -> {self.output_path}")
@@ -0,0 +1,124 @@
+"""外部API呼び出しの共通レート制限（エンドポイントごとのトークンバケット）"""
+
+import time
+import threading
+
+# 優先度（小さいほど優先）
+PRIORITY_ALERT = 0      # 状態変化の通知
+PRIORITY_REPORT = 1     # 定期レポート
+PRIORITY_CHARACTER = 2  # キャラクターのセリフ
+
+PRIORITY_NAMES = {
+    PRIORITY_ALERT: 'alert',
+    PRIORITY_REPORT: 'report',
+    PRIORITY_CHARACTER: 'character',
+}
+
+# 低優先度のリクエストが使えない予約分（バケット容量に対する割合）
+PRIORITY_RESERVE = {
+    PRIORITY_ALERT: 0.0,
+    PRIORITY_REPORT: 0.25,
+    PRIORITY_CHARACTER: 0.5,
+}
+
+# エンドポイントごとの (1秒あたりの補充数, バケット容量)
+DEFAULT_LIMITS = {
+    'line.broadcast': (60 / 3600, 10),   # LINE: 60リクエスト/時
+    'line.multicast': (10.0, 50),
+    'line.push': (10.0, 50),
+    'line.reply': (50.0, 100),
+    'line.info': (1.0, 5),
+    'gemini': (15 / 60, 15),             # Gemini無料枠: 15リクエスト/分
+}
+
+
+class RateLimited(Exception):
+    """トークン不足で呼び出しを見送った"""
+
+    def __init__(self, endpoint, wait):
+        super().__init__(f"{endpoint}: {wait:.1f}秒後に再試行")
+        self.endpoint = endpoint
+        self.wait = wait
+
+
+class TokenBucket:
+    """優先度ごとの予約分を持つトークンバケット"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.granted = {}
+        self.deferred = {}
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, priority, now):
+        """この優先度で1トークン取れるまでの秒数（0なら即時）"""
+        self._refill(now)
+        needed = 1 + self.capacity * PRIORITY_RESERVE.get(priority, 0.0)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, priority):
+        self.tokens -= 1
+        self.granted[priority] = self.granted.get(priority, 0) + 1
+
+    def defer(self, priority):
+        self.deferred[priority] = self.deferred.get(priority, 0) + 1
+
+
+class RateLimiter:
+    """全ての外部API呼び出しが通るレート制限"""
+
+    def __init__(self, limits=None):
+        self._lock = threading.Lock()
+        self._buckets = {name: TokenBucket(rate, capacity)
+                         for name, (rate, capacity) in (limits or DEFAULT_LIMITS).items()}
+
+    def try_acquire(self, endpoint, priority=PRIORITY_REPORT):
+        """トークンが取れればTrue、取れなければ見送りを記録してFalse"""
+        try:
+            self.acquire(endpoint, priority, block=False)
+            return True
+        except RateLimited:
+            return False
+
+    def acquire(self, endpoint, priority=PRIORITY_REPORT, block=True):
+        """トークンを1つ取得（block=Falseで不足時はRateLimitedを送出）"""
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            return
+        while True:
+            with self._lock:
+                wait = bucket.wait_time(priority, time.monotonic())
+                if wait == 0:
+                    bucket.take(priority)
+                    return
+                if not block:
+                    bucket.defer(priority)
+                    raise RateLimited(endpoint, wait)
+            time.sleep(min(wait, 1.0))
+
+    def stats(self):
+        """エンドポイントごとのトークン残量・許可数・見送り数"""
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for name, bucket in self._buckets.items():
+                bucket._refill(now)
+                result[name] = {
+                    'tokens': round(bucket.tokens, 2),
+                    'capacity': bucket.capacity,
+                    'rate_per_min': round(bucket.rate * 60, 2),
+                    'granted': {PRIORITY_NAMES[p]: n for p, n in sorted(bucket.granted.items())},
+                    'deferred': {PRIORITY_NAMES[p]: n for p, n in sorted(bucket.deferred.items())},
+                }
+        return result
+
+
+limiter = RateLimiter()
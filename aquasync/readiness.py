@@ -0,0 +1,76 @@
+"""起動時の準備状況チェック（固定sleepの代わりに実際の状態を確認）"""
+
+import time
+import threading
+
+# シリアル接続後、DTRリセットが完了するとファームウェアが出力するバナー
+SERIAL_BANNER = "=== AquaSync"
+
+_started = time.perf_counter()
+_checks = {}
+_lock = threading.Lock()
+
+
+def start():
+    """計測を開始（監視モードの起動直後に呼ぶ）"""
+    global _started
+    with _lock:
+        _started = time.perf_counter()
+        _checks.clear()
+
+
+def elapsed_ms():
+    """起動からの経過時間（ミリ秒）"""
+    return (time.perf_counter() - _started) * 1000
+
+
+def mark(name, ok=True, detail=None):
+    """チェック結果を記録"""
+    with _lock:
+        _checks[name] = {
+            'ok': ok,
+            'elapsed_ms': round(elapsed_ms(), 1),
+            'detail': detail,
+        }
+
+
+def is_marked(name):
+    """チェックが記録済みかどうか"""
+    return name in _checks
+
+
+def mark_once(name, detail=None):
+    """初回のみ記録して経過時間を表示（以降は何もしない）"""
+    if name in _checks:
+        return False
+    mark(name, True, detail)
+    print(f"⚡ {name}: {_checks[name]['elapsed_ms']}ms")
+    return True
+
+
+def run_in_background(name, check):
+    """チェックをバックグラウンドで実行（結果が真なら成功として記録）"""
+    def runner():
+        try:
+            ok = bool(check())
+            mark(name, ok)
+        except Exception as e:
+            print(f"準備チェックエラー ({name}): {e}")
+            mark(name, False, str(e))
+
+    thread = threading.Thread(target=runner, name=f"ready-{name}")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def status():
+    """全チェックの状態を返す"""
+    with _lock:
+        checks = {name: dict(check) for name, check in _checks.items()}
+    ready = checks.get('web', {}).get('ok', False) and 'serial_ready' in checks
+    return {
+        'ready': ready,
+        'uptime_ms': round(elapsed_ms(), 1),
+        'checks': checks,
+    }
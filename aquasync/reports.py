@@ -0,0 +1,322 @@
+"""定期レポート・日次ダイジェストの配信スケジュール
+
+宛先ごとにcron形式のスケジュールを持ち、schedulerのスレッドで配信する（計測値の受信とは独立）。
+配信時刻が静音時間帯に入る場合は、静音時間の終わりまで遅らせる。
+1時間ごとの集計（rollups）もここから作成し、日次ダイジェストはその集計をまとめて1通にする。
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+
+from .config import get_settings
+from .scheduler import scheduler
+
+# 全購読ユーザー（購読登録がなければ全員）宛てのスケジュール
+ALL_RECIPIENTS = '*'
+
+REPORT_MODES = ('report', 'digest')
+
+DIGEST_HOURS = 24        # ダイジェストの対象期間（時間）
+ROLLUP_DELAY = 5         # 時間の区切りから集計までの待ち（秒、最後の計測値を待つ）
+ROLLUP_BACKFILL = 48     # 起動時に集計し直す期間（時間）
+RELOAD_INTERVAL = 60     # スケジュールファイルの変更を確認する間隔（秒）
+
+# cronの各フィールドの範囲（分 時 日 月 曜日）
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+_schedules = None
+_schedules_lock = threading.Lock()
+_armed = {}  # 予約済みの宛先 -> 予約に使ったスケジュール
+
+
+def _parse_cron_field(field, low, high):
+    """"*/15" "1-5" "0,30" のようなフィールドを値の集合に変換"""
+    values = set()
+    for part in field.split(','):
+        spec, _, step = part.partition('/')
+        if spec == '*':
+            start, end = low, high
+        elif '-' in spec:
+            start, end = (int(v) for v in spec.split('-', 1))
+        else:
+            start = end = int(spec)
+        if not low <= start <= end <= high:
+            raise ValueError(f"範囲外の値: {part}（{low}〜{high}）")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronSchedule:
+    """cron形式（分 時 日 月 曜日）のスケジュール"""
+
+    def __init__(self, spec):
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron形式は「分 時 日 月 曜日」の5項目です: {spec}")
+        self.spec = spec
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            sorted(_parse_cron_field(field, *bounds)) for field, bounds in zip(fields, CRON_FIELDS))
+        # cronの曜日（0=日曜）をdatetimeの曜日（0=月曜）に変換
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        # 日と曜日の両方を指定した場合はどちらかに一致すればよい（cronと同じ）
+        self.day_or_weekday = fields[2] != '*' and fields[4] != '*'
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        in_days = day.day in self.days
+        in_weekdays = day.weekday() in self.weekdays
+        if self.day_or_weekday:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, ts):
+        """ts より後で最初に一致する時刻（ローカル時刻、4年以内に一致しなければNone）"""
+        start = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 4):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate.timestamp()
+            day += timedelta(days=1)
+        return None
+
+
+class QuietHours:
+    """静音時間帯（"22-7" のように開始時・終了時で指定、日をまたいでもよい）"""
+
+    def __init__(self, spec):
+        start, end = (int(v) for v in spec.split('-', 1))
+        if not (0 <= start <= 23 and 0 <= end <= 23):
+            raise ValueError(f"静音時間は0〜23時で指定してください: {spec}")
+        self.start, self.end = start, end
+
+    def contains(self, ts):
+        hour = datetime.fromtimestamp(ts).hour
+        if self.start <= self.end:
+            return self.start <= hour < self.end
+        return hour >= self.start or hour < self.end
+
+    def defer(self, ts):
+        """静音時間帯に入る時刻はその終わり（終了時の0分）まで遅らせる"""
+        if not self.contains(ts):
+            return ts
+        moment = datetime.fromtimestamp(ts)
+        end = moment.replace(hour=self.end, minute=0, second=0, microsecond=0)
+        if end <= moment:
+            end += timedelta(days=1)
+        return end.timestamp()
+
+
+def parse_quiet_hours(spec):
+    """静音時間の指定を解析（空ならNone）"""
+    return QuietHours(spec) if spec else None
+
+
+class ReportSchedules:
+    """宛先ごとのレポートスケジュールをJSONファイルに保存"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._mtime = None
+        self.reload()
+
+    def reload(self):
+        """スケジュールファイルを読み込み直す（CLIなど別のプロセスでの変更を反映、変更がなければ何もしない）"""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return False
+        entries = {}
+        if mtime is not None:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        with self._lock:
+            self._entries = entries
+            self._mtime = mtime
+        return True
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def set(self, recipient, cron, mode='digest'):
+        """宛先のスケジュールを登録・変更"""
+        CronSchedule(cron)
+        if mode not in REPORT_MODES:
+            raise ValueError(f"不明なレポート形式: {mode}（{', '.join(REPORT_MODES)} のいずれか）")
+        self.reload()
+        with self._lock:
+            self._entries[recipient] = {'cron': cron, 'mode': mode}
+            self._save()
+
+    def remove(self, recipient):
+        """宛先のスケジュールを削除（削除されたらTrue）"""
+        self.reload()
+        with self._lock:
+            if self._entries.pop(recipient, None) is None:
+                return False
+            self._save()
+        return True
+
+    def get(self, recipient):
+        with self._lock:
+            return self._entries.get(recipient)
+
+    def to_dict(self):
+        """宛先ごとのスケジュール（登録がなければ.envの既定スケジュール）"""
+        with self._lock:
+            if self._entries:
+                return dict(self._entries)
+        settings = get_settings()
+        if not settings.report_schedule:
+            return {}
+        return {ALL_RECIPIENTS: {'cron': settings.report_schedule, 'mode': settings.report_mode}}
+
+
+def get_schedules():
+    """レポートスケジュールを取得（初回はファイルを読み込み、以降はファイルが変更されていれば読み込み直す）"""
+    global _schedules
+    if _schedules is not None:
+        _schedules.reload()
+    else:
+        with _schedules_lock:
+            if _schedules is None:
+                data_dir = get_settings().data_dir
+                os.makedirs(data_dir, exist_ok=True)
+                _schedules = ReportSchedules(os.path.join(data_dir, 'schedules.json'))
+    return _schedules
+
+
+def _devices():
+    from . import state
+    return state.devices() or [get_settings().device_id]
+
+
+def next_run(entry, after):
+    """スケジュールの次回配信時刻（静音時間帯を避ける）"""
+    when = CronSchedule(entry['cron']).next_after(after)
+    quiet = parse_quiet_hours(get_settings().quiet_hours)
+    if when is not None and quiet is not None:
+        when = quiet.defer(when)
+    return when
+
+
+def _schedule_report(recipient, after):
+    entry = get_schedules().to_dict().get(recipient)
+    if entry is None:
+        _armed.pop(recipient, None)
+        scheduler.cancel(('report', recipient))
+        return
+    _armed[recipient] = entry
+    when = next_run(entry, after)
+    if when is not None:
+        scheduler.schedule(('report', recipient), when, run_report, recipient, when)
+
+
+def run_report(recipient, when):
+    """宛先のレポートを配信して次回を予約"""
+    from .notify import send_scheduled_report
+    from .subscriptions import get_registry
+
+    entry = get_schedules().to_dict().get(recipient)
+    try:
+        if entry is not None:
+            if recipient == ALL_RECIPIENTS:
+                for device in _devices():
+                    send_scheduled_report(device, entry['mode'])
+            else:
+                for device in get_registry().devices_for(recipient) or [get_settings().device_id]:
+                    send_scheduled_report(device, entry['mode'], recipient)
+    finally:
+        _schedule_report(recipient, when)
+
+
+def run_rollup(hour_start):
+    """直前の1時間（日付が変わった時は前日分も）を集計して次回を予約"""
+    from .history import get_history
+
+    history = get_history()
+    try:
+        for device in _devices():
+            history.rollup_hours(device, hour_start - 3600, hour_start)
+            if datetime.fromtimestamp(hour_start).hour == 0:
+                day_start = (datetime.fromtimestamp(hour_start) - timedelta(days=1)).timestamp()
+                history.rollup_day(device, day_start, hour_start)
+    finally:
+        next_hour = hour_start + 3600
+        scheduler.schedule(('rollup',), next_hour + ROLLUP_DELAY, run_rollup, next_hour)
+
+
+def start():
+    """全宛先のレポートと1時間ごとの集計を予約"""
+    from .history import get_history
+
+    now = time.time()
+    hour_start = now // 3600 * 3600
+    history = get_history()
+    for device in _devices():
+        history.rollup_hours(device, hour_start - ROLLUP_BACKFILL * 3600, hour_start)
+    scheduler.schedule(('rollup',), hour_start + 3600 + ROLLUP_DELAY, run_rollup, hour_start + 3600)
+
+    schedules = get_schedules().to_dict()
+    for recipient in schedules:
+        _schedule_report(recipient, now)
+    scheduler.schedule(('schedules',), now + RELOAD_INTERVAL, check_schedules)
+    return schedules
+
+
+def reschedule(recipient):
+    """スケジュールの変更を反映（実行中のスケジューラに対して）"""
+    _schedule_report(recipient, time.time())
+
+
+def check_schedules():
+    """スケジュールの追加・変更・削除（CLIの --schedule / --unschedule）を予約に反映して次回の確認を予約"""
+    try:
+        current = get_schedules().to_dict()
+        for recipient in set(current) | set(_armed):
+            if current.get(recipient) != _armed.get(recipient):
+                entry = current.get(recipient)
+                print(f"📊 定期レポートのスケジュールを更新: {recipient} ← "
+                      f"{'削除' if entry is None else entry['cron'] + ' (' + entry['mode'] + ')'}")
+                reschedule(recipient)
+    finally:
+        scheduler.schedule(('schedules',), time.time() + RELOAD_INTERVAL, check_schedules)
+
+
+def digest_summary(device, until=None):
+    """直近DIGEST_HOURS時間の集計をまとめる（データがなければNone）"""
+    from .analytics import detect_waterings
+    from .history import get_history
+
+    history = get_history()
+    until = until or time.time()
+    since = until - DIGEST_HOURS * 3600
+    history.rollup_hours(device, since, until)
+    rows = history.rollups(device, 'hour', since // 3600 * 3600, until)
+    samples = sum(row[1] for row in rows)
+    if not samples:
+        return None
+    ts, values = history.columns(device, since, until)
+    return {
+        'hours': len(rows),
+        'samples': samples,
+        'min': min(row[2] for row in rows),
+        'max': max(row[3] for row in rows),
+        'mean': sum(row[4] * row[1] for row in rows) / samples,
+        'last': rows[-1][5],
+        # 各時間の水分不足の割合から水分不足だった時間を見積もる
+        'red_hours': sum(row[6] / row[1] for row in rows if row[1]),
+        'waterings': len(detect_waterings(ts, values)) if len(ts) else 0,
+    }
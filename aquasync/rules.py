@@ -0,0 +1,274 @@
+"""ユーザー定義のアラートルール（小さなDSLをクロージャにコンパイルして計測値ごとに評価）
+
+    below 25% for 10m   25%未満が10分続いた
+    above 90% for 30s   90%超が30秒続いた
+    rise 20% in 1m      1分以内に20%以上上がった（水やり）
+    drop 15% in 5m      5分以内に15%以上下がった
+
+ルールはデバイスごとに索引し、計測値ごとにそのデバイスのルールだけを評価する。
+条件が成立した時に1回だけ発火し、条件が外れるまで再発火しない。
+"""
+
+import os
+import re
+import json
+import threading
+from array import array
+
+# ALL_DEVICESのルールは全デバイスに適用
+ALL_DEVICES = '*'
+
+# 窓の容量を決める想定最大サンプリング周期（Hz）
+MAX_SAMPLE_RATE = 10
+RELOAD_INTERVAL = 60  # ルールファイルの変更を確認する間隔（秒）
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+RULE_PATTERN = re.compile(
+    r'^\s*(?P<kind>below|above|rise|drop)\s+(?P<amount>\d+(?:\.\d+)?)\s*%?\s+'
+    r'(?P<keyword>for|in)\s+(?P<duration>\d+(?:\.\d+)?)\s*(?P<unit>[smh])\s*$')
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+class WindowExtreme:
+    """直近window秒の最小値（largest=Trueなら最大値）を固定長のリングで保持（1件あたり償却O(1)）"""
+
+    def __init__(self, window, largest=False):
+        self.window = window
+        self.largest = largest
+        self.size = int(window * MAX_SAMPLE_RATE) + 2
+        self.ts = array('d', bytes(8 * self.size))
+        self.values = array('d', bytes(8 * self.size))
+        self.head = 0   # 先頭（窓の中で最も古い候補）
+        self.count = 0
+
+    def push(self, ts, value):
+        """値を追加して窓の中の最小値（最大値）を返す"""
+        size, values = self.size, self.values
+        # 新しい値より不利な末尾の候補を捨てる（単調なキュー）
+        while self.count:
+            tail = (self.head + self.count - 1) % size
+            if (values[tail] <= value) if self.largest else (values[tail] >= value):
+                self.count -= 1
+            else:
+                break
+        if self.count == size:
+            # 想定より高い周期で満杯になったら最も古い候補を捨てる
+            self.head = (self.head + 1) % size
+            self.count -= 1
+        tail = (self.head + self.count) % size
+        self.ts[tail] = ts
+        values[tail] = value
+        self.count += 1
+        # 窓から外れた先頭の候補を捨てる
+        limit = ts - self.window
+        while self.ts[self.head] < limit:
+            self.head = (self.head + 1) % size
+            self.count -= 1
+        return values[self.head]
+
+
+def _below(threshold, duration):
+    def make():
+        since = None
+        fired = False
+
+        def check(ts, value):
+            nonlocal since, fired
+            if value >= threshold:
+                since = None
+                fired = False
+                return False
+            if since is None:
+                since = ts
+            if not fired and ts - since >= duration:
+                fired = True
+                return True
+            return False
+        return check
+    return make
+
+
+def _above(threshold, duration):
+    def make():
+        since = None
+        fired = False
+
+        def check(ts, value):
+            nonlocal since, fired
+            if value <= threshold:
+                since = None
+                fired = False
+                return False
+            if since is None:
+                since = ts
+            if not fired and ts - since >= duration:
+                fired = True
+                return True
+            return False
+        return check
+    return make
+
+
+def _rise(amount, window):
+    def make():
+        lowest = WindowExtreme(window)
+        fired = False
+
+        def check(ts, value):
+            nonlocal fired
+            if value - lowest.push(ts, value) < amount:
+                fired = False
+                return False
+            if fired:
+                return False
+            fired = True
+            return True
+        return check
+    return make
+
+
+def _drop(amount, window):
+    def make():
+        highest = WindowExtreme(window, largest=True)
+        fired = False
+
+        def check(ts, value):
+            nonlocal fired
+            if highest.push(ts, value) - value < amount:
+                fired = False
+                return False
+            if fired:
+                return False
+            fired = True
+            return True
+        return check
+    return make
+
+
+RULE_KINDS = {
+    'below': ('for', _below),
+    'above': ('for', _above),
+    'rise': ('in', _rise),
+    'drop': ('in', _drop),
+}
+
+
+def compile_rule(spec):
+    """ルールの文字列を評価関数のファクトリにコンパイル（呼ぶたびに状態を持つ評価関数を作る）"""
+    match = RULE_PATTERN.match(spec.lower())
+    if match is None:
+        raise ValueError(f"ルールを解析できません: {spec}（例: below 25% for 10m / rise 20% in 1m）")
+    keyword, factory = RULE_KINDS[match['kind']]
+    if match['keyword'] != keyword:
+        raise ValueError(f"{match['kind']} のルールは「{keyword}」で期間を指定してください: {spec}")
+    duration = float(match['duration']) * UNITS[match['unit']]
+    return factory(float(match['amount']), duration)
+
+
+class Rule:
+    """コンパイル済みのルール（nameは通知に使う表示名）"""
+
+    def __init__(self, spec, name=None):
+        self.spec = spec
+        self.name = name or spec
+        self.make = compile_rule(spec)
+
+
+class RuleEngine:
+    """デバイスごとに索引したルールを計測値ごとに評価"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._rules = {}      # device -> [Rule]（ファイルの内容）
+        self._compiled = {}   # device -> [(Rule, 評価関数)]（そのデバイス用の状態を持つ）
+        self._mtime = None
+        self._checked = 0.0
+        self.fired = 0
+        self.reload()
+
+    def reload(self):
+        """ルールファイルを読み込み直す（変更がなければ何もしない）"""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return False
+        rules = {}
+        if mtime is not None:
+            with open(self.path, encoding='utf-8') as f:
+                for device, entries in json.load(f).items():
+                    rules[device] = [Rule(entry['rule'], entry.get('name')) for entry in entries]
+        with self._lock:
+            self._rules = rules
+            self._compiled = {}
+            self._mtime = mtime
+        return True
+
+    def _save(self):
+        data = {device: [{'rule': rule.spec, **({'name': rule.name} if rule.name != rule.spec else {})}
+                         for rule in rules]
+                for device, rules in sorted(self._rules.items()) if rules}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def add(self, device, spec, name=None):
+        """ルールを追加（解析できなければValueError）"""
+        rule = Rule(spec, name)
+        with self._lock:
+            self._rules.setdefault(device, []).append(rule)
+            self._compiled = {}
+            self._save()
+        return rule
+
+    def remove(self, device, spec):
+        """ルールを削除（削除されたらTrue）"""
+        with self._lock:
+            rules = self._rules.get(device, [])
+            remaining = [rule for rule in rules if rule.spec != spec]
+            if len(remaining) == len(rules):
+                return False
+            self._rules[device] = remaining
+            self._compiled = {}
+            self._save()
+        return True
+
+    def to_dict(self):
+        with self._lock:
+            return {device: [(rule.spec, rule.name) for rule in rules]
+                    for device, rules in self._rules.items() if rules}
+
+    def _compile_for(self, device):
+        rules = self._rules.get(device, []) + self._rules.get(ALL_DEVICES, [])
+        compiled = self._compiled[device] = [(rule, rule.make()) for rule in rules]
+        return compiled
+
+    def evaluate(self, device, ts, value):
+        """計測値1件でデバイスのルールを評価し、発火したルールのリストを返す"""
+        if ts - self._checked >= RELOAD_INTERVAL:
+            self._checked = ts
+            self.reload()
+        compiled = self._compiled.get(device)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compile_for(device)
+        fired = [rule for rule, check in compiled if check(ts, value)]
+        self.fired += len(fired)
+        return fired
+
+
+def get_engine():
+    """ルールエンジンを取得（初回のみルールファイルを読み込む）"""
+    global _engine
+    if _engine is None:
+        from .config import get_settings
+        with _engine_lock:
+            if _engine is None:
+                data_dir = get_settings().data_dir
+                os.makedirs(data_dir, exist_ok=True)
+                _engine = RuleEngine(os.path.join(data_dir, 'rules.json'))
+    return _engine
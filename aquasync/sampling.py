@@ -0,0 +1,177 @@
+"""ボードの計測・送信方式の調整（計測間隔の自動調整・変化時のみの送信・ハートビートによる死活監視）
+
+ボード（AquaSync2.ino）に "<設定名> <値>" を送り、"OK <設定名> <値>" の応答で切り替わったと
+みなす。ボードはリセットで既定（1秒ごと・毎回送信）に戻るので、起動メッセージを受信したら
+送り直す。応答しない古いファームウェアには何度か送って諦める。
+"""
+
+import math
+import time
+from collections import deque
+
+from .readiness import SERIAL_BANNER
+
+HEARTBEAT_LINE = "HB"
+
+CHANGE_WINDOW = 10.0     # 変化を見る期間（秒）
+CHANGE_THRESHOLD = 3.0   # この期間に水分%がこれ以上動いたら速くする（ノイズで切り替わらない幅）
+STABLE_SECONDS = 60.0    # 変化がこの秒数なければ遅くする
+RESEND_AFTER = 3.0       # 応答がなければ送り直すまでの秒数
+MAX_ATTEMPTS = 3         # 応答がなければ設定の変更に対応していないとみなす
+LIVENESS_FACTOR = 3      # ハートビート間隔のこの倍数の間なにも届かなければ途絶とみなす
+
+
+class BoardSetting:
+    """ボードの設定1つ（値は文字列で送り、応答の値と一致したら確定）"""
+
+    def __init__(self, name):
+        self.name = name
+        self.link = None
+        self.requested = None    # 最後に送った値
+        self.acked = None        # ボードが応答した値
+        self.sent_at = 0.0
+        self.attempts = 0
+        self.supported = True
+
+    def attach(self, link):
+        """接続（再接続）時に呼ぶ"""
+        self.link = link
+        self.reset()
+
+    def reset(self):
+        """ボードがリセットされて既定値に戻った"""
+        self.requested = None
+        self.acked = None
+        self.attempts = 0
+        self.supported = True
+
+    def handle_line(self, line):
+        """ボードの応答を処理（この設定への応答ならTrue）"""
+        status, _, rest = line.partition(' ')
+        name, _, value = rest.partition(' ')
+        if name != self.name or status not in ('OK', 'ERR'):
+            return False
+        if status == 'OK':
+            self.acked = value
+            print(f"⚙️ ボード設定: {self.name} {value}")
+        else:
+            print(f"⚠️ ボード設定の変更が拒否されました: {line}")
+            self.supported = False
+        return True
+
+    def request(self, value, now):
+        """値をボードに送る（応答済み・応答待ちなら何もしない）"""
+        if self.link is None or not self.supported or value == self.acked:
+            return
+        if value == self.requested and now - self.sent_at < RESEND_AFTER:
+            return
+        if value != self.requested:
+            self.attempts = 0
+        if self.attempts >= MAX_ATTEMPTS:
+            print(f"⚠️ ボードが {self.name} の変更に応答しません（現在の設定のまま続けます）")
+            self.supported = False
+            return
+        if self.link.write(f"{self.name} {value}\n".encode()):
+            self.requested = value
+            self.sent_at = now
+            self.attempts += 1
+
+
+class AdaptiveSampler:
+    """水分の変化に合わせてボードの計測間隔を切り替える"""
+
+    def __init__(self, fast, slow):
+        self.fast = fast
+        self.slow = slow
+        self.setting = BoardSetting('INTERVAL')
+        self.window = deque()    # 直近CHANGE_WINDOW秒の (ts, level)
+        self.changed_at = None   # 最後に変化を検出した時刻
+
+    def attach(self, link):
+        """接続（再接続）時に呼ぶ（ボードはリセットされて既定の間隔に戻っている）"""
+        self.setting.attach(link)
+
+    def target(self, ts):
+        """ts 時点で使うべき間隔（秒）"""
+        if self.changed_at is not None and ts - self.changed_at < STABLE_SECONDS:
+            return self.fast
+        return self.slow
+
+    def observe(self, ts, level):
+        """計測値ごとに呼び、必要なら間隔の変更を送る"""
+        window = self.window
+        window.append((ts, level))
+        while window[0][0] < ts - CHANGE_WINDOW:
+            window.popleft()
+        levels = [value for _, value in window]
+        if max(levels) - min(levels) >= CHANGE_THRESHOLD:
+            self.changed_at = ts
+        self.setting.request(str(round(self.target(ts) * 1000)), ts)
+
+    def handle_line(self, line):
+        """ボードの応答・起動メッセージを処理（処理した行ならTrue）"""
+        if line.startswith(SERIAL_BANNER):
+            self.setting.reset()
+            return False
+        return self.setting.handle_line(line)
+
+
+class ChangeReporting:
+    """ボードを「変化した時とハートビートだけ送る」方式にする"""
+
+    def __init__(self, deadband, heartbeat):
+        self.deadband = deadband
+        self.heartbeat = heartbeat
+        self.setting = BoardSetting('REPORT')
+        self.value = f"{math.ceil(deadband)} {round(heartbeat * 1000)}"
+
+    def attach(self, link):
+        self.setting.attach(link)
+
+    def observe(self, ts, level):
+        """計測値ごとに呼び、未設定なら送る"""
+        self.setting.request(self.value, ts)
+
+    def handle_line(self, line):
+        if line.startswith(SERIAL_BANNER):
+            self.setting.reset()
+            return False
+        return self.setting.handle_line(line)
+
+
+class Liveness:
+    """受信が timeout 秒途絶えたら欠損区間を開き、次の受信で閉じる
+
+    受信のたびに予約し直さず、期限に来た確認で最終受信時刻を見て必要なら予約し直す。
+    """
+
+    def __init__(self, device, timeout, history, scheduler):
+        self.device = device
+        self.timeout = timeout
+        self.history = history
+        self.scheduler = scheduler
+        self.last_seen = None
+        self.alive = True
+
+    def seen(self, ts):
+        """ボードから何か受信した"""
+        first = self.last_seen is None
+        self.last_seen = ts
+        if not self.alive:
+            self.alive = True
+            print(f"💓 ボードからの受信が再開しました: {self.device}")
+            self.history.close_gap(self.device, ts)
+        if first or self.scheduler.due(('liveness', self.device)) is None:
+            self._arm()
+
+    def _arm(self):
+        self.scheduler.schedule(('liveness', self.device), self.last_seen + self.timeout, self.check)
+
+    def check(self):
+        """期限の確認（途絶していなければ最終受信時刻から予約し直す）"""
+        if time.time() - self.last_seen < self.timeout:
+            self._arm()
+            return
+        self.alive = False
+        print(f"💔 ボードからの受信が{self.timeout:g}秒途絶えています: {self.device}")
+        self.history.open_gap(self.device, self.last_seen, 'heartbeat')
@@ -0,0 +1,84 @@
+"""時刻指定ジョブのスケジューラ（ヒープで期限を管理し、専用スレッドで実行）"""
+
+import time
+import heapq
+import itertools
+import threading
+
+
+class Scheduler:
+    """キーごとに1つの期限を持つジョブを実行（登録・置き換えはO(log n)）
+
+    置き換え・取り消された古いエントリはヒープに残したまま、取り出した時に読み飛ばす。
+    """
+
+    def __init__(self):
+        self._heap = []      # (実行時刻, 連番, キー)
+        self._jobs = {}      # キー -> (連番, 実行時刻, callback, args)
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.fired = 0
+
+    def schedule(self, key, when, callback, *args):
+        """キーのジョブを登録（同じキーの既存ジョブは置き換える）"""
+        with self._cond:
+            seq = next(self._counter)
+            self._jobs[key] = (seq, when, callback, args)
+            heapq.heappush(self._heap, (when, seq, key))
+            # 置き換えで溜まった古いエントリが多くなったら作り直す
+            if len(self._heap) > 2 * len(self._jobs) + 64:
+                self._heap = [(job[1], job[0], k) for k, job in self._jobs.items()]
+                heapq.heapify(self._heap)
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def cancel(self, key):
+        """キーのジョブを取り消し（登録されていればTrue）"""
+        with self._cond:
+            return self._jobs.pop(key, None) is not None
+
+    def due(self, key):
+        """キーのジョブの実行時刻（未登録ならNone）"""
+        job = self._jobs.get(key)
+        return None if job is None else job[1]
+
+    def _pop_due(self):
+        """実行時刻が来たジョブを1つ取り出す（なければ次の時刻まで待つ）"""
+        with self._cond:
+            while True:
+                while self._heap and self._jobs.get(self._heap[0][2], (None,))[0] != self._heap[0][1]:
+                    heapq.heappop(self._heap)
+                timeout = None
+                if self._heap:
+                    timeout = self._heap[0][0] - time.time()
+                    if timeout <= 0:
+                        _, _, key = heapq.heappop(self._heap)
+                        return key, self._jobs.pop(key)
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            key, (_, _, callback, args) = self._pop_due()
+            self.fired += 1
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"スケジュール実行エラー ({key}): {e}")
+
+    def start(self):
+        """実行スレッドを開始"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='scheduler')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stats(self):
+        """登録中のジョブ数・実行済み件数・次の実行時刻"""
+        with self._cond:
+            upcoming = min((job[1] for job in self._jobs.values()), default=None)
+            return {'pending': len(self._jobs), 'fired': self.fired, 'next_run': upcoming}
+
+
+scheduler = Scheduler()
@@ -0,0 +1,217 @@
+"""時刻を進めて履歴の保存・集計・保守を動かすシミュレータ
+
+実際の時刻を待たずに、模擬した植物の1Hzの計測値を1時間分ずつ書き込み、時間の区切りごとに
+集計と保守（圧縮・保持期間を過ぎた計測値の削除）を別スレッドで行う。並行してダッシュボード
+相当の読み出しとオンラインバックアップも行い、書き込み・読み出しの待ち時間と、保持期間・
+集計が期待どおりかを確かめる。データは一時ディレクトリに作り、終了時に削除する（keep=Trueなら残す）。
+
+書き込みは append_readings でデータベースに直接行い、サービスが使うホット層
+（append_reading）は通らない。ホット層の保持・書き出しはこのシミュレーションでは確かめない。
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .blocks import decode_block
+from .calibration import classify_levels
+from .config import get_settings
+from .filters import build_filter_chain
+from .history import HistoryStore, HOUR
+from .maintenance import DAY, compact
+
+INGEST_CHUNK = 60      # 1回に書き込む計測値の数（1秒ごとの計測の1分分）
+QUERY_HOURS = 6        # ダッシュボード相当の読み出しの期間（時間）
+QUERY_INTERVAL = 0.05  # 読み出しの間隔（実時間の秒）
+WATER_AT = 35          # この水分%を下回ると水やりされる
+WATERING_AMOUNT = 50   # 水やりで上がる水分%
+WATERING_SECONDS = 120  # 水やりで上がりきるまでの秒数
+SENSOR_NOISE = 0.6     # 生値のノイズ（標準偏差）
+CLOCK_JITTER = 0.003   # 受信時刻の揺らぎ（秒）
+
+
+class PlantModel:
+    """乾いていき、水分不足が近づくと水やりされる植物"""
+
+    def __init__(self, rng, filter_spec):
+        self.rng = rng
+        self.level = rng.uniform(60, 90)
+        self.drying = rng.uniform(0.3, 1.2)  # %/時間
+        self.filter = build_filter_chain(filter_spec)
+
+    def hour(self, start):
+        """start からの1時間分の計測値を (ts, raw, percentage, status, filtered) の配列で返す"""
+        t = np.arange(HOUR, dtype=np.float64)
+        level = self.level - self.drying * t / HOUR
+        below = np.flatnonzero(level < WATER_AT)
+        if len(below):
+            begin = below[0]
+            since = t[begin:] - begin
+            level[begin:] = (level[begin] + np.minimum(since / WATERING_SECONDS, 1) * WATERING_AMOUNT
+                             - self.drying * since / HOUR)
+        self.level = level[-1] - self.drying / HOUR
+        raw = np.clip(np.rint(level + self.rng.normal(0, SENSOR_NOISE, HOUR)), 0, 100).astype(np.int64)
+        filtered = np.array([self.filter(value) for value in raw.astype(float).tolist()])
+        # 受信時刻は計測より少し遅れる
+        ts = start + t + np.abs(self.rng.normal(0, CLOCK_JITTER, HOUR))
+        return ts, raw, raw, classify_levels(np.rint(filtered)), filtered
+
+
+def _hourly(history, devices, hour_end, retention_days, results):
+    """時間の区切りの処理（reports.run_rollup と maintenance と同じ内容を時刻を指定して行う）"""
+    for device in devices:
+        history.rollup_hours(device, hour_end - HOUR, hour_end)
+        if datetime.fromtimestamp(hour_end).hour == 0:
+            day_start = (datetime.fromtimestamp(hour_end) - timedelta(days=1)).timestamp()
+            history.rollup_day(device, day_start, hour_end)
+    result = compact(history, hour_end, retention_days)
+    for key, value in result.items():
+        results[key] = results.get(key, 0) + value
+
+
+def _decode_throughput(path):
+    """データベースの圧縮ブロックをすべて復号した速さ（ブロックがなければNone）"""
+    conn = sqlite3.connect(path)
+    try:
+        blobs = [row[0] for row in conn.execute("SELECT data FROM blocks")]
+    finally:
+        conn.close()
+    if not blobs:
+        return None
+    started = time.perf_counter()
+    samples = sum(len(decode_block(blob)) for blob in blobs)
+    elapsed = time.perf_counter() - started
+    return {'blocks': len(blobs), 'samples': samples, 'ms_per_block': elapsed / len(blobs) * 1000,
+            'samples_per_second': samples / elapsed}
+
+
+def _percentiles(waits):
+    waits = np.array(waits or [0.0]) * 1000
+    return {'p50': float(np.percentile(waits, 50)), 'p99': float(np.percentile(waits, 99)),
+            'max': float(waits.max()), 'count': len(waits)}
+
+
+def simulate(days, retention_days, devices=3, seed=0, workdir=None, keep=False):
+    """days 日分を時刻を進めて動かし、結果と確認項目を辞書で返す（作った一時ディレクトリはkeep=Trueでなければ削除）"""
+    created = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix='aquasync-sim-')
+    try:
+        result = _simulate(days, retention_days, devices, seed, workdir)
+    finally:
+        if created and not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    result['kept'] = keep or not created
+    return result
+
+
+def _simulate(days, retention_days, devices, seed, workdir):
+    history = HistoryStore(os.path.join(workdir, 'history.db'))
+    rng = np.random.default_rng(seed)
+    filter_spec = get_settings().ingest_filters
+    plants = {f'sim{index + 1}': PlantModel(rng, filter_spec) for index in range(devices)}
+    start = (time.time() - days * DAY) // HOUR * HOUR
+    hours = int(days * 24)
+
+    ingest_waits, query_waits = [], []
+    maintenance = {}
+    clock = [start]   # シミュレーション上の現在時刻
+    stop = threading.Event()
+
+    def query_loop():
+        while not stop.is_set():
+            now = clock[0]
+            for device in plants:
+                started = time.perf_counter()
+                history.columns(device, now - QUERY_HOURS * HOUR, now)
+                history.rollups(device, 'hour', now - DAY, now)
+                query_waits.append(time.perf_counter() - started)
+            time.sleep(QUERY_INTERVAL)
+
+    backup = {}
+
+    def run_backup(now):
+        started = time.perf_counter()
+        dest = os.path.join(workdir, 'backup.db')
+        pages = history.backup(dest)
+        copy = HistoryStore(dest, hot_window=0)
+        try:
+            devices = len(copy.devices())
+        finally:
+            copy.close()
+        backup.update(seconds=time.perf_counter() - started, pages=pages, bytes=os.path.getsize(dest),
+                      at=now, devices=devices)
+
+    reader = threading.Thread(target=query_loop, name='sim-query', daemon=True)
+    reader.start()
+    worker = backup_thread = None
+    started = time.perf_counter()
+    for hour in range(hours):
+        hour_start = start + hour * HOUR
+        for device, plant in plants.items():
+            ts, raw, percentage, status, filtered = plant.hour(hour_start)
+            rows = list(zip(ts.tolist(), raw.tolist(), percentage.tolist(), status.tolist(), filtered.tolist()))
+            for offset in range(0, len(rows), INGEST_CHUNK):
+                begin = time.perf_counter()
+                history.append_readings(device, rows[offset:offset + INGEST_CHUNK])
+                ingest_waits.append(time.perf_counter() - begin)
+        clock[0] = hour_end = hour_start + HOUR
+        if worker is not None:
+            worker.join()
+        # 集計と保守は次の1時間分の書き込みと並行して行う
+        worker = threading.Thread(target=_hourly, args=(history, list(plants), hour_end, retention_days, maintenance),
+                                  name='sim-maintenance')
+        worker.start()
+        if hour == hours // 2:
+            backup_thread = threading.Thread(target=run_backup, args=(hour_end,), name='sim-backup')
+            backup_thread.start()
+    worker.join()
+    if backup_thread is not None:
+        backup_thread.join()
+    stop.set()
+    reader.join()
+    elapsed = time.perf_counter() - started
+
+    end = start + hours * HOUR
+    checks = {}
+    cutoff = end - retention_days * DAY if retention_days else None
+    for device in plants:
+        first, _ = history.span(device)
+        oldest = history.oldest_block(device)
+        # 保持期間の境目をまたぐブロックは丸ごと残る（最も古いブロックの時間幅までは境目より前でよい）
+        overlap = oldest[1] - oldest[0] if oldest else 0
+        rows = history.rollups(device, 'hour', start, end)
+        samples = sum(row[1] for row in rows)
+        checks[device] = {
+            'retention': cutoff is None or first >= cutoff - overlap,
+            'hour_rollups': len(rows) == hours and samples == hours * HOUR,
+            'day_rollups': len(history.rollups(device, 'day', start, end)) >= int(days) - 1,
+        }
+    storage = history.storage()
+    history.close()
+    decode = _decode_throughput(os.path.join(workdir, 'history.db'))
+    size = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir)
+               if name.startswith('history.db'))
+    return {
+        'workdir': workdir,
+        'days': days,
+        'devices': devices,
+        'samples': hours * HOUR * devices,
+        'elapsed': elapsed,
+        'speedup': hours * HOUR / elapsed,
+        'ingest': _percentiles(ingest_waits),
+        'query': _percentiles(query_waits),
+        'maintenance': maintenance,
+        'backup': backup,
+        'storage': storage,
+        'decode': decode,
+        'db_bytes': size,
+        'ingest_path': 'append_readings',   # ホット層を通らない
+        'checks': checks,
+        'ok': all(all(values.values()) for values in checks.values()),
+    }
@@ -0,0 +1,33 @@
+"""デバイスごとの最新計測値（メモリ上のスナップショット）"""
+
+import time
+
+STATUS_LABELS = {
+    'red': '🔴 不足',
+    'yellow': '🟡 適度',
+    'green': '🟢 十分',
+    'unknown': '❔ 不明',
+}
+
+# device -> {'raw_value', 'percentage', 'status', 'ts'}
+latest = {}
+
+
+def record(device, raw_value, percentage, status, ts=None):
+    """最新の計測値を記録（辞書ごと差し替えるので読み取り側はロック不要）"""
+    latest[device] = {
+        'raw_value': raw_value,
+        'percentage': percentage,
+        'status': status,
+        'ts': ts or time.time(),
+    }
+
+
+def get(device):
+    """デバイスの最新計測値（未受信ならNone）"""
+    return latest.get(device)
+
+
+def devices():
+    """計測値を受信したデバイス一覧"""
+    return sorted(latest)
@@ -0,0 +1,110 @@
+"""通知の購読登録（どのユーザーがどの植物・デバイスの通知を受け取るか）"""
+
+import os
+import json
+import threading
+
+# 全デバイスを購読する場合のデバイス名
+ALL_DEVICES = '*'
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+class SubscriptionRegistry:
+    """ユーザーIDとデバイスの対応をJSONファイルに保存"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_device = {}
+        self._mtime = None
+        self.reload()
+
+    def reload(self):
+        """購読ファイルを読み込み直す（CLIなど別のプロセスでの変更を反映、変更がなければ何もしない）"""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return False
+        by_device = {}
+        if mtime is not None:
+            with open(self.path, encoding='utf-8') as f:
+                for user_id, devices in json.load(f).items():
+                    for device in devices:
+                        by_device.setdefault(device, set()).add(user_id)
+        with self._lock:
+            self._by_device = by_device
+            self._mtime = mtime
+        return True
+
+    def _by_user(self):
+        by_user = {}
+        for device, user_ids in self._by_device.items():
+            for user_id in user_ids:
+                by_user.setdefault(user_id, []).append(device)
+        return {u: sorted(d) for u, d in sorted(by_user.items())}
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._by_user(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def subscribe(self, user_id, device=ALL_DEVICES):
+        """購読を追加（追加されたらTrue）"""
+        self.reload()
+        with self._lock:
+            user_ids = self._by_device.setdefault(device, set())
+            if user_id in user_ids:
+                return False
+            user_ids.add(user_id)
+            self._save()
+        return True
+
+    def unsubscribe(self, user_id, device=None):
+        """購読を解除（device未指定時は全デバイス）"""
+        self.reload()
+        removed = False
+        with self._lock:
+            for name, user_ids in list(self._by_device.items()):
+                if (device is None or name == device) and user_id in user_ids:
+                    user_ids.discard(user_id)
+                    removed = True
+                if not user_ids:
+                    del self._by_device[name]
+            if removed:
+                self._save()
+        return removed
+
+    def devices_for(self, user_id):
+        """ユーザーが購読しているデバイス一覧"""
+        with self._lock:
+            return sorted(d for d, user_ids in self._by_device.items() if user_id in user_ids)
+
+    def recipients(self, device):
+        """デバイスの通知を購読しているユーザーID一覧"""
+        with self._lock:
+            user_ids = set(self._by_device.get(device, ()))
+            user_ids.update(self._by_device.get(ALL_DEVICES, ()))
+        return sorted(user_ids)
+
+    def to_dict(self):
+        """ユーザーごとの購読デバイス"""
+        with self._lock:
+            return self._by_user()
+
+
+def get_registry():
+    """購読登録を取得（初回はファイルを読み込み、以降はファイルが変更されていれば読み込み直す）"""
+    global _registry
+    if _registry is not None:
+        _registry.reload()
+    else:
+        from .config import get_settings
+        with _registry_lock:
+            if _registry is None:
+                data_dir = get_settings().data_dir
+                os.makedirs(data_dir, exist_ok=True)
+                _registry = SubscriptionRegistry(os.path.join(data_dir, 'subscriptions.json'))
+    return _registry
@@ -0,0 +1,163 @@
+"""Flaskによる画像配信・Webダッシュボード"""
+
+import os
+import hmac
+import json
+
+from . import profiling, readiness
+from .config import get_settings
+
+
+def create_app(dashboard=False):
+    """Flaskアプリを作成（Flaskはサーバー起動時に読み込む）"""
+    from flask import Flask, send_file, abort, render_template_string, jsonify, request
+
+    app = Flask(__name__)
+
+    @app.route('/image/<filename>')
+    def serve_image(filename):
+        """ローカル画像ファイルを配信"""
+        image_path = os.path.join(os.getcwd(), filename)
+        if os.path.exists(image_path):
+            return send_file(image_path)
+        else:
+            abort(404)
+
+    if get_settings().channel_secret:
+        from . import webhook
+
+        @app.route('/callback', methods=['POST'])
+        def callback():
+            """LINE Webhook（署名検証してキューに積み、すぐに200を返す）"""
+            if not webhook.accept(request.get_data(), request.headers.get('X-Line-Signature')):
+                abort(400)
+            return 'OK'
+
+    @app.route('/api/ratelimit')
+    def get_ratelimit():
+        """外部APIのレート制限状況（トークン残量・見送り数）をJSON形式で返す"""
+        from .ratelimit import limiter
+        return jsonify(limiter.stats())
+
+    @app.route('/api/analytics')
+    def get_analytics():
+        """デバイスごとの乾燥ペース・水やり目安をJSON形式で返す"""
+        from . import analytics, state
+        devices = state.devices() or [get_settings().device_id]
+        return jsonify({device: analytics.summary(device) for device in devices})
+
+    @app.route('/api/schedule')
+    def get_schedule():
+        """定期レポートのスケジュールとスケジューラの状況をJSON形式で返す"""
+        from .reports import get_schedules
+        from .scheduler import scheduler
+        return jsonify({'schedules': get_schedules().to_dict(), 'scheduler': scheduler.stats()})
+
+    @app.route('/api/ready')
+    def get_ready():
+        """起動準備状況をJSON形式で返す（準備完了前は503）"""
+        state = readiness.status()
+        return jsonify(state), 200 if state['ready'] else 503
+
+    @app.route('/api/commands', methods=['GET', 'POST'])
+    def commands():
+        """ボードへの操作コマンド（POST {"command", "args", "device"} で送って応答を待つ、GETで送信状況）"""
+        from . import control
+        denied = _check_control_token(request.headers.get('X-Control-Token'))
+        if denied:
+            return jsonify({'ok': False, 'error': denied}), 403
+        if request.method == 'GET':
+            return jsonify(control.stats())
+        body = request.get_json(silent=True) or {}
+        result, status = _run_command(body)
+        return jsonify(result), status
+
+    _add_control_socket(app)
+
+    if dashboard:
+        from .dashboard import snapshot
+        from .templates import HTML_TEMPLATE
+
+        @app.route('/')
+        def show_dashboard():
+            """水分レベルダッシュボードを表示"""
+            return render_template_string(HTML_TEMPLATE, **snapshot())
+
+        @app.route('/api/data')
+        def get_data():
+            """現在の水分データをJSON形式で返す"""
+            return jsonify(snapshot())
+
+        @app.route('/api/profile')
+        def get_profile():
+            """ステージ別の処理時間ヒストグラムをJSON形式で返す"""
+            return jsonify(profiling.get_stats())
+
+    return app
+
+
+def _check_control_token(token):
+    """操作コマンドのトークンを確認（拒否する場合は理由を返す）
+
+    ngrok経由の公開URLからの要求も localhost から届くので、接続元ではなくトークンで判定する。
+    """
+    expected = get_settings().control_token
+    if not expected:
+        return 'CONTROL_TOKEN が未設定のため操作コマンドは無効です'
+    if not token or not hmac.compare_digest(token.encode(), expected.encode()):
+        return 'トークンが正しくありません'
+    return None
+
+
+def _run_command(body):
+    """操作コマンドを1つ実行して (結果, HTTPステータス) を返す"""
+    from . import control
+    device = body.get('device') or get_settings().device_id
+    try:
+        result = control.send(device, body.get('command'), body.get('args') or ())
+    except control.CommandError as e:
+        return {'ok': False, 'device': device, 'error': str(e)}, 400
+    return result, 200 if result['ok'] else 504
+
+
+def _add_control_socket(app):
+    """操作コマンドのWebSocket（/ws/control、flask-sockがあれば有効）"""
+    try:
+        from flask_sock import Sock
+    except ImportError:
+        print("ℹ️ flask-sock が未インストールのため /ws/control は無効です（/api/commands は使えます）")
+        return
+
+    from flask import request, abort
+
+    sock = Sock(app)
+
+    @app.before_request
+    def check_control_socket():
+        """WebSocketの接続前にトークンを確認（ブラウザはヘッダーを付けられないので ?token= も受け付ける）"""
+        if request.path == '/ws/control':
+            token = request.headers.get('X-Control-Token') or request.args.get('token')
+            if _check_control_token(token):
+                abort(403)
+
+    @sock.route('/ws/control')
+    def control_socket(ws):
+        """1メッセージ1コマンド（JSON）を受けて、ボードの応答を同じ id で返す"""
+        while True:
+            try:
+                body = json.loads(ws.receive())
+                if not isinstance(body, dict):
+                    raise ValueError(body)
+            except ValueError:
+                ws.send(json.dumps({'ok': False, 'error': 'JSONで送ってください'}))
+                continue
+            result, _ = _run_command(body)
+            ws.send(json.dumps(dict(result, id=body.get('id')), ensure_ascii=False))
+
+
+def make_web_server(dashboard=False):
+    """Webサーバーを作成（戻った時点でソケットはバインド済み）"""
+    from werkzeug.serving import make_server
+
+    settings = get_settings()
+    return make_server(settings.web_host, settings.web_port, create_app(dashboard), threaded=True)
@@ -0,0 +1,158 @@
+"""LINE Webhook受信（署名検証後すぐに応答し、イベントはワーカーで処理）"""
+
+import hmac
+import json
+import queue
+import base64
+import hashlib
+import threading
+from datetime import datetime
+
+from . import state
+from .config import get_settings
+from .subscriptions import get_registry, ALL_DEVICES
+
+STATUS_KEYWORDS = ('水分', '状態', '様子', 'status')
+SUBSCRIBE_KEYWORDS = ('登録', 'subscribe')
+UNSUBSCRIBE_KEYWORDS = ('解除', 'unsubscribe')
+BROADCAST_NOTE = "\n（現在は友だち全員に通知する設定のため、登録・解除に関わらず通知が届きます）"
+
+HELP_MESSAGE = (
+    "🌱 AquaSync\n"
+    "「今の水分は?」→ 現在の水分レベル\n"
+    "「登録」/「登録 plant1」→ 通知を受け取る\n"
+    "「解除」→ 通知を停止"
+)
+
+_signer = None
+_events = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _get_signer():
+    """チャネルシークレットで初期化したHMACを使い回す（リクエストごとはcopyのみ）"""
+    global _signer
+    if _signer is None:
+        _signer = hmac.new(get_settings().channel_secret.encode('utf-8'), digestmod=hashlib.sha256)
+    return _signer
+
+
+def verify_signature(body, signature):
+    """X-Line-Signatureヘッダーを検証"""
+    if not signature:
+        return False
+    mac = _get_signer().copy()
+    mac.update(body)
+    expected = base64.b64encode(mac.digest()).decode('ascii')
+    return hmac.compare_digest(expected, signature)
+
+
+def accept(body, signature):
+    """Webhookリクエストを受け付けてキューに積む（不正な署名・本文ならFalse）"""
+    if not verify_signature(body, signature):
+        return False
+    try:
+        events = json.loads(body).get('events', [])
+    except (ValueError, AttributeError):
+        print("⚠️ Webhookの本文を解析できません")
+        return False
+    for event in events:
+        _events.put(event)
+    start_worker()
+    return True
+
+
+def start_worker():
+    """イベント処理スレッドを開始（初回のみ）"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_run, name='webhook')
+                _worker.daemon = True
+                _worker.start()
+
+
+def _run():
+    while True:
+        event = _events.get()
+        try:
+            handle_event(event)
+        except Exception as e:
+            print(f"Webhook処理エラー: {e}")
+
+
+def format_snapshot(device):
+    """デバイスの最新計測値を応答用テキストに整形"""
+    snapshot = state.get(device)
+    if snapshot is None:
+        return f"🌱 {device}: まだ計測値がありません"
+    updated = datetime.fromtimestamp(snapshot['ts']).strftime("%H:%M")
+    label = state.STATUS_LABELS.get(snapshot['status'], snapshot['status'])
+    return f"🌱 {device}: 💧 {snapshot['percentage']}% {label}（{updated} 更新）"
+
+
+def status_reply(user_id):
+    """ユーザーが購読しているデバイス（未登録なら全デバイス）の現在値"""
+    devices = get_registry().devices_for(user_id) if user_id else []
+    if not devices or ALL_DEVICES in devices:
+        devices = state.devices() or [get_settings().device_id]
+    return "\n".join(format_snapshot(device) for device in devices)
+
+
+def known_devices():
+    """購読できるデバイス（既定のデバイス・計測値を受信した・履歴のあるデバイス）"""
+    from .history import get_history
+
+    return {get_settings().device_id, *state.devices(), *get_history().devices()}
+
+
+def build_reply(text, user_id):
+    """受信テキストに対する応答（該当しなければヘルプ、応答しない場合はNone）"""
+    registry = get_registry()
+    note = BROADCAST_NOTE if get_settings().notify_mode == 'broadcast' else ''
+    words = text.split()
+    command = words[0] if words else ''
+    device = words[1] if len(words) > 1 else ALL_DEVICES
+
+    subscription = any(keyword in command for keyword in UNSUBSCRIBE_KEYWORDS + SUBSCRIBE_KEYWORDS)
+    if subscription and not user_id:
+        # グループ・トークルームで送信者のユーザーIDがない
+        return None
+    if subscription and device != ALL_DEVICES and device not in known_devices():
+        return f"⚠️ {device} という植物は見つかりません（{', '.join(sorted(known_devices()))}）"
+    if any(keyword in command for keyword in UNSUBSCRIBE_KEYWORDS):
+        if registry.unsubscribe(user_id, None if device == ALL_DEVICES else device):
+            return "🔕 通知を停止しました" + note
+        return "通知は登録されていません" + note
+    if any(keyword in command for keyword in SUBSCRIBE_KEYWORDS):
+        registry.subscribe(user_id, device)
+        target = "すべての植物" if device == ALL_DEVICES else device
+        return f"🔔 {target}の通知を登録しました" + note
+    if any(keyword in text for keyword in STATUS_KEYWORDS):
+        return status_reply(user_id)
+    return HELP_MESSAGE
+
+
+def handle_event(event):
+    """Webhookイベントを処理して応答（Geminiやセンサーへの問い合わせはしない）"""
+    from .line import reply, text_message
+
+    reply_token = event.get('replyToken')
+    if not reply_token:
+        return
+    user_id = event.get('source', {}).get('userId')
+
+    if event.get('type') == 'follow':
+        text = HELP_MESSAGE
+    elif event.get('type') == 'message' and event.get('message', {}).get('type') == 'text':
+        text = build_reply(event['message']['text'].strip(), user_id)
+        if text is None:
+            return
+    else:
+        return
+
+    response = reply(reply_token, [text_message(text)])
+    if response.status_code != 200:
+        print(f"LINE応答失敗: {response.status_code} - {response.text}")
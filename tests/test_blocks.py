@@ -0,0 +1,82 @@
+"""計測値ブロックの符号化・復号の往復"""
+
+import numpy as np
+import pytest
+
+from aquasync.blocks import (BLOCK_SAMPLES, FILTERED_SCALE, TS_RESOLUTION, decode_block, encode_block,
+                             pack_ints, status_names, unpack_ints)
+
+
+def make_columns(n, seed=0, filtered='float'):
+    rng = np.random.default_rng(seed)
+    ts = 1.7e9 + np.arange(n) * 0.1 + rng.normal(0, 0.003, n)
+    raw = np.clip(np.rint(60 + np.cumsum(rng.normal(0, 0.5, n))), 0, 100).astype(np.int64)
+    percentage = np.clip(raw + rng.integers(-2, 3, n), 0, 100)
+    if filtered == 'float':
+        values = percentage + rng.normal(0, 0.4, n)
+    elif filtered == 'integer':
+        values = percentage.astype(np.float64)
+    else:
+        values = np.full(n, np.nan)
+    status = np.array(['red', 'yellow', 'green', 'broken'])[(percentage // 30).clip(0, 3)]
+    return ts, raw, percentage, status, values
+
+
+def assert_round_trip(ts, raw, percentage, status, filtered):
+    block = decode_block(encode_block(ts, raw, percentage, status, filtered))
+    assert len(block) == len(ts)
+    assert np.abs(block.ts - ts).max() <= TS_RESOLUTION / 2 + 1e-6
+    assert (block.raw == raw).all()
+    assert (block.percentage == percentage).all()
+    expected = np.where(np.isin(status, ['red', 'yellow', 'green']), status, 'unknown')
+    assert (status_names(block.status) == expected).all()
+    missing = np.isnan(filtered)
+    assert (np.isnan(block.filtered) == missing).all()
+    assert np.abs(block.filtered[~missing] - filtered[~missing]).max(initial=0) <= 0.5 / FILTERED_SCALE + 1e-9
+
+
+@pytest.mark.parametrize('filtered', ['float', 'integer', 'missing'])
+def test_round_trip(filtered):
+    assert_round_trip(*make_columns(BLOCK_SAMPLES, filtered=filtered))
+
+
+def test_round_trip_smoothed():
+    ts, raw, percentage, status, _ = make_columns(BLOCK_SAMPLES, seed=1)
+    # EWMAのように滑らかな値は差分で持つ
+    filtered = np.empty(len(raw))
+    level = float(raw[0])
+    for index, value in enumerate(raw):
+        level += 0.3 * (value - level)
+        filtered[index] = level
+    assert_round_trip(ts, raw, percentage, status, filtered)
+
+
+def test_round_trip_partial_missing_and_gaps():
+    ts, raw, percentage, status, filtered = make_columns(1000, seed=2)
+    filtered[::7] = np.nan
+    # 欠損区間（長い間隔）と外れ値を含む
+    ts[500:] += 3600
+    raw[100] = 0
+    raw[101] = 100
+    assert_round_trip(ts, raw, percentage, status, filtered)
+
+
+def test_round_trip_single_sample():
+    assert_round_trip(*make_columns(1, seed=3))
+
+
+def test_status_codes():
+    ts, raw, percentage, _, filtered = make_columns(300, seed=4)
+    codes = np.arange(300, dtype=np.uint8) % 4
+    block = decode_block(encode_block(ts, raw, percentage, codes, filtered))
+    assert (block.status == codes).all()
+
+
+def test_pack_ints_round_trip():
+    rng = np.random.default_rng(5)
+    values = rng.integers(-3, 4, 5000)
+    # PFORの例外になる大きな値
+    values[[10, 999, 4321]] = [2 ** 40, -(2 ** 33), 123456789]
+    assert (unpack_ints(pack_ints(values), len(values)) == values).all()
+    zeros = np.zeros(300, dtype=np.int64)
+    assert (unpack_ints(pack_ints(zeros), len(zeros)) == zeros).all()